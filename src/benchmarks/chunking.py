@@ -0,0 +1,65 @@
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from src.config.config_manager import ConfigManager
+from src.retrievers.qdrant.chunker import StreamingChunker, TextChunker, TokenCounter
+
+WORDS = ["diffusion", "model", "the", "of", "denoising", "score", "network", "training", "sampling", "image",
+         "we", "propose", "a", "novel", "approach", "results", "show", "that", "our", "method", "outperforms"]
+
+
+def synthetic_markdown(size_mb: float, seed: int = 0) -> str:
+    """
+    Generates a markdown paper of roughly `size_mb` megabytes with headers and sections of varying length,
+    including a few sections far above the chunk size.
+    """
+    rng = random.Random(seed)
+    parts = ["# A Synthetic Paper"]
+    size = 0
+    section = 0
+    while size < size_mb * 1e6:
+        num_words = rng.choice([20, 50, 100, 200, 600, 1500, 8000])
+        body = " ".join(rng.choice(WORDS) for _ in range(num_words))
+        part = f"{'#' * rng.randint(2, 3)} Section {section}\n\n{body}"
+        parts.append(part)
+        size += len(part) + 2
+        section += 1
+    return "\n\n".join(parts)
+
+
+def benchmark(name: str, chunk_fn: Callable[[str], List], text: str, repeats: int) -> None:
+    timings = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        chunks = chunk_fn(text)
+        timings.append(time.perf_counter() - start_time)
+    best = min(timings)
+    print(f"{name:<32} {len(chunks):>7} chunks  {best:>8.3f}s  {len(text) / 1e6 / best:>8.2f} MB/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measures chunking throughput on large markdown documents.")
+    parser.add_argument("files", nargs="*", type=Path, help="Markdown files to chunk, synthetic if omitted.")
+    parser.add_argument("--size-mb", type=float, default=4.0, help="Size of the synthetic document.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--with-model", action="store_true", help="Also count tokens with the embedding model.")
+    args = parser.parse_args()
+
+    if args.files:
+        text = "\n\n".join(file.read_text(encoding="utf-8") for file in args.files)
+    else:
+        text = synthetic_markdown(args.size_mb)
+    print(f"Chunking {len(text) / 1e6:.1f} MB of markdown (best of {args.repeats}).")
+
+    benchmark("header_aware_chunking", TextChunker.header_aware_chunking, text, args.repeats)
+    benchmark("StreamingChunker (words)", StreamingChunker(TokenCounter(max_length=1024), merge_margin=50).chunk,
+              text, args.repeats)
+    if args.with_model:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(ConfigManager().embedding_model_name)
+        benchmark("StreamingChunker (model tokens)",
+                  StreamingChunker(TokenCounter.from_sentence_transformer(model)).chunk, text, args.repeats)
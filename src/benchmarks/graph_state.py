@@ -0,0 +1,74 @@
+import argparse
+import time
+from copy import deepcopy
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from src.config.config_manager import ConfigManager
+from src.graph import functions
+from src.graph.chat import ResearchQA
+
+TOPIC = "Diffusion Models in Computer Vision"
+NODES_PER_TURN = 4  # extract_topic, subquery_generator, assemble_context, generate_answer
+
+
+def fake_document(query: str, rank: int) -> dict:
+    """A retrieved chunk with a payload of the size the two-tier Qdrant collections return."""
+    return {
+        "id": f"{query}-{rank}",
+        "content": f"{query} " + "Diffusion models iteratively denoise latent representations. " * 25,
+        "metadata": {"paper_id": f"2507.{rank:05d}", "title": "A paper title " * 3, "authors": ["Author"] * 8,
+                     "summary": "Abstract sentence. " * 40, "published": "2025-07-01", "chunk_index": rank,
+                     "section": "Method", "char_start": 0, "char_end": 1500, "tokens": 320},
+        "score": 1.0 / (rank + 1),
+        "rerank_score": 5.0 - rank,
+    }
+
+
+def install_fake_tools(num_subqueries: int, top_k: int):
+    """
+    Replaces the LLM, Qdrant and embedding calls of the graph nodes with instant fakes that return payloads of
+    realistic size, so that a turn's run time is the overhead of the graph itself: node bodies, reducers,
+    fan-out and checkpointing.
+    """
+    functions.topic_extractor_tool = RunnableLambda(lambda args: TOPIC)
+    functions.subquery_generator_tool = RunnableLambda(
+        lambda args: [f"{args['query']} aspect {i}" for i in range(num_subqueries)])
+    functions.query_qdrant_tool = RunnableLambda(
+        lambda args: [fake_document(args["query"], rank) for rank in range(top_k)])
+    functions.query_qdrant_batch_tool = RunnableLambda(
+        lambda args: [fake_document(query, rank) for query in args["queries"] for rank in range(top_k)])
+    functions.answer_generator_tool = RunnableLambda(lambda args: "A synthesized answer. " * 60)
+    functions.assemble_context = lambda documents, collection_name=None: documents[:8]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measures per-node graph overhead over a long conversation.")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--subqueries", type=int, default=4)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--message-window", type=int, default=None,
+                        help="Overrides ConfigManager().message_window; 0 keeps all messages.")
+    args = parser.parse_args()
+
+    if args.message_window is not None:
+        ConfigManager().configure({"message_window": args.message_window})
+    install_fake_tools(args.subqueries, args.top_k)
+    graph = ResearchQA().graph
+    config = {"configurable": {"thread_id": "benchmark"}}
+    nodes_per_turn = NODES_PER_TURN + (1 if ConfigManager().batched_retrieval else args.subqueries)
+
+    print(f"{'turn':>5} {'messages':>9} {'docs':>6} {'per node':>10} {'deepcopy/node':>14}")
+    for turn in range(1, args.turns + 1):
+        start_time = time.perf_counter()
+        graph.invoke({"messages": [HumanMessage(f"Question {turn} about diffusion models?")]}, config)
+        per_node = (time.perf_counter() - start_time) / nodes_per_turn
+        values = graph.get_state(config).values
+        # What the removed `deepcopy(state)` at the start of every node would cost on the current state.
+        start_time = time.perf_counter()
+        deepcopy(values)
+        copy_time = time.perf_counter() - start_time
+        if turn == 1 or turn % 10 == 0:
+            print(f"{turn:>5} {len(values['messages']):>9} {len(values['retrieved_docs']):>6} "
+                  f"{per_node * 1000:>8.2f}ms {copy_time * 1000:>12.2f}ms")
@@ -0,0 +1,67 @@
+import argparse
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from src.config.config_manager import ConfigManager
+
+IMPORTTIME_REGEX = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports(module: str) -> tuple:
+    """
+    Imports a module in a fresh interpreter with `-X importtime` and parses its report.
+
+    Returns:
+        tuple: (wall time in seconds, list of (module, self us, cumulative us, nesting depth)).
+    """
+    start_time = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=ConfigManager().get_project_root(), capture_output=True, text=True)
+    elapsed = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_REGEX.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return elapsed, entries
+
+
+def by_package(entries: list) -> dict:
+    """Sums the self time of all modules per top-level package, e.g. "torch" or "langchain_core"."""
+    totals = defaultdict(int)
+    for name, self_us, _, _ in entries:
+        totals[name.split(".")[0]] += self_us
+    return dict(totals)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reports an import-time breakdown of the pipeline entry points.")
+    parser.add_argument("modules", nargs="*", default=["src.graph.chat", "src.server.app"])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-seconds", type=float, default=None,
+                        help="Exit with an error if importing any module takes longer than this.")
+    args = parser.parse_args()
+
+    too_slow = []
+    for module in args.modules:
+        elapsed, entries = measure_imports(module)
+        total_us = sum(self_us for _, self_us, _, _ in entries)
+        print(f"\n{module}: {elapsed:.2f}s wall, {total_us / 1e6:.2f}s in imports, {len(entries)} modules")
+        print(f"  {'package':<32} {'self':>9} {'share':>7}")
+        for package, self_us in sorted(by_package(entries).items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {package:<32} {self_us / 1000:>7.0f}ms {self_us / max(total_us, 1):>6.1%}")
+        print(f"  {'heaviest modules':<32} {'cumulative':>9}")
+        # Direct and second-level imports of the module show which of our imports pull in the heavy packages.
+        nested = [entry for entry in entries if 1 <= entry[3] <= 2]
+        for name, _, cumulative_us, _ in sorted(nested, key=lambda entry: -entry[2])[:args.top]:
+            print(f"  {name:<32} {cumulative_us / 1000:>7.0f}ms")
+        if args.max_seconds is not None and elapsed > args.max_seconds:
+            too_slow.append(module)
+    if too_slow:
+        sys.exit(f"Import time above {args.max_seconds}s: {', '.join(too_slow)}")
@@ -0,0 +1,113 @@
+import argparse
+import math
+import time
+
+import numpy as np
+from qdrant_client.http.models import OptimizersConfigDiff, QuantizationSearchParams, QueryRequest, SearchParams
+
+from src.config.config_manager import ConfigManager
+from src.retrievers.qdrant.qdrant_index import get_qdrant_index, search_params
+
+CONFIGURATIONS = {
+    "float32": {"vector_quantization": None, "vectors_on_disk": False},
+    "scalar": {"vector_quantization": "scalar", "vectors_on_disk": True},
+    "scalar_no_rescore": {"vector_quantization": "scalar", "vectors_on_disk": True, "quantization_rescore": False},
+    "binary": {"vector_quantization": "binary", "vectors_on_disk": True, "quantization_oversampling": 3.0},
+    "scalar_m32": {"vector_quantization": "scalar", "vectors_on_disk": True, "hnsw_m": 32, "hnsw_ef_construct": 200},
+}
+
+DEFAULTS = {"vector_quantization": None, "vectors_on_disk": False, "quantization_always_ram": True,
+            "quantization_rescore": True, "quantization_oversampling": 2.0, "hnsw_m": 16, "hnsw_ef_construct": 100}
+
+
+def estimate_memory(num_vectors: int, dim: int, config: dict) -> dict:
+    """
+    Estimates the RAM and disk footprint of a collection in bytes from its size and storage settings:
+    original float32 vectors (in RAM unless on disk), quantized vectors (int8 or 1 bit per dimension) and
+    the HNSW graph (~2*m links per vector). These are not measured; payloads, segment overhead and the
+    page cache are not included.
+    """
+    original = num_vectors * dim * 4
+    quantized = {"scalar": num_vectors * dim, "binary": num_vectors * math.ceil(dim / 8)}.get(
+        config["vector_quantization"], 0)
+    graph = num_vectors * config["hnsw_m"] * 2 * 4
+    ram = graph + (0 if config["vectors_on_disk"] else original) + (quantized if config["quantization_always_ram"] else 0)
+    return {"ram": ram, "disk": original + quantized + graph}
+
+
+def load_vectors(collection_name: str, vector_name: str, limit: int) -> np.ndarray:
+    index = get_qdrant_index(ConfigManager().embedding_model_name)
+    vectors = []
+    for _, vector in index.scroll_vectors(collection_name, vector_name):
+        vectors.append(vector)
+        if len(vectors) >= limit:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def build_collection(name: str, vectors: np.ndarray, batch_size: int = 512) -> None:
+    """
+    Creates a collection with the current ConfigManager storage settings, uploads the vectors and waits
+    until Qdrant has finished indexing them.
+    """
+    index = get_qdrant_index(ConfigManager().embedding_model_name)
+    if index.client.collection_exists(name):
+        index.client.delete_collection(name)
+    index.create_collection_if_not_exists(name, ("default",))
+    # Index small benchmark collections as well, so HNSW and quantization are actually exercised.
+    index.client.update_collection(name, optimizers_config=OptimizersConfigDiff(indexing_threshold=1000))
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        index.client.upsert(name, points=[{"id": start + i, "vector": {"default": vector.tolist()}}
+                                          for i, vector in enumerate(batch)])
+    while index.client.get_collection(name).status != "green":
+        time.sleep(0.5)
+
+
+def top_ids(name: str, queries: np.ndarray, top_k: int, params: SearchParams) -> tuple:
+    index = get_qdrant_index(ConfigManager().embedding_model_name)
+    requests = [QueryRequest(query=query.tolist(), using="default", limit=top_k, params=params) for query in queries]
+    start_time = time.perf_counter()
+    responses = index.client.query_batch_points(name, requests=requests)
+    elapsed = time.perf_counter() - start_time
+    return [[point.id for point in response.points] for response in responses], elapsed / len(queries)
+
+
+def recall_at_k(exact: list, approximate: list, top_k: int) -> float:
+    return float(np.mean([len(set(e) & set(a)) / top_k for e, a in zip(exact, approximate)]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measures recall@k and memory footprint of quantization settings.")
+    parser.add_argument("--collection", default="Diffusion_Models_in_Computer_Vision",
+                        help="Collection whose vectors are copied into the benchmark collections.")
+    parser.add_argument("--vector-name", default="default")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use this many random vectors instead.")
+    parser.add_argument("--limit", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = np.random.default_rng(0).standard_normal((args.synthetic, 384)).astype(np.float32)
+    else:
+        vectors = load_vectors(args.collection, args.vector_name, args.limit)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    # Held-out vectors serve as queries, so no query is trivially its own nearest neighbour.
+    queries, corpus = vectors[:args.queries], vectors[args.queries:]
+    print(f"{len(corpus)} vectors of dimension {corpus.shape[1]}, {len(queries)} queries, recall@{args.top_k}.")
+
+    print("RAM and disk are estimated from the vector count, dimension and storage settings, not measured.")
+    print(f"{'configuration':<20} {'recall':>8} {'latency':>10} {'est. RAM':>10} {'est. disk':>10}")
+    for name, overrides in CONFIGURATIONS.items():
+        config = {**DEFAULTS, **overrides}
+        ConfigManager().configure(config)
+        collection_name = f"benchmark_quantization_{name}"
+        build_collection(collection_name, corpus)
+        exact, _ = top_ids(collection_name, queries, args.top_k,
+                           SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True)))
+        approximate, latency = top_ids(collection_name, queries, args.top_k, search_params())
+        memory = estimate_memory(len(corpus), corpus.shape[1], config)
+        print(f"{name:<20} {recall_at_k(exact, approximate, args.top_k):>8.3f} {latency * 1000:>8.2f}ms "
+              f"{memory['ram'] / 2 ** 20:>8.1f}MB {memory['disk'] / 2 ** 20:>8.1f}MB")
+        get_qdrant_index(ConfigManager().embedding_model_name).client.delete_collection(collection_name)
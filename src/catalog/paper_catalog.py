@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.config.config_manager import ConfigManager
+
+PAPER_COLUMNS = ["arxiv_id", "title", "authors", "published", "summary", "pdf_url", "pdf_path", "pdf_size",
+                 "pdf_sha256", "markdown_path", "conversion_state", "converted_at"]
+
+
+def topic_key(topic: str) -> str:
+    """
+    Normalizes a topic name ("Diffusion Models in Computer Vision") to the key used for its
+    folder suffix and Qdrant collection ("Diffusion_Models_in_Computer_Vision").
+    """
+    return topic.replace(" ", "_")
+
+
+def arxiv_id_from_path(filepath: str) -> str:
+    return Path(filepath).stem
+
+
+class PaperCatalog:
+    """
+    Indexed local catalog of scraped papers, shared by the scraper, the preprocessor and the Qdrant uploader.
+
+    Every paper is stored once under its arXiv ID with its metadata, file paths and conversion state, and
+    linked to the topics it was scraped for. Ingestion state is tracked per topic, since every topic is
+    indexed into its own collection. Paper records are returned in the same
+    shape as the entries of the former pdfs_metadata.json ("title", "pdf_url", "filepath", "summary",
+    "authors", "published", "size", "sha256") plus the catalog's state columns.
+    """
+
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                arxiv_id TEXT PRIMARY KEY,
+                title TEXT,
+                authors TEXT,
+                published TEXT,
+                summary TEXT,
+                pdf_url TEXT,
+                pdf_path TEXT,
+                pdf_size INTEGER,
+                pdf_sha256 TEXT,
+                markdown_path TEXT,
+                conversion_state TEXT NOT NULL DEFAULT 'pending',
+                converted_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS paper_topics (
+                arxiv_id TEXT NOT NULL REFERENCES papers (arxiv_id) ON DELETE CASCADE,
+                topic TEXT NOT NULL,
+                ingested_hash TEXT,
+                ingested_chunks INTEGER,
+                ingested_at REAL,
+                PRIMARY KEY (arxiv_id, topic)
+            );
+            CREATE INDEX IF NOT EXISTS paper_topics_topic ON paper_topics (topic);
+            CREATE INDEX IF NOT EXISTS papers_conversion_state ON papers (conversion_state);
+        """)
+        self._connection.commit()
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> dict:
+        record = dict(row)
+        record["authors"] = json.loads(record["authors"]) if record["authors"] else []
+        record["filepath"] = record["pdf_path"]
+        record["size"] = record["pdf_size"]
+        record["sha256"] = record["pdf_sha256"]
+        return record
+
+    def upsert_papers(self, topic: str, papers: List[dict]) -> None:
+        """
+        Inserts or updates scraped papers (pdfs_metadata.json-shaped dicts) and links them to `topic`.
+        Conversion and ingestion state of known papers is kept; it is reset only if the PDF changed.
+        """
+        rows = [(arxiv_id_from_path(paper["filepath"]), paper.get("title"),
+                 json.dumps(paper["authors"]) if "authors" in paper else None,
+                 paper.get("published"), paper.get("summary"), paper.get("pdf_url"), paper["filepath"],
+                 paper.get("size"), paper.get("sha256")) for paper in papers]
+        with self._lock:
+            self._connection.executemany("""
+                INSERT INTO papers (arxiv_id, title, authors, published, summary, pdf_url, pdf_path, pdf_size, pdf_sha256)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (arxiv_id) DO UPDATE SET
+                    title = COALESCE(excluded.title, papers.title),
+                    authors = COALESCE(excluded.authors, papers.authors),
+                    published = COALESCE(excluded.published, papers.published),
+                    summary = COALESCE(excluded.summary, papers.summary),
+                    pdf_url = COALESCE(excluded.pdf_url, papers.pdf_url),
+                    pdf_path = excluded.pdf_path,
+                    pdf_size = COALESCE(excluded.pdf_size, papers.pdf_size),
+                    conversion_state = CASE WHEN excluded.pdf_sha256 IS NOT papers.pdf_sha256
+                        AND excluded.pdf_sha256 IS NOT NULL THEN 'pending' ELSE papers.conversion_state END,
+                    pdf_sha256 = COALESCE(excluded.pdf_sha256, papers.pdf_sha256)
+            """, rows)
+            self._connection.executemany("INSERT OR IGNORE INTO paper_topics (arxiv_id, topic) VALUES (?, ?)",
+                                         [(row[0], topic_key(topic)) for row in rows])
+            self._connection.commit()
+
+    def import_metadata_json(self, topic: str, metadata_path: str) -> int:
+        """
+        Imports a legacy pdfs_metadata.json file into the catalog. Returns the number of imported papers.
+        """
+        with open(metadata_path, "r") as f:
+            papers = json.load(f)
+        self.upsert_papers(topic, papers)
+        return len(papers)
+
+    def get(self, arxiv_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM papers WHERE arxiv_id = ?", (arxiv_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def _query_topic(self, topic: str, condition: str = "1 = 1") -> List[dict]:
+        with self._lock:
+            rows = self._connection.execute(f"""
+                SELECT papers.*, paper_topics.ingested_hash, paper_topics.ingested_chunks, paper_topics.ingested_at
+                FROM papers JOIN paper_topics USING (arxiv_id)
+                WHERE paper_topics.topic = ? AND {condition}
+                ORDER BY papers.published DESC, papers.arxiv_id
+            """, (topic_key(topic),)).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def papers_for_topic(self, topic: str) -> List[dict]:
+        return self._query_topic(topic)
+
+    def papers_pending_conversion(self, topic: str) -> List[dict]:
+        return self._query_topic(topic, "papers.conversion_state != 'converted'")
+
+    def papers_not_ingested(self, topic: str) -> List[dict]:
+        return self._query_topic(topic, "paper_topics.ingested_hash IS NULL")
+
+    def ingested_hashes(self, topic: str) -> Dict[str, str]:
+        """
+        Returns the content hash of the markdown each ingested paper of the topic was indexed from.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT arxiv_id, ingested_hash FROM paper_topics WHERE topic = ? AND ingested_hash IS NOT NULL",
+                (topic_key(topic),)).fetchall()
+        return {row["arxiv_id"]: row["ingested_hash"] for row in rows}
+
+    def mark_converted(self, arxiv_id: str, markdown_path: str) -> None:
+        self._update(arxiv_id, conversion_state="converted", markdown_path=markdown_path, converted_at=time.time())
+
+    def mark_conversion_failed(self, arxiv_id: str) -> None:
+        self._update(arxiv_id, conversion_state="failed")
+
+    def mark_ingested(self, topic: str, arxiv_id: str, content_hash: str, num_chunks: int) -> None:
+        with self._lock:
+            self._connection.execute("""
+                INSERT INTO paper_topics (arxiv_id, topic, ingested_hash, ingested_chunks, ingested_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (arxiv_id, topic) DO UPDATE SET ingested_hash = excluded.ingested_hash,
+                    ingested_chunks = excluded.ingested_chunks, ingested_at = excluded.ingested_at
+            """, (arxiv_id, topic_key(topic), content_hash, num_chunks, time.time()))
+            self._connection.commit()
+
+    def mark_not_ingested(self, topic: str, arxiv_id: str) -> None:
+        with self._lock:
+            self._connection.execute("""
+                UPDATE paper_topics SET ingested_hash = NULL, ingested_chunks = NULL, ingested_at = NULL
+                WHERE arxiv_id = ? AND topic = ?
+            """, (arxiv_id, topic_key(topic)))
+            self._connection.commit()
+
+    def _update(self, arxiv_id: str, **values) -> None:
+        unknown = set(values) - set(PAPER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown catalog columns: {unknown}")
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with self._lock:
+            self._connection.execute(f"UPDATE papers SET {assignments} WHERE arxiv_id = ?",
+                                     (*values.values(), arxiv_id))
+            self._connection.commit()
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_paper_catalog(db_path: Optional[str] = None) -> PaperCatalog:
+    """
+    Returns the process-wide catalog for `db_path`, defaulting to `ConfigManager().paper_catalog_path`.
+    """
+    db_path = db_path or ConfigManager().paper_catalog_path
+    with _catalogs_lock:
+        if db_path not in _catalogs:
+            _catalogs[db_path] = PaperCatalog(db_path)
+        return _catalogs[db_path]
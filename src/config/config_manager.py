@@ -10,6 +10,62 @@ class ConfigManager(metaclass=SingletonMeta):
         self.ollama_model_name = "qwen2.5:7b"
         self.ollama_thinking_model_name = "qwen3:8b"
         self.tavily_search_max_results = 3
+        self.embedding_batch_size = 64
+        self.embedding_num_workers = 0
+        self.embedding_cache_dir = str(self.get_project_root() / ".cache" / "embeddings")
+        self.embedding_cache_max_entries = 500_000
+        self.incremental_ingestion = True
+        self.use_docling_cache = True
+        self.chunking_strategy = "streaming"
+        self.collection_layout = "two_tier"
+        self.retriever_backend = "qdrant"
+        self.embedded_index_dir = str(self.get_project_root() / "src" / "data" / "vector_index")
+        self.paper_top_k = 5
+        self.collection_info_ttl_seconds = 60
+        self.vector_quantization = None
+        self.quantization_always_ram = True
+        self.quantization_rescore = True
+        self.quantization_oversampling = 2.0
+        self.vectors_on_disk = False
+        self.hnsw_m = 16
+        self.hnsw_ef_construct = 100
+        self.hnsw_ef = None
+        self.hybrid_search = True
+        self.hybrid_prefetch_multiplier = 4
+        self.bm25_avg_doc_length = 200
+        self.reranker_enabled = True
+        self.reranker_model_name = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+        self.rerank_candidates = 20
+        self.rerank_cache_size = 10_000
+        self.context_token_budget = 3000
+        self.context_mmr_lambda = 0.7
+        self.stream_answer = True
+        self.message_window = 20
+        self.checkpointer_backend = "sqlite"
+        self.checkpoint_db_path = str(self.get_project_root() / ".cache" / "checkpoints.sqlite")
+        self.checkpoint_ttl_seconds = 7 * 24 * 3600
+        self.checkpoint_max_threads = 10_000
+        self.checkpoint_keep_last = 5
+        self.server_host = "0.0.0.0"
+        self.server_port = 8000
+        self.server_max_concurrency = 4
+        self.server_max_queue = 16
+        self.server_queue_timeout_seconds = 30
+        self.paper_catalog_path = str(self.get_project_root() / "src" / "data" / "paper_catalog.sqlite")
+        self.query_embedding_cache_size = 1024
+        self.batched_retrieval = False
+        self.llm_cache_backend = "memory"
+        self.llm_cache_path = str(self.get_project_root() / ".cache" / "llm_responses.sqlite")
+        self.llm_cache_ttl_seconds = 24 * 3600
+        self.llm_cache_max_entries = 10_000
+        self.prompts_offline = False
+        self.prompt_cache_ttl_seconds = 300
+        self.prompt_negative_cache_ttl_seconds = 60
+        self.topic_classifier_enabled = True
+        self.topic_classifier_margin_threshold = 0.05
+        self.topic_classifier_min_similarity = 0.3
+        self.topic_classifier_audit_rate = 0.0
+        self.topic_centroid_refresh_seconds = 3600
 
     def configure(self, config_dict):
         for key, value in config_dict.items():
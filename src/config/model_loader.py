@@ -1,3 +1,4 @@
+import threading
 from typing import Callable, Any
 
 class ModelLoader:
@@ -7,12 +8,18 @@ class ModelLoader:
         if cls._instance is None:
             cls._instance = super(ModelLoader, cls).__new__(cls)
             cls._instance.models = {}
+            cls._instance._locks = {}
+            cls._instance._lock = threading.Lock()
         return cls._instance
 
     def load_model(self, model_name: str, Loader: Callable[[str], Any]):
-        if model_name not in self.models:
-            self.models[model_name] = Loader(model_name)
-            print(f"Model loaded: {model_name}")
+        # One lock per model: different models load in parallel (see `prewarm`), the same model loads once.
+        with self._lock:
+            model_lock = self._locks.setdefault(model_name, threading.Lock())
+        with model_lock:
+            if model_name not in self.models:
+                self.models[model_name] = Loader(model_name)
+                print(f"Model loaded: {model_name}")
         return self.models[model_name]
 
-model_loader = ModelLoader()
\ No newline at end of file
+model_loader = ModelLoader()
@@ -1,23 +1,34 @@
-import operator
-from typing import TypedDict, Annotated, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypedDict, Annotated, List, Iterator, AsyncIterator
 
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, BaseMessage
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, END
 from langgraph.types import Send
 from loguru import logger
 
+from src.config.config_manager import ConfigManager
 from src.graph.functions import run_topic_extractor_tool, run_document_retriever_tool, run_answer_generator_tool, \
-    run_subquery_generator_tool, run_tavily_search_tool
+    run_subquery_generator_tool, run_tavily_search_tool, run_batch_document_retriever_tool, arun_topic_extractor_tool, \
+    arun_document_retriever_tool, arun_answer_generator_tool, arun_subquery_generator_tool, arun_tavily_search_tool, \
+    arun_batch_document_retriever_tool, run_context_assembler, arun_context_assembler, latest_user_query
+from src.graph.checkpointer import get_checkpointer
+from src.graph.reducers import add_or_reset, add_messages_window
+from src.prompts.prompt_templates import PromptTemplates
+from src.retrievers.reranker import get_reranker
+from src.retrievers.vector_index import get_vector_index
+from src.tools.llm_client import get_chat_model
+from src.utils.json_stream import JsonStringFieldParser
 
 load_dotenv()
 
 class GraphState(TypedDict):
-    messages: Annotated[List[BaseMessage], operator.add]
+    messages: Annotated[List[BaseMessage], add_messages_window]
     topic_name: str
     subqueries: List[str]
-    retrieved_docs: Annotated[List[str], operator.add]
+    retrieved_docs: Annotated[List[dict], add_or_reset]
+    context_docs: List[dict]
     final_answer: str
 
 
@@ -37,10 +48,12 @@ def continue_to_run_document_retriever_tool(state):
     if topic_name not in TOPICS:
         logger.warning(f"Topic '{topic_name}' not found in predefined topics. Will continue with Tavily search.")
         if not subqueries:
-            tavily_search_states.append({"query": state["messages"][0].content})
+            tavily_search_states.append({"query": latest_user_query(state)})
         for subquery in subqueries:
             tavily_search_states.append({"query": subquery})
         return [Send("tavily_search_node", tavily_search_state) for tavily_search_state in tavily_search_states]
+    elif ConfigManager().batched_retrieval:
+        return [Send("retrieve_documents_batch_node", {"queries": subqueries, "topic_name": topic_name})]
     else:
         for subquery in subqueries:
             document_retrievers_states.append({"query": subquery, "topic_name": topic_name})
@@ -48,38 +61,139 @@ def continue_to_run_document_retriever_tool(state):
 
 
 
+SYNC_NODES = {
+    "extract_topic": run_topic_extractor_tool,
+    "subquery_generator": run_subquery_generator_tool,
+    "tavily_search_node": run_tavily_search_tool,
+    "retrieve_documents_node": run_document_retriever_tool,
+    "retrieve_documents_batch_node": run_batch_document_retriever_tool,
+    "assemble_context": run_context_assembler,
+    "generate_answer": run_answer_generator_tool,
+}
+
+ASYNC_NODES = {
+    "extract_topic": arun_topic_extractor_tool,
+    "subquery_generator": arun_subquery_generator_tool,
+    "tavily_search_node": arun_tavily_search_tool,
+    "retrieve_documents_node": arun_document_retriever_tool,
+    "retrieve_documents_batch_node": arun_batch_document_retriever_tool,
+    "assemble_context": arun_context_assembler,
+    "generate_answer": arun_answer_generator_tool,
+}
+
+
 class ResearchQA:
-    def __init__(self):
+    def __init__(self, async_mode: bool = False):
+        """
+        Builds and compiles the QA graph.
+
+        Args:
+            async_mode (bool): If True, the graph is built from the async node functions and must be
+                driven with `ainvoke`/`astream`. LLM, Qdrant and Tavily calls then no longer block a
+                worker thread, so one process can serve many concurrent conversations.
+        """
         self.workflow = StateGraph(GraphState)
 
         # Add nodes
-        self.workflow.add_node("extract_topic", run_topic_extractor_tool)
-        self.workflow.add_node("subquery_generator", run_subquery_generator_tool)
-        self.workflow.add_node("tavily_search_node", run_tavily_search_tool)
-        self.workflow.add_node("retrieve_documents_node", run_document_retriever_tool)
-        self.workflow.add_node("generate_answer", run_answer_generator_tool)
+        for node_name, node in (ASYNC_NODES if async_mode else SYNC_NODES).items():
+            self.workflow.add_node(node_name, node)
 
         # Add edges
         self.workflow.set_entry_point("extract_topic")
         self.workflow.add_edge("extract_topic", "subquery_generator")
         self.workflow.add_conditional_edges("subquery_generator", continue_to_run_document_retriever_tool)
-        self.workflow.add_edge("tavily_search_node", "generate_answer")
-        self.workflow.add_edge("retrieve_documents_node", "generate_answer")
+        self.workflow.add_edge("tavily_search_node", "assemble_context")
+        self.workflow.add_edge("retrieve_documents_node", "assemble_context")
+        self.workflow.add_edge("retrieve_documents_batch_node", "assemble_context")
+        self.workflow.add_edge("assemble_context", "generate_answer")
         self.workflow.add_edge("generate_answer", END)
 
-        self.graph = self.workflow.compile(checkpointer=MemorySaver())
+        self.graph = self.workflow.compile(checkpointer=get_checkpointer())
+
+    def stream_answer(self, inputs: dict, config: dict) -> Iterator[str]:
+        """
+        Runs the graph and yields the final answer in pieces as the answer model generates it.
+
+        The graph is streamed in the "messages" mode, which carries the tokens of every LLM call. The tokens of
+        the `generate_answer` node form the `{"answer": ...}` JSON envelope, whose answer text is decoded
+        incrementally. If the answer was not streamed (e.g. a cached response), it is yielded in one piece.
+        """
+        parser = JsonStringFieldParser("answer")
+        for mode, chunk in self.graph.stream(inputs, config, stream_mode=["messages", "updates"]):
+            delta = self._answer_delta(parser, mode, chunk)
+            if delta:
+                yield delta
+
+    async def astream_answer(self, inputs: dict, config: dict) -> AsyncIterator[str]:
+        """
+        Asynchronous variant of `stream_answer`, for graphs built with `async_mode=True`.
+        """
+        parser = JsonStringFieldParser("answer")
+        async for mode, chunk in self.graph.astream(inputs, config, stream_mode=["messages", "updates"]):
+            delta = self._answer_delta(parser, mode, chunk)
+            if delta:
+                yield delta
+
+    @staticmethod
+    def _answer_delta(parser: JsonStringFieldParser, mode: str, chunk) -> str:
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") == "generate_answer" and isinstance(message.content, str):
+                return parser.feed(message.content)
+        elif mode == "updates" and "generate_answer" in chunk and not parser.value:
+            return (chunk["generate_answer"] or {}).get("final_answer") or ""
+        return ""
+
+
+def prewarm(async_mode: bool = False) -> ResearchQA:
+    """
+    Loads everything the first query would otherwise wait for, in parallel: the SentenceTransformer with the
+    vector index clients, the cross-encoder, the prompt templates, the chat model clients and the compiled graph.
+    A component that fails to load is logged and loaded again on first use.
+
+    Args:
+        async_mode (bool): Passed to `ResearchQA`.
+
+    Returns:
+        ResearchQA: The compiled graph.
+    """
+    config = ConfigManager()
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=5, thread_name_prefix="prewarm") as executor:
+        graph_future = executor.submit(ResearchQA, async_mode)
+        futures = {
+            "vector index": executor.submit(get_vector_index, config.embedding_model_name),
+            "reranker": executor.submit(get_reranker),
+            "prompt templates": executor.submit(PromptTemplates),
+            "chat models": executor.submit(lambda: [get_chat_model(model_name) for model_name in
+                                                    (config.ollama_model_name, config.ollama_thinking_model_name)]),
+        }
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f"Prewarming {name} failed, it will be loaded on first use | Error: {e}")
+        research_qa = graph_future.result()
+    logger.info(f"Prewarmed ResearchQA in {time.perf_counter() - start_time:.1f}s")
+    return research_qa
 
 
 if __name__ == '__main__':
-    graph = ResearchQA().graph
+    research_qa = prewarm()
     config = {"configurable": {"thread_id": '111'}}
-    state = graph.get_state(config)
     query = "How AnyI2V enables motion-controlled video generation using a training-free approach."
     # query = "What are the recent advancements in quantum error correction techniques for fault-tolerant quantum computing?"
-    if "messages" not in state.values:
-        state.values["messages"] = []
-    state.values["messages"].append(HumanMessage(query))
-    for event in graph.stream(state.values, config):
-        response = event
-    answer = response["generate_answer"]["final_answer"]
-    logger.success(f"Query: {query} \nAnswer: {answer}")
\ No newline at end of file
+    # Only the new message is sent: the checkpointer already holds the conversation of the thread.
+    inputs = {"messages": [HumanMessage(query)]}
+    start_time = time.perf_counter()
+    first_token_time = None
+    answer = ""
+    for delta in research_qa.stream_answer(inputs, config):
+        if first_token_time is None:
+            first_token_time = time.perf_counter() - start_time
+        answer += delta
+        print(delta, end="", flush=True)
+    print()
+    total_time = time.perf_counter() - start_time
+    logger.success(f"Query: {query} \nAnswer: {answer}")
+    logger.info(f"Time to first answer token: {first_token_time or total_time:.2f}s | Total: {total_time:.2f}s")
\ No newline at end of file
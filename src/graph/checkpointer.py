@@ -0,0 +1,325 @@
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (WRITES_IDX_MAP, BaseCheckpointSaver, ChannelVersions, Checkpoint,
+                                       CheckpointMetadata, CheckpointTuple, get_checkpoint_id,
+                                       get_checkpoint_metadata)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from loguru import logger
+
+from src.config.config_manager import ConfigManager
+
+
+class CompressedSerializer:
+    """
+    Wraps the LangGraph serializer (msgpack for graph states) and zlib-compresses its output. The message
+    histories and retrieved chunks of ResearchQA states are repetitive text and shrink several times.
+    """
+
+    SUFFIX = "+zlib"
+
+    def __init__(self, serde=None, level: int = 6):
+        self.serde = serde or JsonPlusSerializer()
+        self.level = level
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        return type_ + self.SUFFIX, zlib.compress(data, self.level)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(self.SUFFIX):
+            return self.serde.loads_typed((type_[:-len(self.SUFFIX)], zlib.decompress(payload)))
+        return self.serde.loads_typed((type_, payload))
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Durable LangGraph checkpointer backed by a local SQLite file, so conversations survive restarts and can be
+    shared by worker processes on the same host.
+
+    Storage stays bounded under sustained traffic:
+        - Compaction: only the last `keep_last` checkpoints of every thread (and their pending writes) are kept.
+          The latest checkpoint is all a conversation needs to continue.
+        - Eviction: threads idle for longer than `ttl_seconds` are deleted, and beyond `max_threads` threads the
+          least recently active ones are deleted. Eviction runs at most every `eviction_interval_seconds`.
+    States are stored compressed (see `CompressedSerializer`) and nothing is held in process memory.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: Optional[float] = 7 * 24 * 3600, max_threads: Optional[int] = 10_000,
+                 keep_last: int = 5, eviction_interval_seconds: float = 60):
+        """
+        Args:
+            db_path (str): Path of the SQLite file.
+            ttl_seconds (Optional[float]): Idle time after which a thread is deleted, None to keep threads.
+            max_threads (Optional[int]): Maximum number of threads kept, None for no limit.
+            keep_last (int): Number of checkpoints kept per thread.
+            eviction_interval_seconds (float): Minimum time between two eviction runs.
+        """
+        super().__init__(serde=CompressedSerializer())
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self.keep_last = max(1, keep_last)
+        self.eviction_interval_seconds = eviction_interval_seconds
+        self._last_eviction = 0.0
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS threads_updated_at ON threads (updated_at);
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT, type TEXT NOT NULL, checkpoint BLOB NOT NULL, metadata TEXT NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id));
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx));
+        """)
+        self._connection.commit()
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if checkpoint_id:
+                row = self._connection.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            else:
+                row = self._connection.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns)).fetchone()
+            if row is None:
+                return None
+            writes = self._connection.execute(
+                "SELECT task_id, channel, type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, row[0])).fetchall()
+        return self._to_tuple(thread_id, checkpoint_ns, row, writes)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata " \
+                "FROM checkpoints"
+        conditions, params = [], []
+        if config is not None:
+            conditions.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before is not None and get_checkpoint_id(before):
+            conditions.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        returned = 0
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and returned >= limit:
+                break
+            metadata = json.loads(row[4])
+            if filter and any(metadata.get(key) != value for key, value in filter.items()):
+                continue
+            with self._lock:
+                writes = self._connection.execute(
+                    "SELECT task_id, channel, type, value FROM writes "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                    (thread_id, checkpoint_ns, row[0])).fetchall()
+            returned += 1
+            yield self._to_tuple(thread_id, checkpoint_ns, row, writes)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = json.dumps(get_checkpoint_metadata(config, metadata), default=str)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"), type_,
+                 serialized, serialized_metadata))
+            self._touch(thread_id)
+            self._compact(thread_id, checkpoint_ns)
+            self._connection.commit()
+        self._maybe_evict()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special channels (errors, interrupts, ...) replace earlier writes; regular writes are written once.
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                         channel, type_, serialized))
+        with self._lock:
+            self._connection.executemany(
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._connection.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete_threads([thread_id])
+            self._connection.commit()
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_version = 0
+        elif isinstance(current, int):
+            current_version = current
+        else:
+            current_version = int(current.split(".")[0])
+        return f"{current_version + 1:032}.{random.random():016}"
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def evict(self) -> int:
+        """
+        Deletes threads idle for longer than `ttl_seconds` and the least recently active threads beyond
+        `max_threads`. Returns the number of deleted threads.
+        """
+        with self._lock:
+            thread_ids = []
+            if self.ttl_seconds is not None:
+                thread_ids += [row[0] for row in self._connection.execute(
+                    "SELECT thread_id FROM threads WHERE updated_at < ?", (time.time() - self.ttl_seconds,))]
+            if self.max_threads is not None:
+                count = self._connection.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+                overflow = count - len(thread_ids) - self.max_threads
+                if overflow > 0:
+                    thread_ids += [row[0] for row in self._connection.execute(
+                        "SELECT thread_id FROM threads WHERE thread_id NOT IN (SELECT value FROM json_each(?)) "
+                        "ORDER BY updated_at LIMIT ?", (json.dumps(thread_ids), overflow))]
+            if thread_ids:
+                self._delete_threads(thread_ids)
+                self._connection.commit()
+            self._last_eviction = time.monotonic()
+        if thread_ids:
+            logger.info(f"Evicted {len(thread_ids)} idle conversation threads from the checkpoint store.")
+        return len(thread_ids)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threads": self._connection.execute("SELECT COUNT(*) FROM threads").fetchone()[0],
+                "checkpoints": self._connection.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0],
+                "writes": self._connection.execute("SELECT COUNT(*) FROM writes").fetchone()[0],
+                "checkpoint_bytes": self._connection.execute(
+                    "SELECT COALESCE(SUM(LENGTH(checkpoint)), 0) FROM checkpoints").fetchone()[0],
+            }
+
+    def _maybe_evict(self):
+        if time.monotonic() - self._last_eviction >= self.eviction_interval_seconds:
+            self.evict()
+
+    def _touch(self, thread_id: str):
+        self._connection.execute("INSERT OR REPLACE INTO threads (thread_id, updated_at) VALUES (?, ?)",
+                                 (thread_id, time.time()))
+
+    def _compact(self, thread_id: str, checkpoint_ns: str):
+        """Deletes all but the last `keep_last` checkpoints of a thread, together with their writes."""
+        stale = [row[0] for row in self._connection.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?", (thread_id, checkpoint_ns, self.keep_last))]
+        if not stale:
+            return
+        for table in ("checkpoints", "writes"):
+            self._connection.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                f"AND checkpoint_id IN (SELECT value FROM json_each(?))",
+                (thread_id, checkpoint_ns, json.dumps(stale)))
+
+    def _delete_threads(self, thread_ids: Sequence[str]):
+        for table in ("checkpoints", "writes", "threads"):
+            self._connection.execute(f"DELETE FROM {table} WHERE thread_id IN (SELECT value FROM json_each(?))",
+                                     (json.dumps(list(thread_ids)),))
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: Sequence, writes: Sequence) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata = row
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=json.loads(metadata),
+            parent_config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                            "checkpoint_id": parent_checkpoint_id}} if parent_checkpoint_id else None,
+            pending_writes=[(task_id, channel, self.serde.loads_typed((value_type, value)))
+                            for task_id, channel, value_type, value in writes],
+        )
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """
+    Returns the process-wide checkpointer configured by `checkpointer_backend`: "sqlite" for the durable
+    `SQLiteCheckpointSaver`, or "memory" for LangGraph's in-process `MemorySaver`.
+    """
+    global _checkpointer
+    config = ConfigManager()
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            if config.checkpointer_backend == "sqlite":
+                _checkpointer = SQLiteCheckpointSaver(config.checkpoint_db_path,
+                                                      ttl_seconds=config.checkpoint_ttl_seconds,
+                                                      max_threads=config.checkpoint_max_threads,
+                                                      keep_last=config.checkpoint_keep_last)
+            elif config.checkpointer_backend == "memory":
+                _checkpointer = MemorySaver()
+            else:
+                raise ValueError(f"Unknown checkpointer_backend '{config.checkpointer_backend}'.")
+        return _checkpointer
@@ -1,41 +1,45 @@
-from copy import deepcopy
+import asyncio
 from typing import Dict, Any
 
 from langchain_core.agents import AgentAction
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.runnables import chain as as_runnable
 
-from src.tools.answer_generator_tool import answer_generator_tool
-from src.tools.query_qdrant_tool import query_qdrant_tool
-from src.tools.subquery_generator_tool import subquery_generator_tool
-from src.tools.tavily_search_tool import tavily_search_tool
-from src.tools.topic_extractor_tool import topic_extractor_tool
+from src.retrievers.context_assembler import assemble_context
+from src.tools.answer_generator_tool import answer_generator_tool, aanswer_generator_tool
+from src.tools.query_qdrant_tool import query_qdrant_tool, query_qdrant_batch_tool, aquery_qdrant_tool, \
+    aquery_qdrant_batch_tool
+from src.tools.subquery_generator_tool import subquery_generator_tool, asubquery_generator_tool
+from src.tools.tavily_search_tool import tavily_search_tool, atavily_search_tool
+from src.tools.topic_extractor_tool import topic_extractor_tool, atopic_extractor_tool
 
 
-@as_runnable
-def run_topic_extractor_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
-    result = deepcopy(state)
-    user_query = result["messages"][-1].content
-    tool_args = {
-        "query": user_query,
-    }
-    topic_name = topic_extractor_tool.invoke(tool_args)
+def latest_user_query(state: Dict[Any, Any]) -> str:
+    """
+    Returns the content of the most recent user message, i.e. the query of the current turn.
+    """
+    for message in reversed(state["messages"]):
+        if isinstance(message, HumanMessage):
+            return message.content
+    return state["messages"][-1].content
+
+
+def _topic_name_args(state: Dict[Any, Any]) -> Dict[str, Any]:
+    return {"topic_name": state["topic_name"].replace(" ", "_")}
+
+
+def _topic_extractor_update(tool_args: Dict[str, Any], topic_name: str) -> Dict[Any, Any]:
     action = AgentAction(
         tool="topic_extractor_tool",
         tool_input=tool_args,
         log=str(topic_name)
     )
-    return {"messages": [AIMessage(str(topic_name))], "intermediate_steps": [(action, topic_name)], "topic_name": topic_name}
+    # First node of a turn: drops the documents and subqueries of the previous turn.
+    return {"messages": [AIMessage(str(topic_name))], "intermediate_steps": [(action, topic_name)], "topic_name": topic_name,
+            "retrieved_docs": None, "subqueries": [], "context_docs": []}
 
 
-@as_runnable
-def run_subquery_generator_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
-    result = deepcopy(state)
-    user_query = result["messages"][0].content
-    tool_args = {
-        "query": user_query,
-    }
-    subqueries = subquery_generator_tool.invoke(tool_args)
+def _subquery_generator_update(tool_args: Dict[str, Any], subqueries: Any) -> Dict[Any, Any]:
     action = AgentAction(
         tool="subquery_generator_tool",
         tool_input=tool_args,
@@ -44,46 +48,107 @@ def run_subquery_generator_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
     return {"messages": [AIMessage(str(subqueries))], "intermediate_steps": [(action, subqueries)], "subqueries": subqueries}
 
 
-@as_runnable
-def run_tavily_search_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
-    result = deepcopy(state)
-    user_query = result["query"]
-    tool_args = {
-        "query": user_query
-    }
-    search_result = tavily_search_tool.invoke(tool_args)
+def _tavily_search_update(tool_args: Dict[str, Any], search_result: str) -> Dict[Any, Any]:
     action = AgentAction(
         tool="tavily_search_tool",
-        tool_input={"query": user_query},
+        tool_input=tool_args,
         log=search_result
     )
-
     return {"messages": [AIMessage(search_result)], "intermediate_steps": [(action, search_result)]}
 
+
+def _context_assembler_args(state: Dict[Any, Any]) -> Dict[str, Any]:
+    return {
+        "documents": state["retrieved_docs"],
+        "collection_name": state["topic_name"].replace(" ", "_") if state.get("topic_name") else None,
+    }
+
+
+def _answer_generator_args(state: Dict[Any, Any]) -> Dict[str, Any]:
+    return {
+        "query": latest_user_query(state),
+        "retrieved_data": state["context_docs"]
+    }
+
+
+# The synchronous and asynchronous nodes share their argument and result handling above and differ only in
+# how the tool is invoked.
+
+@as_runnable
+def run_topic_extractor_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    tool_args = {"query": latest_user_query(state)}
+    return _topic_extractor_update(tool_args, topic_extractor_tool.invoke(tool_args))
+
+
+@as_runnable
+def run_subquery_generator_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    tool_args = {"query": latest_user_query(state)}
+    return _subquery_generator_update(tool_args, subquery_generator_tool.invoke(tool_args))
+
+
+@as_runnable
+def run_tavily_search_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    tool_args = {"query": state["query"]}
+    return _tavily_search_update(tool_args, tavily_search_tool.invoke(tool_args))
+
+
 @as_runnable
 def run_document_retriever_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
-    result = deepcopy(state)
-    topic_name = result["topic_name"]
-    query = result["query"]
-    tool_args = {
-        "query": query,
-        "topic_name": topic_name.replace(" ", "_")
-    }
-    retrieved_docs = query_qdrant_tool.invoke(tool_args)
+    tool_args = {"query": state["query"], **_topic_name_args(state)}
+    return {"retrieved_docs": query_qdrant_tool.invoke(tool_args)}
 
 
-    return {"retrieved_docs": retrieved_docs}
+@as_runnable
+def run_batch_document_retriever_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    tool_args = {"queries": state["queries"], **_topic_name_args(state)}
+    return {"retrieved_docs": query_qdrant_batch_tool.invoke(tool_args)}
+
+
+@as_runnable
+def run_context_assembler(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    return {"context_docs": assemble_context(**_context_assembler_args(state))}
 
 
 @as_runnable
 def run_answer_generator_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
-    result = deepcopy(state)
-    retrieved_docs = result["retrieved_docs"]
-    query = result["messages"][0].content
-    tool_args = {
-        "query": query,
-        "retrieved_data": retrieved_docs
-    }
-    answer = answer_generator_tool.invoke(tool_args)
+    return {"final_answer": answer_generator_tool.invoke(_answer_generator_args(state))}
+
+
+@as_runnable
+async def arun_topic_extractor_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    tool_args = {"query": latest_user_query(state)}
+    return _topic_extractor_update(tool_args, await atopic_extractor_tool.ainvoke(tool_args))
+
+
+@as_runnable
+async def arun_subquery_generator_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    tool_args = {"query": latest_user_query(state)}
+    return _subquery_generator_update(tool_args, await asubquery_generator_tool.ainvoke(tool_args))
+
+
+@as_runnable
+async def arun_tavily_search_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    tool_args = {"query": state["query"]}
+    return _tavily_search_update(tool_args, await atavily_search_tool.ainvoke(tool_args))
+
+
+@as_runnable
+async def arun_document_retriever_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    tool_args = {"query": state["query"], **_topic_name_args(state)}
+    return {"retrieved_docs": await aquery_qdrant_tool.ainvoke(tool_args)}
+
 
-    return {"final_answer": answer}
\ No newline at end of file
+@as_runnable
+async def arun_batch_document_retriever_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    tool_args = {"queries": state["queries"], **_topic_name_args(state)}
+    return {"retrieved_docs": await aquery_qdrant_batch_tool.ainvoke(tool_args)}
+
+
+@as_runnable
+async def arun_context_assembler(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    return {"context_docs": await asyncio.to_thread(assemble_context, **_context_assembler_args(state))}
+
+
+@as_runnable
+async def arun_answer_generator_tool(state: Dict[Any, Any]) -> Dict[Any, Any]:
+    return {"final_answer": await aanswer_generator_tool.ainvoke(_answer_generator_args(state))}
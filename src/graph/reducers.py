@@ -0,0 +1,30 @@
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage
+
+from src.config.config_manager import ConfigManager
+
+
+def add_or_reset(left: Optional[list], right: Optional[list]) -> list:
+    """
+    Reducer for per-turn state such as `retrieved_docs`: concatenates the updates of parallel nodes within
+    a turn, while an update of None clears the value, which the first node of every turn sends.
+    Updates that are not lists (e.g. the empty string a failed tool returns) are ignored.
+    """
+    if right is None:
+        return []
+    if not isinstance(right, list):
+        return left or []
+    return (left or []) + right
+
+
+def add_messages_window(left: Optional[List[BaseMessage]], right: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Reducer for `messages` that appends new messages and keeps only the last `ConfigManager().message_window`
+    of them, so the checkpointed state and everything derived from it stop growing with the conversation.
+    """
+    messages = (left or []) + (right or [])
+    window = ConfigManager().message_window
+    if window and len(messages) > window:
+        messages = messages[-window:]
+    return messages
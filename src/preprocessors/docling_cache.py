@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+DOCLING_CACHE_VERSION = 1
+
+
+def document_to_blocks(document) -> List[dict]:
+    """
+    Flattens a DoclingDocument into an ordered list of blocks that keeps the structure needed for chunking:
+    each block has a "type" (title, section_header, text, table or picture), its "text" (tables as markdown,
+    pictures as their caption), the header "level" and the "page" it starts on.
+    """
+    from docling_core.types.doc import PictureItem, SectionHeaderItem, TableItem, TextItem, TitleItem
+
+    blocks = []
+    for item, _ in document.iterate_items():
+        if isinstance(item, TitleItem):
+            block = {"type": "title", "text": item.text, "level": 0}
+        elif isinstance(item, SectionHeaderItem):
+            block = {"type": "section_header", "text": item.text, "level": item.level}
+        elif isinstance(item, TableItem):
+            block = {"type": "table", "text": item.export_to_markdown(doc=document)}
+        elif isinstance(item, PictureItem):
+            block = {"type": "picture", "text": item.caption_text(document)}
+        elif isinstance(item, TextItem):
+            block = {"type": "text", "text": item.text}
+        else:
+            continue
+        if not block["text"]:
+            continue
+        block["page"] = item.prov[0].page_no if item.prov else None
+        blocks.append(block)
+    return blocks
+
+
+def blocks_to_markdown(blocks: List[dict]) -> str:
+    """
+    Renders blocks back into markdown, so a cached document can replace a missing markdown file
+    without converting the PDF again.
+    """
+    parts = []
+    for block in blocks:
+        if block["type"] == "title":
+            parts.append(f"# {block['text']}")
+        elif block["type"] == "section_header":
+            parts.append(f"{'#' * min(block['level'] + 1, 6)} {block['text']}")
+        else:
+            parts.append(block["text"])
+    return "\n\n".join(parts)
+
+
+class DoclingDocumentCache:
+    """
+    Content-addressed cache of structured Docling documents. Every converted PDF is stored under the
+    sha256 of its bytes as gzip-compressed JSON blocks (see `document_to_blocks`).
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, content_hash: str) -> Path:
+        return self.cache_dir / f"{content_hash}.json.gz"
+
+    def __contains__(self, content_hash: str) -> bool:
+        return self.path(content_hash).exists()
+
+    def get(self, content_hash: str) -> Optional[List[dict]]:
+        path = self.path(content_hash)
+        if not path.exists():
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("version") != DOCLING_CACHE_VERSION:
+            return None
+        return cached["blocks"]
+
+    def put(self, content_hash: str, blocks: List[dict]) -> None:
+        path = self.path(content_hash)
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"version": DOCLING_CACHE_VERSION, "blocks": blocks}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
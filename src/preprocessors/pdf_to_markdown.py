@@ -1,42 +1,150 @@
-import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
 
-from docling.document_converter import DocumentConverter
+from src.catalog.paper_catalog import PaperCatalog, arxiv_id_from_path, get_paper_catalog
+from src.preprocessors.docling_cache import DoclingDocumentCache, blocks_to_markdown, document_to_blocks
+from src.utils.hashing import file_sha256
 
+_converter = None
 
-def convert_all_pdfs_to_markdown(root_path: str):
-    converter = DocumentConverter()
 
+def _init_worker(num_threads: int):
+    """
+    Creates one DocumentConverter per worker process. Docling is imported here, after the thread count is
+    pinned, so that the workers together do not oversubscribe the CPU cores.
+    """
+    global _converter
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+    from docling.document_converter import DocumentConverter
+    _converter = DocumentConverter()
+
+
+def _write_markdown(markdown_file_path: str, markdown: str):
+    tmp_path = f"{markdown_file_path}.tmp"
+    with open(tmp_path, 'w') as md_file:
+        md_file.write(markdown)
+    os.replace(tmp_path, markdown_file_path)
+
+
+def _convert_pdf(pdf_path: str, markdown_file_path: str, cache_dir: str, content_hash: str) -> dict:
+    start_time = time.perf_counter()
+    result = _converter.convert(pdf_path)
+    DoclingDocumentCache(cache_dir).put(content_hash, document_to_blocks(result.document))
+    _write_markdown(markdown_file_path, result.document.export_to_markdown())
+    return {"pages": result.document.num_pages(), "seconds": time.perf_counter() - start_time}
+
+
+def resolve_local_pdf(pdf_metadata: dict, sub_folder_path: str) -> Optional[str]:
+    """
+    Returns the path of the PDF saved by the scraper. The recorded `filepath` is relative to the directory
+    the scraper ran from, so the PDF is also looked up in the topic folder.
+    """
+    for candidate in (pdf_metadata['filepath'], os.path.join(sub_folder_path, os.path.basename(pdf_metadata['filepath']))):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def convert_all_pdfs_to_markdown(root_path: str, max_workers: Optional[int] = None, populate_cache: bool = True,
+                                 catalog: Optional[PaperCatalog] = None):
+    """
+    Converts the locally downloaded PDFs of every topic folder under `root_path` into markdown.
+    The papers of a topic are read from the paper catalog, which is also updated with their conversion state.
+    A legacy pdfs_metadata.json found in a topic folder is imported into the catalog first.
+
+    Papers whose markdown already exists are skipped individually, so a partially converted topic is
+    completed instead of skipped. Conversion runs on a process pool with one DocumentConverter per worker
+    and reads only local PDFs, so no network calls are made.
+
+    The structured document of every conversion is kept in the topic's `docling_cache` folder, keyed by the
+    PDF's content hash. A missing markdown file with a cached document is re-rendered from the cache instead
+    of converting the PDF again.
+
+    Args:
+        root_path (str): Directory holding one folder per topic, as written by the arXiv scraper.
+        max_workers (Optional[int]): Number of worker processes, defaults to the number of CPU cores.
+        populate_cache (bool): Also convert papers that already have markdown but no cached structured document.
+        catalog (Optional[PaperCatalog]): Paper catalog to use, defaults to the configured one.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    catalog = catalog or get_paper_catalog()
+    jobs = []
     for sub_folder in os.listdir(root_path):
         if sub_folder == ".DS_Store":
             continue
 
         sub_folder_path = os.path.join(root_path, sub_folder)
+        if not os.path.isdir(sub_folder_path):
+            continue
+        topic = sub_folder.split("arxiv_pdfs_")[-1]
         pdfs_metadata_path = os.path.join(sub_folder_path, 'pdfs_metadata.json')
         save_root_path = os.path.join(sub_folder_path, 'markdowns')
+        cache_dir = os.path.join(sub_folder_path, 'docling_cache')
 
-        if os.path.exists(save_root_path):
-            print(f"Markdowns already exist in {save_root_path}. Skipping conversion.")
+        pdfs_metadata = catalog.papers_for_topic(topic)
+        if not pdfs_metadata and os.path.isfile(pdfs_metadata_path):
+            print(f"Imported {catalog.import_metadata_json(topic, pdfs_metadata_path)} papers of {topic} into the catalog.")
+            pdfs_metadata = catalog.papers_for_topic(topic)
+        if not pdfs_metadata:
             continue
 
         os.makedirs(save_root_path, exist_ok=True)
-
-        with open(pdfs_metadata_path, 'r') as f:
-            pdfs_metadata = json.load(f)
+        cache = DoclingDocumentCache(cache_dir)
 
         for pdf_metadata in pdfs_metadata:
-            print(f"Title: {pdf_metadata['title']}")
-            print(f"PDF URL: {pdf_metadata['pdf_url']}")
-            print(f"Filepath: {pdf_metadata['filepath']}\n")
+            arxiv_id = arxiv_id_from_path(pdf_metadata['filepath'])
+            markdown_file_path = os.path.join(save_root_path, f"{arxiv_id}.md")
+            markdown_exists = os.path.isfile(markdown_file_path) and os.path.getsize(markdown_file_path) > 0
+            if markdown_exists and pdf_metadata['conversion_state'] != 'converted':
+                catalog.mark_converted(arxiv_id, markdown_file_path)
+            if markdown_exists and not populate_cache:
+                continue
+            pdf_path = resolve_local_pdf(pdf_metadata, sub_folder_path)
+            if pdf_path is None:
+                if not markdown_exists:
+                    print(f"Local PDF not found for {pdf_metadata['title']} ({pdf_metadata['filepath']}). Skipping.")
+                continue
+            content_hash = pdf_metadata['sha256'] or file_sha256(pdf_path)
+            if content_hash in cache:
+                if not markdown_exists:
+                    _write_markdown(markdown_file_path, blocks_to_markdown(cache.get(content_hash)))
+                    catalog.mark_converted(arxiv_id, markdown_file_path)
+                    print(f"Restored markdown of {pdf_metadata['title']} from the document cache.")
+                continue
+            jobs.append((arxiv_id, pdf_metadata['title'], pdf_path, markdown_file_path, cache_dir, content_hash))
 
-            result = converter.convert(pdf_metadata['pdf_url'])
-            markdown = result.document.export_to_markdown()
+    if not jobs:
+        print("All markdowns already exist. Nothing to convert.")
+        return
 
-            filename = os.path.basename(pdf_metadata['filepath']).replace('.pdf', '.md')
-            markdown_file_path = os.path.join(save_root_path, filename)
+    print(f"Converting {len(jobs)} PDFs with {max_workers} worker processes.")
+    threads_per_worker = max(1, (os.cpu_count() or 1) // max_workers)
+    start_time = time.perf_counter()
+    total_pages = 0
+    completed = 0
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(threads_per_worker,)) as executor:
+        futures = {executor.submit(_convert_pdf, *job_args): (arxiv_id, title, job_args[1])
+                   for arxiv_id, title, *job_args in jobs}
+        for future in as_completed(futures):
+            arxiv_id, title, markdown_file_path = futures[future]
+            completed += 1
+            try:
+                stats = future.result()
+            except Exception as e:
+                catalog.mark_conversion_failed(arxiv_id)
+                print(f"[{completed}/{len(jobs)}] Failed to convert {title}: {e}")
+                continue
+            catalog.mark_converted(arxiv_id, markdown_file_path)
+            total_pages += stats["pages"]
+            elapsed = time.perf_counter() - start_time
+            print(f"[{completed}/{len(jobs)}] Converted {title} ({stats['pages']} pages, {stats['seconds']:.1f}s) | "
+                  f"{completed / elapsed * 60:.1f} papers/min, {total_pages / elapsed:.2f} pages/s")
 
-            with open(markdown_file_path, 'w') as md_file:
-                md_file.write(markdown)
+    elapsed = time.perf_counter() - start_time
+    print(f"Converted {completed} PDFs ({total_pages} pages) in {elapsed:.1f}s.")
 
 
 if __name__ == '__main__':
@@ -1,10 +1,10 @@
+import threading
+import time
 from typing import Optional, Any
 
-from langchain_core.prompts import ChatPromptTemplate
-from langsmith import Client
 from loguru import logger
-from urllib3.util.retry import Retry
 
+from src.config.config_manager import ConfigManager
 from src.prompts.prompt_templates import PromptTemplates
 
 
@@ -14,7 +14,11 @@ class PromptNotFound(Exception):
 
 class FailSafeLangSmithClient:
     """
-    Singleton wrapper for LangSmith client that adds fail-safe prompt handling
+    Singleton wrapper for LangSmith client that adds fail-safe prompt handling.
+
+    Resolved templates are cached in-process for `prompt_cache_ttl_seconds`. Stale templates are served
+    while a background thread refreshes them, and a failed pull is remembered for
+    `prompt_negative_cache_ttl_seconds` so an unreachable LangSmith is not retried on every request.
     """
     _instance = None
     _initialized = False
@@ -26,7 +30,13 @@ class FailSafeLangSmithClient:
 
     def __init__(self):
         if not self._initialized:
+            self._lock = threading.Lock()
+            self._templates = {}
+            self._failures = {}
+            self._refreshing = set()
             try:
+                from langsmith import Client
+                from urllib3.util.retry import Retry
                 self._client = Client(retry_config=Retry(
                     total=1,
                     status_forcelist=[],
@@ -37,28 +47,80 @@ class FailSafeLangSmithClient:
                 logger.error(f"Failed to initialize LangSmith client: {str(e)}")
                 raise e
 
+    def _fetch_template(self, prompt_name: str) -> str:
+        res = self._client.pull_prompt(prompt_name)
+        raw_template = res.get_prompts()[0][0].prompt.template
+        logger.info(f"Pulled {prompt_name} prompt from LangSmith")
+        with self._lock:
+            self._templates[prompt_name] = (raw_template, time.monotonic())
+            self._failures.pop(prompt_name, None)
+        return raw_template
+
+    def _refresh_in_background(self, prompt_name: str):
+        with self._lock:
+            if prompt_name in self._refreshing:
+                return
+            self._refreshing.add(prompt_name)
+
+        def refresh():
+            try:
+                self._fetch_template(prompt_name)
+            except Exception as e:
+                logger.warning(f"Background refresh of {prompt_name} prompt failed, keeping cached version: {e}")
+                with self._lock:
+                    self._failures[prompt_name] = time.monotonic()
+            finally:
+                with self._lock:
+                    self._refreshing.discard(prompt_name)
+
+        threading.Thread(target=refresh, name=f"prompt-refresh-{prompt_name}", daemon=True).start()
+
+    def resolve_template(self, prompt_name: str) -> Optional[str]:
+        """
+        Returns the raw LangSmith template for a prompt, or None if LangSmith is known to be unavailable
+        for it and the local template should be used instead.
+        """
+        config = ConfigManager()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._templates.get(prompt_name)
+            failed_at = self._failures.get(prompt_name)
+        recently_failed = failed_at is not None and now - failed_at < config.prompt_negative_cache_ttl_seconds
+        if cached is not None:
+            raw_template, fetched_at = cached
+            if now - fetched_at >= config.prompt_cache_ttl_seconds and not recently_failed:
+                self._refresh_in_background(prompt_name)
+            return raw_template
+        if recently_failed:
+            return None
+        try:
+            return self._fetch_template(prompt_name)
+        except Exception as e:
+            logger.warning(f"Failed to pull {prompt_name} prompt from LangSmith: {e}")
+            with self._lock:
+                self._failures[prompt_name] = time.monotonic()
+            self._push_local_template(prompt_name)
+            return None
+
+    def _push_local_template(self, prompt_name: str):
+        try:
+            from langchain_core.prompts import ChatPromptTemplate
+            template = PromptTemplates().get_prompt_raw(prompt_template_mnemonic=prompt_name)
+            self._client.push_prompt(prompt_name,
+                                     object=ChatPromptTemplate.from_template(template.template),
+                                     is_public=False)
+            logger.info(f"Pushing {prompt_name} to LangSmith")
+        except Exception as e:
+            logger.error(f"Failed to create prompt {prompt_name}:\n{str(e)}")
+
     def pull_prompt(self, prompt_name: str, *args, **kwargs) -> Optional[Any]:
         """
         Get a prompt from LangSmith. If it doesn't exist, create it using the local prompt.
         """
-        try:
-            res = self._client.pull_prompt(prompt_name)
-            raw_template = res.get_prompts()[0][0].prompt.template
-            logger.info(f"Pulled {prompt_name} prompt from LangSmith")
+        raw_template = self.resolve_template(prompt_name)
+        if raw_template is not None:
             return raw_template.format(**kwargs)
-        except Exception as e:
-            try:
-                template = PromptTemplates().get_prompt_raw(prompt_template_mnemonic=prompt_name, **kwargs)
-                self._client.push_prompt(prompt_name,
-                                         object=ChatPromptTemplate.from_template(template.template),
-                                         is_public=False)
-                logger.info(f"Pushing {prompt_name} to LangSmith")
-                return template.format(**kwargs)
-            except PromptNotFound as e:
-                raise e
-            except Exception as e:
-                logger.error(f"Failed to create prompt {prompt_name}:\n{str(e)}")
-                raise e
+        return PromptTemplates().get_prompt(prompt_name, **kwargs)
 
     def __getattr__(self, name):
         """
@@ -71,6 +133,7 @@ def get_prompt_with_fallback(prompt_template_mnemonic: str, **kwargs) -> str:
     """
     Retrieves a prompt using FailSafeLangSmithClient. If that fails,
     logs the error and falls back to the local PromptTemplates.
+    With `prompts_offline` enabled, only the local PromptTemplates are used and no network I/O happens.
     Args:
         prompt_template_mnemonic: The identifier for the desired prompt.
         **kwargs: Additional parameters to format the prompt.
@@ -78,10 +141,12 @@ def get_prompt_with_fallback(prompt_template_mnemonic: str, **kwargs) -> str:
     Returns:
         A formatted prompt string.
     """
+    if ConfigManager().prompts_offline:
+        return PromptTemplates().get_prompt(prompt_template_mnemonic, **kwargs)
     try:
         return FailSafeLangSmithClient().pull_prompt(prompt_template_mnemonic, **kwargs)
     except Exception as e:
         logger.error(
             f"Failed to pull prompt from LangSmith for {prompt_template_mnemonic}: {e}. Falling back to local prompt."
         )
-        return PromptTemplates().get_prompt(prompt_template_mnemonic, **kwargs)
\ No newline at end of file
+        return PromptTemplates().get_prompt(prompt_template_mnemonic, **kwargs)
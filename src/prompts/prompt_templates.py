@@ -1,7 +1,5 @@
 from pathlib import Path
 
-from llama_index.core.prompts import PromptTemplate
-
 from src.utils.singleton_meta import SingletonMeta
 
 
@@ -17,6 +15,8 @@ class PromptTemplates(metaclass=SingletonMeta):
             self.prompt_templates[prompt_template_file.stem] = self._load_prompt_template_text(prompt_template_file)
 
     def _load_prompt_template_text(self, prompt_file: Path):
+        # llama_index is slow to import and only needed once the templates are parsed.
+        from llama_index.core.prompts import PromptTemplate
         with open(prompt_file, 'r') as f:
             return PromptTemplate(f.read())
 
@@ -0,0 +1,234 @@
+import asyncio
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from src.config.config_manager import ConfigManager
+from src.config.model_loader import model_loader
+from src.retrievers.qdrant.embedding_cache import EmbeddingCache, QueryEmbeddingLRU
+from src.retrievers.sparse_encoder import BM25SparseEncoder
+
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2a52-3c3e-4d1b-9a43-5d7c0f0b8e21")
+PAPER_ID_FIELD = "metadata.paper_id"
+PAPER_COLLECTION_SUFFIX = "__papers"
+
+
+def make_point_id(paper_id: str, chunk_index: int) -> str:
+    """
+    Derives a deterministic point ID from a paper ID and the index of the chunk within the paper,
+    so that re-ingesting a paper overwrites its points instead of duplicating them.
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{paper_id}:{chunk_index}"))
+
+
+def make_paper_point_id(paper_id: str) -> str:
+    """
+    Derives the deterministic ID of a paper's point in the paper-level collection.
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, paper_id))
+
+
+def paper_collection_name(collection_name: str) -> str:
+    """
+    Returns the name of the paper-level collection that accompanies a chunk collection in the
+    "two_tier" layout, e.g. "Diffusion_Models_in_Computer_Vision__papers".
+    """
+    return f"{collection_name}{PAPER_COLLECTION_SUFFIX}"
+
+
+class BaseVectorIndex(ABC):
+    """
+    Retriever interface shared by the vector index backends (see `src.retrievers.vector_index`).
+
+    The base class owns the embedding model and the embedding caches, so all backends encode documents and
+    queries the same way. Backends implement storage and search of points, which are dicts with an "id",
+    named vectors ("default", "summary") and a payload holding the "page_content" and "metadata".
+    Queries return documents as dicts with the point "id", "content", "metadata" and "score" of each hit.
+    """
+
+    def __init__(self, embedding_model_name: str):
+        """
+        Args:
+            embedding_model_name (str): Name of the SentenceTransformer model for embeddings.
+        """
+        # Imported here: sentence_transformers pulls in torch, which dominates import time.
+        from sentence_transformers import SentenceTransformer
+
+        self.embedding_model_name = embedding_model_name
+        self.embedding_model = model_loader.load_model(embedding_model_name, SentenceTransformer)
+        self.vector_size = self.embedding_model.get_sentence_embedding_dimension()
+        self.summary_embedding_model = self.embedding_model
+        self.summary_vector_size = self.vector_size
+        cache_dir = ConfigManager().embedding_cache_dir
+        self.embedding_cache = EmbeddingCache(
+            cache_dir=cache_dir,
+            model_name=embedding_model_name,
+            vector_size=self.vector_size,
+            max_entries=ConfigManager().embedding_cache_max_entries
+        ) if cache_dir else None
+        self.query_cache = QueryEmbeddingLRU(max_size=ConfigManager().query_embedding_cache_size)
+        self.sparse_encoder = BM25SparseEncoder(avg_doc_length=ConfigManager().bm25_avg_doc_length)
+
+    def encode_texts(self, texts: List[str], batch_size: int = 64, num_workers: int = 0) -> np.ndarray:
+        """
+        Encodes a list of texts in batched forward passes.
+        If the embedding cache is enabled, only texts missing from the cache are encoded.
+
+        Args:
+            texts (List[str]): Texts to encode. The order of the returned vectors matches this list.
+            batch_size (int): Number of texts per forward pass.
+            num_workers (int): If greater than 1, encoding is spread over a SentenceTransformer
+                multi-process pool with this many CPU workers.
+
+        Returns:
+            np.ndarray: A (len(texts), vector_size) matrix of embeddings.
+        """
+        if not texts:
+            return np.empty((0, self.vector_size), dtype=np.float32)
+        if self.embedding_cache is not None:
+            return self.embedding_cache.encode(texts, lambda missing: self._encode(missing, batch_size, num_workers))
+        return self._encode(texts, batch_size, num_workers)
+
+    def _encode(self, texts: List[str], batch_size: int, num_workers: int) -> np.ndarray:
+        if num_workers > 1:
+            pool = self.embedding_model.start_multi_process_pool(target_devices=["cpu"] * num_workers)
+            try:
+                return self.embedding_model.encode_multi_process(texts, pool, batch_size=batch_size)
+            finally:
+                self.embedding_model.stop_multi_process_pool(pool)
+        return self.embedding_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+    def encode_query(self, query: str) -> List[float]:
+        """
+        Encodes a search query, serving repeated queries from the in-memory query embedding LRU.
+        """
+        query_vector = self.query_cache.get(self.embedding_model_name, query)
+        if query_vector is None:
+            query_vector = self.embedding_model.encode(query).tolist()
+            self.query_cache.put(self.embedding_model_name, query, query_vector)
+        return query_vector
+
+    def encode_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Encodes several search queries at once. Queries missing from the query embedding LRU
+        are encoded together in a single batched forward pass.
+        """
+        query_vectors = [self.query_cache.get(self.embedding_model_name, query) for query in queries]
+        missing = list(dict.fromkeys(query for query, vector in zip(queries, query_vectors) if vector is None))
+        if missing:
+            encoded = dict(zip(missing, self.embedding_model.encode(missing, convert_to_numpy=True).tolist()))
+            for query, vector in encoded.items():
+                self.query_cache.put(self.embedding_model_name, query, vector)
+            query_vectors = [vector if vector is not None else encoded[query]
+                             for query, vector in zip(queries, query_vectors)]
+        return query_vectors
+
+    @abstractmethod
+    def create_collection_if_not_exists(self, collection_name: str,
+                                        vector_names: Sequence[str] = ("default", "summary")):
+        """Creates a collection storing the given named vectors if it doesn't already exist."""
+
+    @abstractmethod
+    def upload_points(self, collection_name: str, points: List[dict], batch_size: int = 100,
+                      vector_names: Sequence[str] = ("default", "summary")):
+        """Upserts points into a collection under their deterministic IDs, creating the collection if needed."""
+
+    @abstractmethod
+    def delete_paper_points(self, collection_name: str, paper_ids: List[str],
+                            keep_point_ids: Optional[Sequence[str]] = None):
+        """
+        Deletes all points that belong to the given papers from a collection, except the `keep_point_ids`
+        (e.g. the points just re-uploaded for a changed paper).
+        """
+
+    @abstractmethod
+    def has_paper_collection(self, collection_name: str) -> bool:
+        """Returns whether the chunk collection has a paper-level collection ("two_tier" layout)."""
+
+    def has_sparse_vectors(self, collection_name: str) -> bool:
+        """
+        Returns whether the collection stores "bm25" sparse vectors, i.e. uploads should carry them and chunk
+        searches run in hybrid mode. Backends without sparse vector support return False.
+        """
+        return False
+
+    @abstractmethod
+    def scroll_vectors(self, collection_name: str, vector_name: str,
+                       batch_size: int = 256) -> Iterator[Tuple[dict, List[float]]]:
+        """Iterates over all points of a collection, yielding (payload, vector) pairs for one named vector."""
+
+    @abstractmethod
+    def retrieve_vectors(self, collection_name: str, point_ids: List[str],
+                         vector_name: str = "default") -> Dict[str, List[float]]:
+        """Fetches one named vector of the given points, returned by point ID. Unknown IDs are left out."""
+
+    @abstractmethod
+    def query_collection(self, collection_name: str, query: str, top_k: int = 3,
+                         search_type: str = "default") -> List[dict]:
+        """Returns the `top_k` documents closest to the query for the "default" or "summary" vector."""
+
+    @abstractmethod
+    def query_collection_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                               search_type: str = "default") -> List[List[dict]]:
+        """Batched variant of `query_collection`, returning one list of documents per query."""
+
+    @abstractmethod
+    def query_two_stage(self, collection_name: str, query: str, top_k: int = 3,
+                        paper_top_k: Optional[int] = None) -> List[dict]:
+        """Selects the closest papers by summary, then returns the top chunks within those papers."""
+
+    @abstractmethod
+    def query_two_stage_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                              paper_top_k: Optional[int] = None) -> List[List[dict]]:
+        """Batched variant of `query_two_stage`, returning one list of documents per query."""
+
+    async def aquery_collection(self, collection_name: str, query: str, top_k: int = 3,
+                                search_type: str = "default") -> List[dict]:
+        """
+        Asynchronous variant of `query_collection`. Runs the query in a worker thread unless the backend
+        provides a native asynchronous client.
+        """
+        return await asyncio.to_thread(self.query_collection, collection_name, query, top_k, search_type)
+
+    async def aquery_collection_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                                      search_type: str = "default") -> List[List[dict]]:
+        """
+        Asynchronous variant of `query_collection_batch`.
+        """
+        return await asyncio.to_thread(self.query_collection_batch, collection_name, queries, top_k, search_type)
+
+    async def aquery_two_stage(self, collection_name: str, query: str, top_k: int = 3,
+                               paper_top_k: Optional[int] = None) -> List[dict]:
+        """
+        Asynchronous variant of `query_two_stage`.
+        """
+        return await asyncio.to_thread(self.query_two_stage, collection_name, query, top_k, paper_top_k)
+
+    async def aquery_two_stage_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                                     paper_top_k: Optional[int] = None) -> List[List[dict]]:
+        """
+        Asynchronous variant of `query_two_stage_batch`.
+        """
+        return await asyncio.to_thread(self.query_two_stage_batch, collection_name, queries, top_k, paper_top_k)
+
+    @staticmethod
+    def _vector_field(search_type: str) -> str:
+        # Both vector fields are encoded with the same model.
+        if search_type in ("default", "summary"):
+            return search_type
+        logger.error(f"Unknown search_type '{search_type}'. Falling back to default.")
+        return "default"
+
+    @staticmethod
+    def _join_papers(documents: List[dict], paper_documents: List[dict]) -> List[dict]:
+        """
+        Adds the metadata of their paper (from the paper-level collection) to chunk documents.
+        """
+        paper_metadata = {paper["metadata"]["paper_id"]: paper["metadata"] for paper in paper_documents}
+        for document in documents:
+            document["metadata"] = {**paper_metadata.get(document["metadata"].get("paper_id"), {}),
+                                    **document["metadata"]}
+        return documents
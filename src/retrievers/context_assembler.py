@@ -0,0 +1,180 @@
+import hashlib
+from typing import List, Optional
+
+import numpy as np
+from loguru import logger
+
+from src.config.config_manager import ConfigManager
+from src.retrievers.base_index import BaseVectorIndex
+from src.retrievers.reranker import rerank_documents
+
+# Rough characters-per-token ratio of English scientific text for the Qwen/Llama tokenizers served by Ollama.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _relevance(document: dict) -> float:
+    score = document.get("rerank_score", document.get("score"))
+    return float(score) if score is not None else float("-inf")
+
+
+def deduplicate_documents(documents: List) -> List[dict]:
+    """
+    Drops documents retrieved more than once, e.g. by overlapping subqueries. Documents are the same if they
+    share a point ID or their content hash; the most relevant copy is kept. The order of first occurrence is
+    preserved.
+    """
+    kept = {}
+    keys = {}
+    for document in documents:
+        if not isinstance(document, dict) or not document.get("content"):
+            continue
+        content_key = hashlib.sha256(document["content"].encode("utf-8")).hexdigest()
+        point_key = str(document["id"]) if document.get("id") is not None else None
+        key = keys.get(point_key) or keys.get(content_key) or content_key
+        keys[content_key] = key
+        if point_key is not None:
+            keys[point_key] = key
+        if key not in kept or _relevance(document) > _relevance(kept[key]):
+            kept[key] = document
+    return list(kept.values())
+
+
+def normalized_relevance(documents: List[dict]) -> np.ndarray:
+    """
+    Min-max scales the relevance of the documents (`rerank_score`, else the retrieval `score`) to [0, 1], so it
+    is on the same scale as the cosine similarities MMR compares it with. Documents without a score get 0.
+    """
+    scores = np.asarray([_relevance(document) for document in documents], dtype=np.float64)
+    finite = np.isfinite(scores)
+    if not finite.any():
+        return np.ones(len(documents))
+    low, high = scores[finite].min(), scores[finite].max()
+    if high == low:
+        return np.where(finite, 1.0, 0.0)
+    return np.where(finite, (scores - low) / (high - low), 0.0)
+
+
+def mmr_order(relevance: np.ndarray, document_vectors: np.ndarray, lambda_mult: float = 0.7) -> List[int]:
+    """
+    Orders documents by maximal marginal relevance: each next document maximizes
+    `lambda_mult * relevance(doc) - (1 - lambda_mult) * max sim(doc, already selected)`.
+
+    Args:
+        relevance (np.ndarray): The relevance of every document to the query, in [0, 1]
+            (see `normalized_relevance`), e.g. from the cross-encoder.
+        document_vectors (np.ndarray): A (num_documents, dim) matrix of document embeddings, only used to
+            measure redundancy between documents.
+        lambda_mult (float): Trade-off between relevance (1.0) and diversity (0.0).
+
+    Returns:
+        List[int]: Indices of all documents, in selection order.
+    """
+    if len(document_vectors) == 0:
+        return []
+    vectors = document_vectors / (np.linalg.norm(document_vectors, axis=1, keepdims=True) + 1e-12)
+    relevance = np.asarray(relevance, dtype=np.float64)
+    similarity = vectors @ vectors.T
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    remaining = np.ones(len(vectors), dtype=bool)
+    remaining[selected[0]] = False
+    while remaining.any():
+        scores = np.where(remaining, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+
+def pack_documents(documents: List[dict], token_budget: int) -> List[dict]:
+    """
+    Greedily packs documents, in the given order, into the token budget. Documents that don't fit are skipped
+    in favour of later, shorter ones. If not even the first document fits, it is truncated to the budget.
+    """
+    packed = []
+    used = 0
+    for document in documents:
+        tokens = estimate_tokens(document["content"])
+        if used + tokens <= token_budget:
+            packed.append(document)
+            used += tokens
+    if not packed and documents:
+        packed.append({**documents[0], "content": documents[0]["content"][:token_budget * CHARS_PER_TOKEN]})
+    return packed
+
+
+def _document_vectors(index: BaseVectorIndex, collection_name: str, documents: List[dict]) -> np.ndarray:
+    """
+    Looks up the stored "default" vectors of the documents in one request. Documents without a stored vector
+    (no ID, or fetching failed) are embedded instead, which is served from the embedding cache after ingestion.
+    """
+    stored = {}
+    point_ids = [str(document["id"]) for document in documents if document.get("id") is not None]
+    try:
+        stored = index.retrieve_vectors(collection_name, point_ids)
+    except Exception as e:
+        logger.warning(f"Fetching stored vectors from '{collection_name}' failed, re-embedding chunks | Error: {e}")
+    missing = [document["content"] for document in documents if str(document.get("id")) not in stored]
+    encoded = iter(index.encode_texts(missing).tolist()) if missing else iter(())
+    return np.asarray([stored[str(document.get("id"))] if str(document.get("id")) in stored else next(encoded)
+                       for document in documents], dtype=np.float32)
+
+
+def assemble_context(documents: List, collection_name: Optional[str] = None, token_budget: Optional[int] = None,
+                     lambda_mult: Optional[float] = None) -> List[dict]:
+    """
+    Turns the documents retrieved by all subqueries into the context of the answer prompt:
+        1. The candidates of all subqueries are reranked in one cross-encoder batch, keeping the best
+           `qdrant_top_k` per subquery (`rerank_documents`).
+        2. Duplicate chunks are dropped (`deduplicate_documents`).
+        3. The remaining chunks are ordered by MMR, with their normalized rerank (or retrieval) score as the
+           relevance and their stored vectors for redundancy, so near-identical chunks from different papers
+           or sections do not crowd out other evidence (`mmr_order`).
+        4. The chunks are packed into the token budget of the answer model (`pack_documents`).
+
+    Args:
+        documents (List): The retrieved documents, each tagged with the subquery that retrieved it.
+        collection_name (Optional[str]): Collection holding the chunks. Without it, MMR is skipped and
+            chunks are ordered by their relevance score.
+        token_budget (Optional[int]): Defaults to `ConfigManager().context_token_budget`.
+        lambda_mult (Optional[float]): Defaults to `ConfigManager().context_mmr_lambda`.
+
+    Returns:
+        List[dict]: The context documents, in prompt order.
+    """
+    config = ConfigManager()
+    token_budget = token_budget or config.context_token_budget
+    lambda_mult = config.context_mmr_lambda if lambda_mult is None else lambda_mult
+    candidates = [document for document in documents or [] if isinstance(document, dict)]
+    unique = deduplicate_documents(rerank_documents(candidates))
+    ordered = sorted(unique, key=_relevance, reverse=True)
+    if collection_name and len(unique) > 1:
+        try:
+            from src.retrievers.vector_index import get_vector_index
+            index = get_vector_index(config.embedding_model_name)
+            vectors = _document_vectors(index, collection_name, unique)
+            ordered = [unique[i] for i in mmr_order(normalized_relevance(unique), vectors, lambda_mult)]
+        except Exception as e:
+            logger.warning(f"MMR selection failed, ordering chunks by score | Error: {e}")
+    context = pack_documents(ordered, token_budget)
+    logger.info(f"Context Assembly | Retrieved: {len(candidates)} | Unique: {len(unique)} | Packed: {len(context)} "
+                f"| Tokens: ~{sum(estimate_tokens(document['content']) for document in context)}/{token_budget}")
+    return context
+
+
+if __name__ == '__main__':
+    docs = [
+        {"id": "a", "content": "AnyI2V is a training-free framework for motion-controlled image-to-video generation.",
+         "score": 0.9},
+        {"id": "a", "content": "AnyI2V is a training-free framework for motion-controlled image-to-video generation.",
+         "score": 0.8},
+        {"id": "b", "content": "Diffusion models denoise a Gaussian sample step by step." * 200, "score": 0.7},
+        {"id": "c", "content": "Motion trajectories are injected through the self-attention features.", "score": 0.6},
+    ]
+    for doc in assemble_context(docs, token_budget=200):
+        print(doc["id"], doc["content"][:80])
@@ -0,0 +1,360 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+
+from src.config.config_manager import ConfigManager
+from src.retrievers.base_index import BaseVectorIndex, make_point_id, paper_collection_name
+
+
+class EmbeddedCollection:
+    """
+    One collection of the embedded index, stored in its own directory:
+        - `<vector name>.f32`: the L2-normalized vectors as rows of a raw float32 file, memory-mapped for search.
+        - `points.json`: the point IDs and payloads, aligned with the vector rows.
+        - `points.log`: changes made since `points.json` was last written, one JSON line per upserted point or
+          deletion, so an upload only appends its own points. The log is folded into `points.json` once it
+          holds more entries than the collection has rows.
+    Deleted and replaced points leave an empty row behind, which is dropped when the collection is compacted.
+
+    Vector rows are only ever appended, and the ID, payload and alive-mask containers are replaced rather than
+    modified in place, so a `snapshot` stays consistent while the collection is updated.
+    """
+
+    def __init__(self, directory: Path, vector_sizes: Dict[str, int]):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vector_sizes = vector_sizes
+        self.ids = []
+        self.payloads = []
+        self.log_entries = 0
+        points_path = self.directory / "points.json"
+        if points_path.exists():
+            with open(points_path, "r") as f:
+                stored = json.load(f)
+            self.vector_sizes = stored["vector_sizes"]
+            self.ids = stored["ids"]
+            self.payloads = stored["payloads"]
+            log_intact = self._replay_log()
+        else:
+            log_intact = True
+        for vector_name, size in self.vector_sizes.items():
+            self.vector_path(vector_name).touch(exist_ok=True)
+            # Drop vector rows appended by an upload that was interrupted before its points were logged.
+            if self.vector_path(vector_name).stat().st_size > len(self.ids) * size * 4:
+                os.truncate(self.vector_path(vector_name), len(self.ids) * size * 4)
+        self._matrices = {}
+        self._reindex()
+        if not log_intact:
+            self.save()
+
+    @property
+    def log_path(self) -> Path:
+        return self.directory / "points.log"
+
+    def _replay_log(self) -> bool:
+        """Applies the logged changes. Returns False if the log ends in a torn line of an interrupted write."""
+        if not self.log_path.exists():
+            return True
+        with open(self.log_path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    return False
+                if "delete" in entry:
+                    for row in entry["delete"]:
+                        self.ids[row] = None
+                        self.payloads[row] = None
+                elif entry["row"] == len(self.ids):
+                    self.ids.append(entry["id"])
+                    self.payloads.append(entry["payload"])
+                else:
+                    self.ids[entry["row"]] = entry["id"]
+                    self.payloads[entry["row"]] = entry["payload"]
+                self.log_entries += 1
+        return True
+
+    def _append_log(self, entries: List[dict]):
+        with open(self.log_path, "a") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        self.log_entries += len(entries)
+        if self.log_entries > max(len(self.ids), 1000):
+            self.save()
+
+    def _reindex(self):
+        self.rows = {point_id: row for row, point_id in enumerate(self.ids) if point_id is not None}
+        self.alive = np.array([point_id is not None for point_id in self.ids], dtype=bool)
+        self.paper_ids = np.array([(payload or {}).get("metadata", {}).get("paper_id", "") for payload in self.payloads],
+                                  dtype=object)
+        self._matrices = {}
+
+    def vector_path(self, vector_name: str) -> Path:
+        return self.directory / f"{vector_name}.f32"
+
+    def matrix(self, vector_name: str) -> np.ndarray:
+        if vector_name not in self._matrices:
+            size = self.vector_sizes[vector_name]
+            if not self.ids:
+                self._matrices[vector_name] = np.empty((0, size), dtype=np.float32)
+            else:
+                self._matrices[vector_name] = np.memmap(self.vector_path(vector_name), dtype=np.float32, mode="r",
+                                                        shape=(len(self.ids), size))
+        return self._matrices[vector_name]
+
+    def snapshot(self, vector_name: str) -> tuple:
+        """
+        Returns (matrix, alive mask, ids, payloads) as of now. Later upserts append rows past the snapshot's
+        matrix and replace the containers instead of changing them, and compaction writes a new file, so the
+        snapshot can be searched without holding the index lock.
+        """
+        return self.matrix(vector_name), self.alive, self.ids, self.payloads
+
+    def upsert(self, points: List[dict]):
+        """
+        Appends the points as new rows. A point that already exists leaves its old row behind as a deleted one,
+        so no vector is overwritten while a snapshot of it may still be searched.
+        """
+        points = list({point["id"]: point for point in points}.values())
+        replaced_rows = [self.rows[point["id"]] for point in points if point["id"] in self.rows]
+        self._matrices = {}
+        for vector_name in self.vector_sizes:
+            with open(self.vector_path(vector_name), "ab") as f:
+                f.write(np.asarray([self._normalize(point["vector"][vector_name]) for point in points],
+                                   dtype=np.float32).tobytes())
+        ids, payloads = list(self.ids), list(self.payloads)
+        entries = []
+        if replaced_rows:
+            for row in replaced_rows:
+                ids[row] = None
+                payloads[row] = None
+            entries.append({"delete": replaced_rows})
+        for point in points:
+            entries.append({"row": len(ids), "id": point["id"], "payload": point.get("payload", {})})
+            ids.append(point["id"])
+            payloads.append(point.get("payload", {}))
+        self.ids, self.payloads = ids, payloads
+        self._reindex()
+        if (~self.alive).sum() > len(self.ids) // 2:
+            self.compact()
+        else:
+            self._append_log(entries)
+
+    def delete_papers(self, paper_ids: List[str], keep_point_ids: Sequence[str] = ()) -> int:
+        mask = self.alive & np.isin(self.paper_ids, list(paper_ids))
+        keep_rows = [self.rows[point_id] for point_id in keep_point_ids if point_id in self.rows]
+        mask[keep_rows] = False
+        deleted_rows = np.flatnonzero(mask)
+        if not len(deleted_rows):
+            return 0
+        ids, payloads = list(self.ids), list(self.payloads)
+        for row in deleted_rows:
+            ids[row] = None
+            payloads[row] = None
+        self.ids, self.payloads = ids, payloads
+        self._reindex()
+        if (~self.alive).sum() > len(self.ids) // 2:
+            self.compact()
+        else:
+            self._append_log([{"delete": deleted_rows.tolist()}])
+        return len(deleted_rows)
+
+    def compact(self):
+        """Rewrites the vector files without the rows of deleted points."""
+        keep = np.flatnonzero(self.alive)
+        for vector_name in self.vector_sizes:
+            matrix = self.matrix(vector_name)
+            tmp_path = self.vector_path(vector_name).with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(np.asarray(matrix[keep], dtype=np.float32).tobytes())
+            self._matrices = {}
+            os.replace(tmp_path, self.vector_path(vector_name))
+        self.ids = [self.ids[row] for row in keep]
+        self.payloads = [self.payloads[row] for row in keep]
+        self._reindex()
+        self.save()
+
+    def save(self):
+        """Writes all points to `points.json` and clears the change log."""
+        points_path = self.directory / "points.json"
+        tmp_path = points_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"vector_sizes": self.vector_sizes, "ids": self.ids, "payloads": self.payloads}, f)
+        os.replace(tmp_path, points_path)
+        self.log_path.unlink(missing_ok=True)
+        self.log_entries = 0
+
+    @staticmethod
+    def search(snapshot: tuple, query_vectors: np.ndarray, top_k: int,
+               row_masks: Optional[List[np.ndarray]] = None) -> List[List[dict]]:
+        """
+        Scores all rows of a `snapshot` against all queries with one matrix product and returns the top-k
+        documents per query. Rows outside a query's mask (and deleted rows) are excluded.
+        """
+        matrix, alive, ids, payloads = snapshot
+        if matrix.shape[0] == 0:
+            return [[] for _ in query_vectors]
+        queries = np.asarray([EmbeddedCollection._normalize(vector) for vector in query_vectors], dtype=np.float32)
+        scores = queries @ matrix.T
+        scores[:, ~alive] = -np.inf
+        results = []
+        for query_idx, query_scores in enumerate(scores):
+            if row_masks is not None:
+                query_scores[~row_masks[query_idx]] = -np.inf
+            k = min(top_k, int(np.isfinite(query_scores).sum()))
+            if k == 0:
+                results.append([])
+                continue
+            top_rows = np.argpartition(-query_scores, k - 1)[:k]
+            top_rows = top_rows[np.argsort(-query_scores[top_rows])]
+            results.append([{"id": ids[row],
+                             "content": payloads[row].get("page_content", ""),
+                             "metadata": payloads[row].get("metadata", {}),
+                             "score": float(query_scores[row])}
+                            for row in top_rows])
+        return results
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+
+class NumpyIndex(BaseVectorIndex):
+    """
+    Embedded vector index that keeps every collection in a local directory and answers queries in-process
+    with a vectorized matrix product over memory-mapped, normalized vectors (exact cosine search).
+    Meant for local runs, tests and small deployments that should not depend on a Qdrant service.
+    """
+
+    def __init__(self, embedding_model_name: str, index_dir: Optional[str] = None):
+        """
+        Args:
+            embedding_model_name (str): Name of the SentenceTransformer model for embeddings.
+            index_dir (Optional[str]): Directory holding the collections, defaults to
+                `ConfigManager().embedded_index_dir`.
+        """
+        super().__init__(embedding_model_name)
+        self.index_dir = Path(index_dir or ConfigManager().embedded_index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._collections = {}
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self._collections or (self.index_dir / collection_name / "points.json").exists()
+
+    def _collection(self, collection_name: str) -> EmbeddedCollection:
+        if collection_name not in self._collections:
+            if not self.collection_exists(collection_name):
+                raise ValueError(f"Collection '{collection_name}' does not exist.")
+            self._collections[collection_name] = EmbeddedCollection(self.index_dir / collection_name, {})
+        return self._collections[collection_name]
+
+    def create_collection_if_not_exists(self, collection_name: str,
+                                        vector_names: Sequence[str] = ("default", "summary")):
+        with self._lock:
+            if self.collection_exists(collection_name):
+                logger.info(f"Collection '{collection_name}' already exists. Skipping creation.")
+                return
+            vector_sizes = {"default": self.vector_size, "summary": self.summary_vector_size}
+            collection = EmbeddedCollection(self.index_dir / collection_name,
+                                            {name: vector_sizes[name] for name in vector_names})
+            collection.save()
+            self._collections[collection_name] = collection
+            logger.info(f"Collection '{collection_name}' created with vectors: {list(vector_names)}.")
+
+    def upload_points(self, collection_name: str, points: List[dict], batch_size: int = 100,
+                      vector_names: Sequence[str] = ("default", "summary")):
+        """
+        Upserts points into a collection. Points without an "id" get one derived from their payload's
+        paper ID and chunk index. `batch_size` is accepted for interface compatibility; all points are
+        written at once.
+        """
+        self.create_collection_if_not_exists(collection_name, vector_names)
+        for point in points:
+            if point.get("id") is None:
+                metadata = point["payload"]["metadata"]
+                point["id"] = make_point_id(metadata["paper_id"], metadata["chunk_index"])
+        if not points:
+            logger.info("No points to upload.")
+            return
+        with self._lock:
+            self._collection(collection_name).upsert(points)
+        logger.info(f"Uploaded total {len(points)} points to collection '{collection_name}'.")
+
+    def delete_paper_points(self, collection_name: str, paper_ids: List[str],
+                            keep_point_ids: Optional[Sequence[str]] = None):
+        if not paper_ids or not self.collection_exists(collection_name):
+            return
+        with self._lock:
+            self._collection(collection_name).delete_papers(paper_ids, keep_point_ids or ())
+        logger.info(f"Deleted points of {len(paper_ids)} papers from collection '{collection_name}'.")
+
+    def has_paper_collection(self, collection_name: str) -> bool:
+        return self.collection_exists(paper_collection_name(collection_name))
+
+    def scroll_vectors(self, collection_name: str, vector_name: str, batch_size: int = 256):
+        with self._lock:
+            collection = self._collection(collection_name)
+            matrix = collection.matrix(vector_name)
+            rows = np.flatnonzero(collection.alive)
+            payloads = collection.payloads
+        for row in rows:
+            yield payloads[row], matrix[row].tolist()
+
+    def retrieve_vectors(self, collection_name: str, point_ids: List[str],
+                         vector_name: str = "default") -> Dict[str, List[float]]:
+        with self._lock:
+            collection = self._collection(collection_name)
+            matrix = collection.matrix(vector_name)
+            return {point_id: matrix[collection.rows[point_id]].tolist()
+                    for point_id in point_ids if point_id in collection.rows}
+
+    def query_collection(self, collection_name: str, query: str, top_k: int = 3,
+                         search_type: str = "default") -> List[dict]:
+        return self._search(collection_name, self._vector_field(search_type), [self.encode_query(query)], top_k)[0]
+
+    def query_collection_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                               search_type: str = "default") -> List[List[dict]]:
+        if not queries:
+            return []
+        return self._search(collection_name, self._vector_field(search_type), self.encode_queries(queries), top_k)
+
+    def query_two_stage(self, collection_name: str, query: str, top_k: int = 3,
+                        paper_top_k: Optional[int] = None) -> List[dict]:
+        return self.query_two_stage_batch(collection_name, [query], top_k, paper_top_k)[0]
+
+    def query_two_stage_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                              paper_top_k: Optional[int] = None) -> List[List[dict]]:
+        """
+        Selects the closest papers of every query in the paper-level collection, then searches the chunk
+        collection with one matrix product, masking out the chunks of all other papers per query.
+        """
+        if not queries:
+            return []
+        if not self.has_paper_collection(collection_name):
+            return self.query_collection_batch(collection_name, queries, top_k=top_k)
+        query_vectors = self.encode_queries(queries)
+        papers = self._search(paper_collection_name(collection_name), "summary", query_vectors,
+                              paper_top_k or ConfigManager().paper_top_k)
+        # The masks index rows of the chunk snapshot, so both are taken together.
+        with self._lock:
+            collection = self._collection(collection_name)
+            snapshot, chunk_paper_ids = collection.snapshot("default"), collection.paper_ids
+        row_masks = [np.isin(chunk_paper_ids, [paper["metadata"]["paper_id"] for paper in query_papers])
+                     for query_papers in papers]
+        chunks = EmbeddedCollection.search(snapshot, np.asarray(query_vectors, dtype=np.float32), top_k, row_masks)
+        return [self._join_papers(query_chunks, query_papers) for query_chunks, query_papers in zip(chunks, papers)]
+
+    def _search(self, collection_name: str, vector_name: str, query_vectors: List[List[float]], top_k: int,
+                row_masks: Optional[List[np.ndarray]] = None) -> List[List[dict]]:
+        # Only taking the snapshot needs the lock; scoring runs concurrently with other searches and uploads.
+        with self._lock:
+            snapshot = self._collection(collection_name).snapshot(vector_name)
+        return EmbeddedCollection.search(snapshot, np.asarray(query_vectors, dtype=np.float32), top_k, row_masks)
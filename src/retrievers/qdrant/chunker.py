@@ -1,7 +1,9 @@
 import re
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 from loguru import logger
 
+HEADER_REGEX = re.compile(r'^(#{1,3}\s+)', re.MULTILINE)
+
 
 class TextChunker:
     @staticmethod
@@ -74,4 +76,202 @@ class TextChunker:
                 chunks.append(current_chunk)
                 current_chunk = ""
                 chunks.append(section)
-        return chunks
\ No newline at end of file
+        return chunks
+
+    @staticmethod
+    def chunk_blocks(blocks: List[dict], max_tokens: Optional[int] = None, merge_margin: int = 50,
+                     token_counter: Optional["TokenCounter"] = None, overlap: Optional[int] = None) -> List[dict]:
+        """
+        Chunks a structured Docling document (see `src.preprocessors.docling_cache.document_to_blocks`)
+        without going through markdown. Blocks are grouped into sections at section headers, small sections
+        are merged and oversized ones are split with overlap, like `header_aware_chunking`.
+
+        Tokens are counted with the `token_counter` (whitespace words by default) and chunks hold at most
+        `max_tokens` tokens (the counter's `max_length` by default) plus `merge_margin`, so passing the
+        embedding model's `TokenCounter` with `merge_margin=0` keeps every chunk within the model's limit,
+        like `StreamingChunker`.
+
+        Returns a list of chunk dicts with the chunk "text", the "section" heading it starts in and the
+        "pages" it covers.
+        """
+        token_counter = token_counter or TokenCounter()
+        max_tokens = max_tokens or token_counter.max_length
+        overlap = overlap if overlap is not None else max_tokens // 4
+        block_tokens = token_counter.count([block["text"] for block in blocks]) if blocks else []
+
+        sections = []
+        for block, tokens in zip(blocks, block_tokens):
+            is_header = block["type"] in ("title", "section_header")
+            if is_header or not sections:
+                # A document that does not start with a header gets an untitled first section, even if its
+                # first block is a table or picture.
+                sections.append({"section": block["text"] if is_header else "", "parts": [],
+                                 "pages": [], "tokens": 0})
+            section = sections[-1]
+            section["parts"].append(block["text"])
+            section["tokens"] += tokens
+            if block.get("page") is not None and block["page"] not in section["pages"]:
+                section["pages"].append(block["page"])
+
+        chunks = []
+        current = None
+        for section in sections:
+            text = "\n\n".join(section["parts"])
+            if current is not None and current["tokens"] + section["tokens"] <= max_tokens + merge_margin:
+                current["text"] += "\n\n" + text
+                current["tokens"] += section["tokens"]
+                current["pages"].extend(page for page in section["pages"] if page not in current["pages"])
+                continue
+            if current is not None:
+                chunks.append(current)
+                current = None
+            if section["tokens"] > max_tokens + merge_margin:
+                # Cut the windows at token boundaries of the section text, so no window exceeds `max_tokens`.
+                offsets = token_counter.offsets([text])[0]
+                step = max(1, max_tokens - overlap)
+                for window_start in range(0, len(offsets), step):
+                    window_end = min(window_start + max_tokens, len(offsets))
+                    chunks.append({"text": text[offsets[window_start][0]:offsets[window_end - 1][1]],
+                                   "section": section["section"], "pages": list(section["pages"])})
+                    if window_end == len(offsets):
+                        break
+            else:
+                current = {"text": text, "section": section["section"], "pages": list(section["pages"]),
+                           "tokens": section["tokens"]}
+        if current is not None:
+            chunks.append(current)
+        for chunk in chunks:
+            chunk.pop("tokens", None)
+        return chunks
+
+
+class TokenCounter:
+    """
+    Batched length function in the tokens of an embedding model's tokenizer. Besides the token counts it
+    returns each token's character offsets, so chunks can be cut at token boundaries of the source text.
+    Without a tokenizer, whitespace-separated words are counted, like `TextChunker.count_tokens`.
+    """
+
+    def __init__(self, tokenizer=None, max_length: int = 1024):
+        self.tokenizer = tokenizer if tokenizer is not None and getattr(tokenizer, "is_fast", False) else None
+        if tokenizer is not None and self.tokenizer is None:
+            logger.warning("Tokenizer does not provide offset mappings, counting whitespace words instead.")
+        self.max_length = max_length
+
+    @classmethod
+    def from_sentence_transformer(cls, model) -> "TokenCounter":
+        """
+        Counts tokens with the tokenizer of a SentenceTransformer model. The maximum chunk length is the
+        model's sequence limit minus the special tokens added at encoding time, so no chunk is truncated.
+        """
+        num_special_tokens = model.tokenizer.num_special_tokens_to_add(pair=False)
+        return cls(model.tokenizer, max_length=model.max_seq_length - num_special_tokens)
+
+    def offsets(self, texts: List[str]) -> List[List[Tuple[int, int]]]:
+        """Returns the (start, end) character offsets of the tokens of every text, tokenized in one batch."""
+        if self.tokenizer is None:
+            return [[match.span() for match in re.finditer(r"\S+", text)] for text in texts]
+        encoded = self.tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True,
+                                 return_attention_mask=False, return_token_type_ids=False, verbose=False)
+        return [[tuple(offset) for offset in offsets] for offsets in encoded["offset_mapping"]]
+
+    def count(self, texts: List[str]) -> List[int]:
+        if self.tokenizer is None:
+            return [len(text.split()) for text in texts]
+        return [len(offsets) for offsets in self.offsets(texts)]
+
+
+class StreamingChunker:
+    """
+    Single-pass, header-aware chunker that emits chunks as character spans of the source text.
+
+    The text is split at markdown headers (1-3 '#'), sections are tokenized in batches with a `TokenCounter`,
+    consecutive sections are merged while they fit into `max_tokens`, and oversized sections are split into
+    overlapping windows at token boundaries. Every section is tokenized exactly once and merged chunks are
+    never re-counted, so chunking is linear in the length of the text.
+    """
+
+    def __init__(self, token_counter: Optional[TokenCounter] = None, max_tokens: Optional[int] = None,
+                 overlap: Optional[int] = None, merge_margin: int = 0, batch_size: int = 64):
+        self.token_counter = token_counter or TokenCounter()
+        self.max_tokens = max_tokens or self.token_counter.max_length
+        self.overlap = overlap if overlap is not None else self.max_tokens // 4
+        self.merge_margin = merge_margin
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _iter_sections(text: str) -> Iterator[Tuple[int, int]]:
+        """Yields the (start, end) offsets of the header-delimited sections, without surrounding whitespace."""
+        boundaries = [match.start() for match in HEADER_REGEX.finditer(text)]
+        starts = [0] + [boundary for boundary in boundaries if boundary != 0]
+        for start, end in zip(starts, starts[1:] + [len(text)]):
+            section = text[start:end]
+            stripped = section.strip()
+            if stripped:
+                leading = len(section) - len(section.lstrip())
+                yield start + leading, start + leading + len(stripped)
+
+    def _iter_tokenized_sections(self, text: str) -> Iterator[Tuple[int, int, int, Optional[List[Tuple[int, int]]]]]:
+        batch = []
+        for span in self._iter_sections(text):
+            batch.append(span)
+            if len(batch) == self.batch_size:
+                yield from self._tokenize_batch(text, batch)
+                batch = []
+        if batch:
+            yield from self._tokenize_batch(text, batch)
+
+    def _tokenize_batch(self, text: str, spans: List[Tuple[int, int]]):
+        """
+        Yields every section with its token count and token offsets. Word offsets are cheap to recompute,
+        so without a model tokenizer they are left out here and only computed for oversized sections.
+        """
+        sections = [text[start:end] for start, end in spans]
+        if self.token_counter.tokenizer is None:
+            counts, offsets = self.token_counter.count(sections), [None] * len(sections)
+        else:
+            offsets = self.token_counter.offsets(sections)
+            counts = [len(section_offsets) for section_offsets in offsets]
+        for (start, end), count, section_offsets in zip(spans, counts, offsets):
+            yield start, end, count, section_offsets
+
+    def _split_section(self, start: int, offsets: List[Tuple[int, int]]) -> Iterator[dict]:
+        step = max(1, self.max_tokens - self.overlap)
+        for window_start in range(0, len(offsets), step):
+            window_end = min(window_start + self.max_tokens, len(offsets))
+            yield {"char_start": start + offsets[window_start][0], "char_end": start + offsets[window_end - 1][1],
+                   "tokens": window_end - window_start}
+            if window_end == len(offsets):
+                break
+
+    def iter_spans(self, text: str) -> Iterator[dict]:
+        """
+        Lazily yields chunk spans of `text` as dicts with "char_start", "char_end" and the number of "tokens".
+        """
+        current = None
+        for start, end, count, offsets in self._iter_tokenized_sections(text):
+            if not count:
+                continue
+            if current is not None and current["tokens"] + count <= self.max_tokens + self.merge_margin:
+                current["char_end"] = end
+                current["tokens"] += count
+                continue
+            if current is not None:
+                yield current
+                current = None
+            if count > self.max_tokens + self.merge_margin:
+                if offsets is None:
+                    offsets = self.token_counter.offsets([text[start:end]])[0]
+                yield from self._split_section(start, offsets)
+            else:
+                current = {"char_start": start, "char_end": end, "tokens": count}
+        if current is not None:
+            yield current
+
+    def iter_chunks(self, text: str) -> Iterator[dict]:
+        """Lazily yields chunk dicts holding the chunk "text" and its span in the source text."""
+        for span in self.iter_spans(text):
+            yield {"text": text[span["char_start"]:span["char_end"]], **span}
+
+    def chunk(self, text: str) -> List[dict]:
+        return list(self.iter_chunks(text))
@@ -0,0 +1,246 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+from loguru import logger
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of text embeddings for a single embedding model.
+
+    Vectors are appended as rows of a raw float32 file (`vectors.f32`) that is memory-mapped for reads,
+    and a small SQLite index maps sha256(text) to its row and last access time. When the cache grows
+    past `max_entries`, the least recently used entries are evicted and the vector file is compacted.
+    Compaction writes a new vector file and switches the index to it in one SQLite transaction, which also
+    records the name of the current vector file, so a crash leaves either the old or the new state.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, vector_size: int, max_entries: int = 500_000):
+        """
+        Args:
+            cache_dir (str): Root directory of the cache. Every model gets its own sub-directory.
+            model_name (str): Name of the embedding model, part of the cache key.
+            vector_size (int): Dimension of the vectors produced by the model.
+            max_entries (int): Maximum number of cached vectors before eviction kicks in.
+        """
+        self.model_name = model_name
+        self.vector_size = vector_size
+        self.max_entries = max_entries
+        self.directory = Path(cache_dir) / model_name.replace("/", "__")
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._connection = sqlite3.connect(self.directory / "index.sqlite", check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._connection.commit()
+        stored = self._connection.execute("SELECT value FROM meta WHERE name = 'vectors_file'").fetchone()
+        self.vectors_path = self.directory / (stored[0] if stored else "vectors.f32")
+        self.vectors_path.touch(exist_ok=True)
+        # Vector files of a compaction that crashed before switching the index over are not referenced.
+        for path in self.directory.glob("vectors*.f32"):
+            if path != self.vectors_path:
+                path.unlink(missing_ok=True)
+
+        # Access times of cache hits, written to SQLite in batches instead of one write transaction per lookup.
+        self._pending_touches = {}
+        self.touch_flush_size = 1000
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _row_count(self) -> int:
+        return os.path.getsize(self.vectors_path) // (self.vector_size * 4)
+
+    def _vectors(self) -> Optional[np.memmap]:
+        rows = self._row_count()
+        if rows == 0:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.vector_size))
+        return self._matrix
+
+    def _lookup_rows(self, keys: List[str]) -> dict:
+        rows = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(unique_keys), 500):
+            batch = unique_keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            cursor = self._connection.execute(f"SELECT key, row FROM entries WHERE key IN ({placeholders})", batch)
+            rows.update(cursor.fetchall())
+        return rows
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Returns the cached vector for every text, or None for texts that are not cached.
+        """
+        keys = [self.text_key(text) for text in texts]
+        with self._lock:
+            rows = self._lookup_rows(keys)
+            matrix = self._vectors()
+            results = [np.array(matrix[rows[key]]) if key in rows else None for key in keys]
+            now = time.time()
+            self._pending_touches.update((key, now) for key in rows)
+            if len(self._pending_touches) >= self.touch_flush_size:
+                self._flush_touches()
+                self._connection.commit()
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, texts: List[str], vectors: np.ndarray) -> None:
+        """
+        Stores vectors for the given texts. Texts that are already cached are skipped.
+        """
+        keys = [self.text_key(text) for text in texts]
+        with self._lock:
+            existing = self._lookup_rows(keys)
+            new_entries = {}
+            for key, vector in zip(keys, vectors):
+                if key not in existing and key not in new_entries:
+                    new_entries[key] = vector
+            if not new_entries:
+                return
+            first_row = self._row_count()
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.asarray(list(new_entries.values()), dtype=np.float32).tobytes())
+            now = time.time()
+            self._connection.executemany(
+                "INSERT INTO entries (key, row, last_used) VALUES (?, ?, ?)",
+                [(key, first_row + offset, now) for offset, key in enumerate(new_entries)]
+            )
+            self._flush_touches()
+            self._connection.commit()
+            self._evict_if_needed()
+
+    def flush(self) -> None:
+        """Writes the access times of recent cache hits to SQLite."""
+        with self._lock:
+            self._flush_touches()
+            self._connection.commit()
+
+    def _flush_touches(self) -> None:
+        if self._pending_touches:
+            self._connection.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                         [(now, key) for key, now in self._pending_touches.items()])
+            self._pending_touches.clear()
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Returns embeddings for `texts`, calling `encode_fn` only for the unique texts missing from the cache.
+        """
+        cached = self.get_many(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            encoded = encode_fn(missing)
+            self.put_many(missing, encoded)
+            encoded_by_text = dict(zip(missing, encoded))
+            cached = [vector if vector is not None else encoded_by_text[text] for text, vector in zip(texts, cached)]
+        return np.asarray(cached, dtype=np.float32).reshape(len(texts), self.vector_size)
+
+    def _evict_if_needed(self) -> None:
+        count = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Evict down to 90% of the limit so that compaction does not run on every insert.
+        self._flush_touches()
+        keep = int(self.max_entries * 0.9)
+        kept = self._connection.execute(
+            "SELECT key, row, last_used FROM entries ORDER BY last_used DESC LIMIT ?", (keep,)
+        ).fetchall()
+        matrix = self._vectors()
+        new_path = self.directory / f"vectors.{time.time_ns()}.f32"
+        with open(new_path, "wb") as f:
+            for i in range(0, len(kept), 10_000):
+                rows = [row for _, row, _ in kept[i:i + 10_000]]
+                f.write(np.asarray(matrix[rows], dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        # The rewritten rows and the switch to the new vector file commit together; entries keep their access
+        # times, so the LRU order survives compaction.
+        self._connection.execute("DELETE FROM entries")
+        self._connection.executemany("INSERT INTO entries (key, row, last_used) VALUES (?, ?, ?)",
+                                     [(key, new_row, last_used) for new_row, (key, _, last_used) in enumerate(kept)])
+        self._connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('vectors_file', ?)",
+                                 (new_path.name,))
+        self._connection.commit()
+        old_path, self.vectors_path, self._matrix = self.vectors_path, new_path, None
+        old_path.unlink(missing_ok=True)
+        self.evictions += count - len(kept)
+        logger.info(f"Embedding cache for '{self.model_name}' evicted {count - len(kept)} entries.")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": os.path.getsize(self.vectors_path),
+        }
+
+
+class QueryEmbeddingLRU:
+    """
+    Bounded in-memory LRU cache of query embeddings keyed by embedding model name and normalized query text.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.split())
+
+    def get(self, model_name: str, query: str) -> Optional[List[float]]:
+        key = (model_name, self.normalize(query))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_name: str, query: str, vector: List[float]) -> None:
+        key = (model_name, self.normalize(query))
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,21 +1,102 @@
+import asyncio
 import os
-from typing import List
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
 
 from loguru import logger
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import VectorParams, Distance
-from sentence_transformers import SentenceTransformer
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.http.models import VectorParams, Distance, PayloadSchemaType, FilterSelector, Filter, \
+    FieldCondition, MatchAny, QueryRequest, HnswConfigDiff, ScalarQuantization, ScalarQuantizationConfig, \
+    ScalarType, BinaryQuantization, BinaryQuantizationConfig, SearchParams, QuantizationSearchParams, \
+    VectorParamsDiff, SparseVectorParams, Modifier, SparseVector, Prefetch, FusionQuery, Fusion, HasIdCondition, \
+    Disabled
 
 from src.config.config_manager import ConfigManager
-from src.config.model_loader import model_loader
+from src.retrievers.base_index import BaseVectorIndex, PAPER_COLLECTION_SUFFIX, PAPER_ID_FIELD, make_point_id, \
+    paper_collection_name
+from src.retrievers.sparse_encoder import SPARSE_VECTOR_NAME
 
 load_dotenv()
 
+_registry_lock = threading.Lock()
+_clients = {}
+_async_clients = {}
+_indexes = {}
 
 
-class QdrantIndex:
-    def __init__(self, embedding_model_name: str, cohere_top_n: int = 4):
+def quantization_config():
+    """
+    Builds the quantization config selected by `ConfigManager().vector_quantization`:
+    "scalar" (int8, 4x smaller), "binary" (1 bit per dimension, 32x smaller) or None.
+    """
+    config = ConfigManager()
+    if config.vector_quantization == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99,
+                                                                  always_ram=config.quantization_always_ram))
+    if config.vector_quantization == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=config.quantization_always_ram))
+    if config.vector_quantization is not None:
+        logger.error(f"Unknown vector_quantization '{config.vector_quantization}'. Storing vectors unquantized.")
+    return None
+
+
+def hnsw_config() -> HnswConfigDiff:
+    return HnswConfigDiff(m=ConfigManager().hnsw_m, ef_construct=ConfigManager().hnsw_ef_construct)
+
+
+def search_params(exact: bool = False) -> SearchParams:
+    """
+    Builds the query-time search parameters. With quantization, the quantized vectors are searched for
+    `quantization_oversampling` times more candidates, which are rescored with the original vectors.
+    """
+    config = ConfigManager()
+    quantization = None
+    if config.vector_quantization is not None:
+        quantization = QuantizationSearchParams(rescore=config.quantization_rescore,
+                                                oversampling=config.quantization_oversampling)
+    return SearchParams(hnsw_ef=config.hnsw_ef, exact=exact, quantization=quantization)
+
+
+def get_qdrant_client(url: str, api_key: str) -> QdrantClient:
+    """
+    Returns the process-wide QdrantClient for a Qdrant URL, creating it on first use.
+    The client keeps its HTTP connection pool, so all indexes pointing at the same URL share connections.
+    """
+    with _registry_lock:
+        if url not in _clients:
+            _clients[url] = QdrantClient(api_key=api_key, url=url)
+        return _clients[url]
+
+
+def get_async_qdrant_client(url: str, api_key: str) -> AsyncQdrantClient:
+    """
+    Returns the process-wide AsyncQdrantClient for a Qdrant URL, creating it on first use.
+    """
+    with _registry_lock:
+        if url not in _async_clients:
+            _async_clients[url] = AsyncQdrantClient(api_key=api_key, url=url)
+        return _async_clients[url]
+
+
+def get_qdrant_index(embedding_model_name: str) -> "QdrantIndex":
+    """
+    Returns the process-wide QdrantIndex for the configured Qdrant URL and the given embedding model.
+    Use this instead of instantiating QdrantIndex per query, so clients, models and caches are reused.
+    """
+    key = (os.getenv("QDRANT_URL"), embedding_model_name)
+    with _registry_lock:
+        index = _indexes.get(key)
+    if index is None:
+        index = QdrantIndex(embedding_model_name)
+        with _registry_lock:
+            index = _indexes.setdefault(key, index)
+    return index
+
+
+class QdrantIndex(BaseVectorIndex):
+    def __init__(self, embedding_model_name: str):
         """
         Initializes the QdrantIndex with a Qdrant client and a single embedding model.
         Both the default and summary embeddings will use the same model.
@@ -23,54 +104,82 @@ class QdrantIndex:
         Args:
             embedding_model_name (str): Name of the SentenceTransformer model for embeddings.
         """
-        self.client = QdrantClient(
-            api_key=os.getenv("QDRANT_API_KEY"),
-            url=os.getenv("QDRANT_URL")
-        )
-        self.embedding_model = model_loader.load_model(embedding_model_name, SentenceTransformer)
-        self.vector_size = self.embedding_model.get_sentence_embedding_dimension()
-        self.summary_embedding_model = self.embedding_model
-        self.cohere_top_n = cohere_top_n
-        self.summary_vector_size = self.vector_size
+        super().__init__(embedding_model_name)
+        self.client = get_qdrant_client(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
+        self.aclient = get_async_qdrant_client(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
+        self._paper_collections = {}
+        self._sparse_collections = {}
 
-    def create_collection_if_not_exists(self, collection_name: str):
+    def create_collection_if_not_exists(self, collection_name: str, vector_names: Sequence[str] = ("default", "summary")):
         """
         Creates a Qdrant collection if it doesn't already exist.
-        The collection is configured to store two named vectors:
+        By default the collection is configured to store two named vectors:
             - "default" for full text embeddings.
             - "summary" for summary embeddings.
+        In the "two_tier" layout chunk collections only store "default" and paper collections only "summary".
+
+        Quantization, on-disk storage of the original vectors and the HNSW graph parameters are taken from
+        the ConfigManager (`vector_quantization`, `vectors_on_disk`, `hnsw_m`, `hnsw_ef_construct`).
+        With `hybrid_search`, collections storing "default" also get the "bm25" sparse vector, whose
+        IDF weighting is applied by Qdrant.
         """
         if not self.client.collection_exists(collection_name):
-            vectors_config = {
-                "default": VectorParams(size=self.vector_size, distance=Distance.COSINE)
-            }
-            vectors_config["summary"] = VectorParams(size=self.summary_vector_size, distance=Distance.COSINE)
+            vector_sizes = {"default": self.vector_size, "summary": self.summary_vector_size}
+            vectors_config = {name: VectorParams(size=vector_sizes[name], distance=Distance.COSINE,
+                                                 on_disk=ConfigManager().vectors_on_disk)
+                              for name in vector_names}
+
+            sparse_vectors_config = None
+            if ConfigManager().hybrid_search and "default" in vector_names:
+                sparse_vectors_config = {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)}
 
-            self.client.create_collection(collection_name=collection_name, vectors_config=vectors_config)
+            self.client.create_collection(collection_name=collection_name, vectors_config=vectors_config,
+                                          sparse_vectors_config=sparse_vectors_config,
+                                          hnsw_config=hnsw_config(), quantization_config=quantization_config())
+            self.client.create_payload_index(collection_name=collection_name, field_name=PAPER_ID_FIELD,
+                                             field_schema=PayloadSchemaType.KEYWORD)
+            self._paper_collections.pop(collection_name.removesuffix(PAPER_COLLECTION_SUFFIX), None)
+            self._sparse_collections.pop(collection_name, None)
             logger.info(f"Collection '{collection_name}' created with vectors: {list(vectors_config.keys())}.")
         else:
             logger.info(f"Collection '{collection_name}' already exists. Skipping creation.")
 
-    def upload_points(self, collection_name: str, points: List[dict], batch_size: int = 100):
+    def update_storage_config(self, collection_name: str):
+        """
+        Applies the configured quantization, on-disk storage and HNSW parameters to an existing collection.
+        Qdrant rebuilds the affected segments in the background. With `vector_quantization=None`, existing
+        quantization is explicitly disabled, since an omitted quantization config leaves it unchanged.
+        """
+        info = self.client.get_collection(collection_name)
+        vector_names = list(info.config.params.vectors.keys())
+        self.client.update_collection(
+            collection_name=collection_name,
+            vectors_config={name: VectorParamsDiff(on_disk=ConfigManager().vectors_on_disk) for name in vector_names},
+            hnsw_config=hnsw_config(),
+            quantization_config=quantization_config() or Disabled.DISABLED,
+        )
+        logger.info(f"Updated storage config of collection '{collection_name}' "
+                    f"(quantization={ConfigManager().vector_quantization}, on_disk={ConfigManager().vectors_on_disk}).")
+
+    def upload_points(self, collection_name: str, points: List[dict], batch_size: int = 100,
+                      vector_names: Sequence[str] = ("default", "summary")):
         """
         Uploads points (embeddings with payload) to a Qdrant collection in batches.
+        Points are upserted under their deterministic IDs, so uploading the same paper twice is idempotent.
+        Points without an "id" get one derived from their payload's paper ID and chunk index.
 
         Args:
             collection_name (str): Name of the Qdrant collection.
             points (List[dict]): List of point dictionaries to upload.
             batch_size (int): Maximum number of points to send in a single upsert call.
+            vector_names (Sequence[str]): Named vectors of the collection, used if it has to be created.
         """
-        self.create_collection_if_not_exists(collection_name)
-
-        try:
-            count_response = self.client.count(collection_name=collection_name)
-            existing_count = count_response.count
-        except Exception as e:
-            logger.error(f"Error retrieving count for collection '{collection_name}': {e}")
-            existing_count = 0
+        self.create_collection_if_not_exists(collection_name, vector_names)
 
-        for idx, point in enumerate(points):
-            point['id'] = existing_count + idx + 1
+        for point in points:
+            if point.get("id") is None:
+                metadata = point["payload"]["metadata"]
+                point["id"] = make_point_id(metadata["paper_id"], metadata["chunk_index"])
 
         if points:
             total = len(points)
@@ -78,12 +187,97 @@ class QdrantIndex:
                 batch = points[i:i + batch_size]
                 self.client.upsert(collection_name=collection_name, points=batch)
                 logger.info(
-                    f"Uploaded batch {existing_count + i + 1} to {existing_count + i + len(batch)} of {total} points to collection '{collection_name}'.")
-            logger.info(
-                f"Uploaded total {total} points to collection '{collection_name}' (starting from {existing_count + 1}).")
+                    f"Uploaded points {i + 1} to {i + len(batch)} of {total} to collection '{collection_name}'.")
+            logger.info(f"Uploaded total {total} points to collection '{collection_name}'.")
         else:
             logger.info("No points to upload.")
 
+    def delete_paper_points(self, collection_name: str, paper_ids: List[str],
+                            keep_point_ids: Optional[Sequence[str]] = None):
+        """
+        Deletes all points that belong to the given papers from a Qdrant collection.
+
+        Args:
+            collection_name (str): Name of the Qdrant collection.
+            paper_ids (List[str]): IDs of the papers whose chunks should be removed.
+            keep_point_ids (Optional[Sequence[str]]): Points of these papers that are kept, e.g. the chunks
+                just re-uploaded for a changed paper, so that only its stale chunks are removed.
+        """
+        if not paper_ids or not self.client.collection_exists(collection_name):
+            return
+        must_not = [HasIdCondition(has_id=list(keep_point_ids))] if keep_point_ids else None
+        self.client.delete(
+            collection_name=collection_name,
+            points_selector=FilterSelector(
+                filter=Filter(must=[FieldCondition(key=PAPER_ID_FIELD, match=MatchAny(any=list(paper_ids)))],
+                              must_not=must_not)
+            )
+        )
+        logger.info(f"Deleted points of {len(paper_ids)} papers from collection '{collection_name}'.")
+
+    def has_paper_collection(self, collection_name: str) -> bool:
+        """
+        Returns whether the chunk collection has a paper-level collection, i.e. was ingested with the
+        "two_tier" layout. The answer is cached for `collection_info_ttl_seconds`.
+        """
+        return self._cached_collection_info(self._paper_collections, collection_name,
+                                            lambda: self.client.collection_exists(paper_collection_name(collection_name)))
+
+    def has_sparse_vectors(self, collection_name: str) -> bool:
+        """
+        Returns whether chunk searches in the collection run in hybrid mode: `hybrid_search` is enabled and
+        the collection stores "bm25" sparse vectors. The answer is cached for `collection_info_ttl_seconds`.
+        """
+        if not ConfigManager().hybrid_search:
+            return False
+
+        def load():
+            sparse_vectors = self.client.get_collection(collection_name).config.params.sparse_vectors or {}
+            return SPARSE_VECTOR_NAME in sparse_vectors
+
+        return self._cached_collection_info(self._sparse_collections, collection_name, load)
+
+    @staticmethod
+    def _cached_collection_info(cache: dict, collection_name: str, load):
+        """
+        Returns a per-collection property from `cache`, reloading it once it is older than
+        `ConfigManager().collection_info_ttl_seconds`, so collections created or changed by another
+        process are picked up.
+        """
+        entry = cache.get(collection_name)
+        if entry is None or time.monotonic() - entry[1] > ConfigManager().collection_info_ttl_seconds:
+            entry = cache[collection_name] = (load(), time.monotonic())
+        return entry[0]
+
+    def scroll_vectors(self, collection_name: str, vector_name: str, batch_size: int = 256):
+        """
+        Iterates over all points of a collection, yielding (payload, vector) pairs for one named vector.
+
+        Args:
+            collection_name (str): Name of the Qdrant collection.
+            vector_name (str): Name of the vector to fetch, e.g. "summary".
+            batch_size (int): Number of points fetched per scroll request.
+        """
+        offset = None
+        while True:
+            points, offset = self.client.scroll(collection_name=collection_name, limit=batch_size, offset=offset,
+                                                with_payload=True, with_vectors=[vector_name])
+            for point in points:
+                yield point.payload, point.vector[vector_name]
+            if offset is None:
+                break
+
+    def retrieve_vectors(self, collection_name: str, point_ids: List[str],
+                         vector_name: str = "default") -> Dict[str, List[float]]:
+        """
+        Fetches one named vector of the given points in a single request, returned by point ID.
+        """
+        if not point_ids:
+            return {}
+        points = self.client.retrieve(collection_name=collection_name, ids=list(point_ids), with_payload=False,
+                                      with_vectors=[vector_name])
+        return {str(point.id): point.vector[vector_name] for point in points}
+
     def query_collection(self, collection_name: str, query: str, top_k: int = 3, search_type: str = "default"):
         """
         Queries a Qdrant collection using the specified vector field.
@@ -94,36 +288,238 @@ class QdrantIndex:
             query (str): The query string.
             top_k (int): Number of top results to return.
             search_type (str): Either "default" for full text or "summary" for summary embeddings.
+                "default" searches are hybrid if the collection has sparse vectors (see `_search`).
 
         Returns:
-            List[dict]: A list of query result objects, reranked with the cohere client.
-        """
-        # Choose the appropriate vector field (both use the same model).
-        if search_type == "default":
-            vector_field = "default"
-            query_vector = self.embedding_model.encode(query).tolist()
-        elif search_type == "summary":
-            vector_field = "summary"
-            query_vector = self.summary_embedding_model.encode(query).tolist()
-        else:
-            logger.error(f"Unknown search_type '{search_type}'. Falling back to default.")
-            vector_field = "default"
-            query_vector = self.embedding_model.encode(query).tolist()
-
+            List[dict]: The documents closest to the query, best first. Reranking happens in the retrieval tools.
+        """
+        query_vector = self.encode_query(query)
         results = self.client.query_points(
             collection_name=collection_name,
-            query=query_vector,
-            limit=top_k,
-            with_payload=True,
-            using=vector_field
+            **self._search(collection_name, query, query_vector, top_k, search_type)
         )
 
-        document_list = [{"content": point.payload.get('page_content', ''),
-                          "metadata": point.payload.get('metadata', {}),
-                          "score": point.score}
-                         for point in results.points]
+        return self._to_documents(results.points)
+
+    def query_collection_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                               search_type: str = "default") -> List[List[dict]]:
+        """
+        Queries a Qdrant collection with several queries at once.
+        All queries are encoded in one batched forward pass and sent to Qdrant in a single
+        `query_batch_points` request.
+
+        Args:
+            collection_name (str): The target Qdrant collection.
+            queries (List[str]): The query strings.
+            top_k (int): Number of top results to return per query.
+            search_type (str): Either "default" for full text or "summary" for summary embeddings.
+
+        Returns:
+            List[List[dict]]: One list of documents per query, in the order of `queries`.
+        """
+        if not queries:
+            return []
+        requests = [QueryRequest(**self._search(collection_name, query, query_vector, top_k, search_type,
+                                                as_request=True))
+                    for query, query_vector in zip(queries, self.encode_queries(queries))]
+        responses = self.client.query_batch_points(collection_name=collection_name, requests=requests)
+        return [self._to_documents(response.points) for response in responses]
+
+    async def aquery_collection(self, collection_name: str, query: str, top_k: int = 3,
+                                search_type: str = "default") -> List[dict]:
+        """
+        Asynchronous variant of `query_collection`. The query is encoded in a worker thread
+        and the search is sent through the AsyncQdrantClient.
+        """
+        query_vector = await asyncio.to_thread(self.encode_query, query)
+        await asyncio.to_thread(self.has_sparse_vectors, collection_name)
+        results = await self.aclient.query_points(
+            collection_name=collection_name,
+            **self._search(collection_name, query, query_vector, top_k, search_type)
+        )
+        return self._to_documents(results.points)
+
+    async def aquery_collection_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                                      search_type: str = "default") -> List[List[dict]]:
+        """
+        Asynchronous variant of `query_collection_batch`.
+        """
+        if not queries:
+            return []
+        query_vectors = await asyncio.to_thread(self.encode_queries, queries)
+        await asyncio.to_thread(self.has_sparse_vectors, collection_name)
+        requests = [QueryRequest(**self._search(collection_name, query, query_vector, top_k, search_type,
+                                                as_request=True))
+                    for query, query_vector in zip(queries, query_vectors)]
+        responses = await self.aclient.query_batch_points(collection_name=collection_name, requests=requests)
+        return [self._to_documents(response.points) for response in responses]
+
+    def query_two_stage(self, collection_name: str, query: str, top_k: int = 3,
+                        paper_top_k: Optional[int] = None) -> List[dict]:
+        """
+        Coarse-to-fine query over the "two_tier" layout: the `paper_top_k` papers with the closest summaries
+        are selected from the paper-level collection, then the chunk collection is searched only within
+        those papers. The returned chunks carry the metadata of their paper.
+        Falls back to `query_collection` if the collection has no paper-level collection.
+
+        Args:
+            collection_name (str): The target chunk collection.
+            query (str): The query string.
+            top_k (int): Number of chunks to return.
+            paper_top_k (Optional[int]): Number of papers to search in, defaults to `ConfigManager().paper_top_k`.
+
+        Returns:
+            List[dict]: The top chunks of the selected papers.
+        """
+        if not self.has_paper_collection(collection_name):
+            return self.query_collection(collection_name, query, top_k=top_k)
+        query_vector = self.encode_query(query)
+        papers = self.client.query_points(**self._paper_query(collection_name, query_vector, paper_top_k)).points
+        if not papers:
+            return []
+        chunks = self.client.query_points(collection_name=collection_name,
+                                          **self._chunk_query(collection_name, query, query_vector, papers,
+                                                              top_k)).points
+        return self._join_points(chunks, papers)
+
+    def query_two_stage_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                              paper_top_k: Optional[int] = None) -> List[List[dict]]:
+        """
+        Batched variant of `query_two_stage`: both stages are sent as one `query_batch_points` request each.
+        """
+        if not queries:
+            return []
+        if not self.has_paper_collection(collection_name):
+            return self.query_collection_batch(collection_name, queries, top_k=top_k)
+        query_vectors = self.encode_queries(queries)
+        paper_requests = [QueryRequest(**self._paper_query(collection_name, query_vector, paper_top_k,
+                                                           as_request=True))
+                          for query_vector in query_vectors]
+        paper_responses = self.client.query_batch_points(collection_name=paper_collection_name(collection_name),
+                                                         requests=paper_requests)
+        chunk_requests, selected = self._chunk_requests(collection_name, queries, query_vectors, paper_responses,
+                                                        top_k)
+        chunk_responses = self.client.query_batch_points(collection_name=collection_name,
+                                                         requests=chunk_requests) if chunk_requests else []
+        return self._assemble_batch(selected, chunk_responses)
+
+    async def aquery_two_stage(self, collection_name: str, query: str, top_k: int = 3,
+                               paper_top_k: Optional[int] = None) -> List[dict]:
+        """
+        Asynchronous variant of `query_two_stage`.
+        """
+        if not await asyncio.to_thread(self.has_paper_collection, collection_name):
+            return await self.aquery_collection(collection_name, query, top_k=top_k)
+        query_vector = await asyncio.to_thread(self.encode_query, query)
+        await asyncio.to_thread(self.has_sparse_vectors, collection_name)
+        papers = (await self.aclient.query_points(**self._paper_query(collection_name, query_vector,
+                                                                      paper_top_k))).points
+        if not papers:
+            return []
+        chunks = (await self.aclient.query_points(collection_name=collection_name,
+                                                  **self._chunk_query(collection_name, query, query_vector,
+                                                                      papers, top_k))).points
+        return self._join_points(chunks, papers)
+
+    async def aquery_two_stage_batch(self, collection_name: str, queries: List[str], top_k: int = 3,
+                                     paper_top_k: Optional[int] = None) -> List[List[dict]]:
+        """
+        Asynchronous variant of `query_two_stage_batch`.
+        """
+        if not queries:
+            return []
+        if not await asyncio.to_thread(self.has_paper_collection, collection_name):
+            return await self.aquery_collection_batch(collection_name, queries, top_k=top_k)
+        query_vectors = await asyncio.to_thread(self.encode_queries, queries)
+        await asyncio.to_thread(self.has_sparse_vectors, collection_name)
+        paper_requests = [QueryRequest(**self._paper_query(collection_name, query_vector, paper_top_k,
+                                                           as_request=True))
+                          for query_vector in query_vectors]
+        paper_responses = await self.aclient.query_batch_points(
+            collection_name=paper_collection_name(collection_name), requests=paper_requests)
+        chunk_requests, selected = self._chunk_requests(collection_name, queries, query_vectors, paper_responses,
+                                                        top_k)
+        chunk_responses = await self.aclient.query_batch_points(collection_name=collection_name,
+                                                                requests=chunk_requests) if chunk_requests else []
+        return self._assemble_batch(selected, chunk_responses)
+
+    @staticmethod
+    def _paper_query(collection_name: str, query_vector: List[float], paper_top_k: Optional[int],
+                     as_request: bool = False) -> dict:
+        query = {"query": query_vector, "using": "summary", "limit": paper_top_k or ConfigManager().paper_top_k,
+                 "with_payload": True}
+        if as_request:
+            query["params"] = search_params()
+        else:
+            query["collection_name"] = paper_collection_name(collection_name)
+            query["search_params"] = search_params()
+        return query
+
+    def _search(self, collection_name: str, query: str, query_vector: List[float], top_k: int,
+                search_type: str = "default", query_filter: Optional[Filter] = None, as_request: bool = False) -> dict:
+        """
+        Builds the arguments of a search for `query_points` (or a `QueryRequest` if `as_request`).
+
+        Searches of the "default" vector in collections with sparse vectors are hybrid: the `top_k` times
+        `hybrid_prefetch_multiplier` best dense and BM25 candidates are prefetched and fused server-side
+        with Reciprocal Rank Fusion. All other searches are plain dense searches.
+        """
+        # query_points takes the filter as "query_filter" and the search params as "search_params",
+        # QueryRequest as "filter" and "params".
+        filter_key, params_key = ("filter", "params") if as_request else ("query_filter", "search_params")
+        vector_field = self._vector_field(search_type)
+        if vector_field == "default" and self.has_sparse_vectors(collection_name):
+            prefetch_limit = top_k * ConfigManager().hybrid_prefetch_multiplier
+            sparse_query = SparseVector(**self.sparse_encoder.encode_query(query))
+            return {
+                "prefetch": [
+                    Prefetch(query=query_vector, using="default", limit=prefetch_limit, filter=query_filter,
+                             params=search_params()),
+                    Prefetch(query=sparse_query, using=SPARSE_VECTOR_NAME, limit=prefetch_limit, filter=query_filter),
+                ],
+                "query": FusionQuery(fusion=Fusion.RRF),
+                "limit": top_k,
+                "with_payload": True,
+            }
+        return {"query": query_vector, "using": vector_field, "limit": top_k, "with_payload": True,
+                filter_key: query_filter, params_key: search_params()}
+
+    def _chunk_query(self, collection_name: str, query: str, query_vector: List[float], papers, top_k: int,
+                     as_request: bool = False) -> dict:
+        paper_ids = [paper.payload["metadata"]["paper_id"] for paper in papers]
+        paper_filter = Filter(must=[FieldCondition(key=PAPER_ID_FIELD, match=MatchAny(any=paper_ids))])
+        return self._search(collection_name, query, query_vector, top_k, query_filter=paper_filter,
+                            as_request=as_request)
+
+    def _chunk_requests(self, collection_name: str, queries: List[str], query_vectors: List[List[float]],
+                        paper_responses, top_k: int):
+        """
+        Builds the second-stage chunk requests of a batch. Queries for which no paper was found get no request.
+        Returns the requests and the selected papers of every query.
+        """
+        selected = [response.points for response in paper_responses]
+        requests = [QueryRequest(**self._chunk_query(collection_name, query, query_vector, papers, top_k,
+                                                     as_request=True))
+                    for query, query_vector, papers in zip(queries, query_vectors, selected) if papers]
+        return requests, selected
+
+    @staticmethod
+    def _assemble_batch(selected, chunk_responses) -> List[List[dict]]:
+        chunk_responses = iter(chunk_responses)
+        return [QdrantIndex._join_points(next(chunk_responses).points, papers) if papers else []
+                for papers in selected]
+
+    @staticmethod
+    def _join_points(chunks, papers) -> List[dict]:
+        return QdrantIndex._join_papers(QdrantIndex._to_documents(chunks), QdrantIndex._to_documents(papers))
 
-        return document_list
+    @staticmethod
+    def _to_documents(points) -> List[dict]:
+        return [{"id": str(point.id),
+                 "content": point.payload.get('page_content', ''),
+                 "metadata": point.payload.get('metadata', {}),
+                 "score": point.score}
+                for point in points]
 
 if __name__ == '__main__':
     # Example usage
@@ -0,0 +1,168 @@
+import random
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+from loguru import logger
+
+from src.config.config_manager import ConfigManager
+from src.retrievers.base_index import BaseVectorIndex, paper_collection_name
+from src.retrievers.vector_index import get_vector_index
+
+
+class EmbeddingTopicClassifier:
+    """
+    Routes a query to one of the predefined topics by comparing its embedding with per-topic centroids.
+    A topic centroid is the mean of the normalized summary vectors of the papers stored in the topic's
+    collection, so no extra model is loaded and routing costs a single query encoding. With the "two_tier"
+    layout the summary vectors are read from the paper-level collection, which holds one point per paper.
+    """
+
+    def __init__(self, index: BaseVectorIndex, topic_names: List[str]):
+        self.index = index
+        self.topic_names = topic_names
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._topics = []
+        self._centroids = None
+        self._built_at = None
+        self.fast_path_hits = 0
+        self.llm_fallbacks = 0
+        self.audits = 0
+        self.agreements = 0
+        self.disagreements = 0
+
+    def _build_centroids(self) -> tuple:
+        """
+        Scrolls the summary vectors of every topic and returns (topics, centroid matrix or None).
+        """
+        topics, centroids = [], []
+        for topic_name in self.topic_names:
+            collection_name = topic_name.replace(" ", "_")
+            try:
+                if self.index.has_paper_collection(collection_name):
+                    collection_name = paper_collection_name(collection_name)
+                vectors = {}
+                for payload, vector in self.index.scroll_vectors(collection_name, "summary"):
+                    paper_id = payload.get("metadata", {}).get("paper_id") or len(vectors)
+                    vectors[paper_id] = vector
+            except Exception as e:
+                logger.warning(f"Could not load summary vectors for topic '{topic_name}': {e}")
+                continue
+            if not vectors:
+                continue
+            matrix = np.asarray(list(vectors.values()), dtype=np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+            centroid = matrix.mean(axis=0)
+            topics.append(topic_name)
+            centroids.append(centroid / (np.linalg.norm(centroid) + 1e-12))
+        logger.info(f"Built topic centroids for {len(topics)} of {len(self.topic_names)} topics.")
+        return topics, np.asarray(centroids, dtype=np.float32) if centroids else None
+
+    def _is_stale(self) -> bool:
+        built_at = self._built_at
+        return built_at is None or time.monotonic() - built_at > ConfigManager().topic_centroid_refresh_seconds
+
+    def _ensure_centroids(self) -> tuple:
+        """
+        Returns the current (topics, centroids), rebuilding them first if they are stale. The centroids are built
+        without holding `self._lock` and swapped in afterwards; while a refresh is running, other threads keep
+        using the previous centroids and only wait if there are none yet.
+        """
+        if self._is_stale() and self._build_lock.acquire(blocking=self._built_at is None):
+            try:
+                if self._is_stale():
+                    topics, centroids = self._build_centroids()
+                    with self._lock:
+                        self._topics, self._centroids = topics, centroids
+                        self._built_at = time.monotonic()
+            finally:
+                self._build_lock.release()
+        with self._lock:
+            return self._topics, self._centroids
+
+    def predict(self, query: str) -> Optional[dict]:
+        """
+        Returns the closest topic with its similarity "margin" over the runner-up and whether the prediction is
+        "confident": the margin clears `topic_classifier_margin_threshold` and the similarity itself clears
+        `topic_classifier_min_similarity`, so that off-topic queries that are merely least far from one topic
+        go to the LLM. Returns None if no centroids are available.
+        """
+        try:
+            topics, centroids = self._ensure_centroids()
+            if centroids is None:
+                return None
+            query_vector = np.asarray(self.index.encode_query(query), dtype=np.float32)
+            query_vector /= np.linalg.norm(query_vector) + 1e-12
+            similarities = centroids @ query_vector
+        except Exception as e:
+            logger.warning(f"Topic classifier failed, falling back to the LLM: {e}")
+            return None
+        order = np.argsort(-similarities)
+        similarity = float(similarities[order[0]])
+        margin = similarity - float(similarities[order[1]]) if len(order) > 1 else similarity
+        config = ConfigManager()
+        return {
+            "topic": topics[order[0]],
+            "similarity": similarity,
+            "margin": margin,
+            "confident": margin >= config.topic_classifier_margin_threshold
+                         and similarity >= config.topic_classifier_min_similarity,
+        }
+
+    def accept(self, prediction: Optional[dict]) -> bool:
+        """
+        Decides whether a prediction is used directly. Confident predictions are accepted unless they
+        are sampled for an LLM audit (`topic_classifier_audit_rate`) to measure agreement.
+        """
+        if prediction is None or not prediction["confident"]:
+            return False
+        if random.random() < ConfigManager().topic_classifier_audit_rate:
+            with self._lock:
+                self.audits += 1
+            return False
+        with self._lock:
+            self.fast_path_hits += 1
+        return True
+
+    def record_llm_result(self, prediction: Optional[dict], llm_topic: str):
+        """
+        Records the topic chosen by the LLM and whether it agrees with the classifier's prediction.
+        """
+        with self._lock:
+            self.llm_fallbacks += 1
+            if prediction is None:
+                return
+            if prediction["topic"] == llm_topic:
+                self.agreements += 1
+            else:
+                self.disagreements += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            compared = self.agreements + self.disagreements
+            return {
+                "fast_path_hits": self.fast_path_hits,
+                "llm_fallbacks": self.llm_fallbacks,
+                "audits": self.audits,
+                "agreements": self.agreements,
+                "disagreements": self.disagreements,
+                "agreement_rate": self.agreements / compared if compared else None,
+            }
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_topic_classifier(topic_names: List[str]) -> EmbeddingTopicClassifier:
+    """
+    Returns the process-wide topic classifier, built on the shared vector index of the configured backend.
+    """
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = EmbeddingTopicClassifier(get_vector_index(ConfigManager().embedding_model_name),
+                                                   topic_names)
+        return _classifier
@@ -1,115 +1,403 @@
-import json
-import os.path
+import time
 from pathlib import Path
 from loguru import logger
 from dotenv import load_dotenv
-from typing import List
+from collections import Counter
+from typing import List, Optional, Tuple
 
+from src.catalog.paper_catalog import PaperCatalog, get_paper_catalog
 from src.config.config_manager import ConfigManager
-from src.retrievers.qdrant.chunker import TextChunker
-from src.retrievers.qdrant.qdrant_index import QdrantIndex
+from src.preprocessors.docling_cache import DoclingDocumentCache
+from src.retrievers.qdrant.chunker import StreamingChunker, TextChunker, TokenCounter
+from src.retrievers.base_index import BaseVectorIndex, make_paper_point_id, make_point_id, paper_collection_name
+from src.retrievers.sparse_encoder import SPARSE_VECTOR_NAME
+from src.retrievers.vector_index import get_vector_index
+from src.utils.hashing import file_sha256
 
 
 load_dotenv()
 
-def get_doc_metadata(doc_metadata, markdown_file: str) -> dict:
+CHUNK_METADATA_FIELDS = ("paper_id", "chunk_index", "section", "pages", "char_start", "char_end")
+
+def get_doc_metadata(catalog: PaperCatalog, markdown_file: Path) -> dict:
     """
-    Retrieves metadata for a given markdown file from the provided doc_metadata dictionary.
-    If the markdown file is not found in the metadata, returns an empty dictionary.
+    Retrieves metadata for a given markdown file from the paper catalog, where papers are keyed by
+    their arXiv ID (the markdown file name).
+    If the paper is not found in the catalog, returns an empty dictionary.
 
     Args:
-        doc_metadata (dict): Dictionary containing metadata for documents.
-        markdown_file (str): The name of the markdown file to retrieve metadata for.
+        catalog (PaperCatalog): Catalog holding the metadata of the scraped papers.
+        markdown_file (Path): The markdown file to retrieve metadata for.
 
     Returns:
         dict: Metadata for the markdown file or an empty dictionary if not found.
     """
-    doc_name = markdown_file.name.split(".md")[0]
-    for info in doc_metadata:
-        if info.get("pdf_url", "").endswith(doc_name):
-            return info
+    return catalog.get(markdown_file.stem) or {}
+
 
-def process_site_collection(collection_name: str, website_dirs: List[Path], uploader: QdrantIndex) -> None:
+def process_site_collection(collection_name: str, website_dirs: List[Path], uploader: BaseVectorIndex,
+                            catalog: PaperCatalog, batched: bool = False, batch_size: int = 64, num_workers: int = 0,
+                            incremental: bool = False,
+                            docling_cache: Optional[DoclingDocumentCache] = None) -> None:
     """
     Processes markdown files for a given site configuration by reading all markdown files from
-    the provided website directories and uploading the corresponding points to Qdrant.
+    the provided website directories and uploading the corresponding points to the vector index.
+
+    With `batched=True` the chunks of all markdown files are collected first and encoded together
+    in batches of `batch_size` (optionally on a multi-process pool of `num_workers` CPU workers),
+    instead of one forward pass per chunk.
+
+    Paper metadata is looked up in the `catalog`. With `incremental=True` only new or changed markdown
+    files are processed: the content hash each paper was indexed from is kept in the catalog per collection.
+    New points are upserted under their deterministic IDs first; only then are the leftover chunks of changed
+    papers and the points of removed papers deleted, so a failed run never leaves a paper without points.
+    Only papers that produced chunks are marked as ingested, the others are retried on the next run.
+
+    If a `docling_cache` is given, papers are chunked from their cached structured Docling document
+    instead of their markdown (see `chunk_paper`). Markdown is chunked with the `StreamingChunker` in the
+    embedding model's tokens if `ConfigManager().chunking_strategy` is "streaming".
+
+    If `ConfigManager().collection_layout` is "two_tier", chunks are always embedded in batches and stored
+    without paper metadata, while every paper's summary vector and metadata are stored once in the
+    paper-level collection (see `embed_two_tier_records`). Incremental runs also backfill the paper points
+    of unchanged ingested papers that are missing from the paper-level collection, e.g. because they were
+    ingested with the single-collection layout (see `backfill_paper_points`).
     """
     logger.info(f"Processing collection '{collection_name}' from directories: {website_dirs}")
+    two_tier = ConfigManager().collection_layout == "two_tier"
+    chunker = None
+    if ConfigManager().chunking_strategy == "streaming":
+        chunker = StreamingChunker(TokenCounter.from_sentence_transformer(uploader.embedding_model))
+
+    markdown_files = [file for website_dir in website_dirs for file in website_dir.rglob("*.md") if file.is_file()]
+    if incremental:
+        ingested_hashes = catalog.ingested_hashes(collection_name)
+        file_hashes = {file: file_sha256(file) for file in markdown_files}
+        current_papers = {file.stem for file in markdown_files}
+        removed_papers = [paper_id for paper_id in ingested_hashes if paper_id not in current_papers]
+        markdown_files = [file for file in markdown_files if ingested_hashes.get(file.stem) != file_hashes[file]]
+        logger.info(f"Incremental ingestion for '{collection_name}': {len(markdown_files)} new or changed files, "
+                    f"{len(removed_papers)} removed papers.")
+    # The chunk collection must exist before embedding: whether points carry sparse vectors depends on its config.
+    uploader.create_collection_if_not_exists(collection_name, ("default",) if two_tier else ("default", "summary"))
+    if ConfigManager().hybrid_search and not uploader.has_sparse_vectors(collection_name):
+        logger.warning(f"Collection '{collection_name}' stores no sparse vectors (unsupported by the backend or "
+                       f"created before hybrid_search was enabled), uploading dense vectors only.")
+    start_time = time.perf_counter()
+    paper_points = []
+    if two_tier:
+        records = []
+        for file in markdown_files:
+            records.extend(collect_markdown_chunks(file, catalog, docling_cache, chunker))
+        all_points, paper_points = embed_two_tier_records(records, uploader, batch_size=batch_size,
+                                                          num_workers=num_workers, collection_name=collection_name)
+        if incremental:
+            processed_papers = {file.stem for file in markdown_files}
+            unchanged_papers = [paper_id for paper_id in ingested_hashes
+                                if paper_id not in processed_papers and paper_id not in removed_papers]
+            paper_points.extend(backfill_paper_points(collection_name, unchanged_papers, uploader, catalog,
+                                                      batch_size=batch_size, num_workers=num_workers))
+    elif batched:
+        records = []
+        for file in markdown_files:
+            records.extend(collect_markdown_chunks(file, catalog, docling_cache, chunker))
+        all_points = embed_chunk_records(records, uploader, batch_size=batch_size, num_workers=num_workers,
+                                         collection_name=collection_name)
+    else:
+        all_points = []
+        for file in markdown_files:
+            all_points.extend(process_markdown_file(file, uploader, catalog, docling_cache, chunker,
+                                                    collection_name))
+    elapsed = time.perf_counter() - start_time
 
-    all_points = []
-    base_id = 0
-    with open(os.path.join(root_dir, sub_dirs, "pdfs_metadata.json"), 'r') as f:
-        pdfs_metadata = json.load(f)
-    # Process each directory found for this collection.
-    for website_dir in website_dirs:
-        for file in website_dir.rglob("*.md"):
-            if file.is_file():
-                points = process_markdown_file(file, uploader, base_id, pdfs_metadata)
-                base_id += 1
-                all_points.extend(points)
-
-    if all_points:
-        uploader.upload_points(collection_name, all_points)
+    if all_points or paper_points:
+        logger.info(f"Embedded {len(all_points)} chunks from {len(markdown_files)} files in {elapsed:.2f}s "
+                    f"({len(all_points) / max(elapsed, 1e-9):.1f} chunks/sec, batched={batched or two_tier}).")
+        if uploader.embedding_cache is not None:
+            uploader.embedding_cache.flush()
+            logger.info(f"Embedding cache stats: {uploader.embedding_cache.stats()}")
+        if two_tier:
+            uploader.upload_points(collection_name, all_points, vector_names=("default",))
+            uploader.upload_points(paper_collection_name(collection_name), paper_points, vector_names=("summary",))
+        else:
+            uploader.upload_points(collection_name, all_points)
         logger.info(f"Uploaded {len(all_points)} points for collection '{collection_name}'")
     else:
         logger.info(f"No markdown files processed for collection '{collection_name}'.")
 
+    if incremental:
+        chunk_counts = Counter(point["payload"]["metadata"]["paper_id"] for point in all_points)
+        # Changed papers that produced chunks lose the chunks beyond their new chunk count; papers that
+        # produced none (e.g. unreadable files) keep their old points and are retried.
+        changed_papers = [file.stem for file in markdown_files if file.stem in ingested_hashes and chunk_counts[file.stem]]
+        stale_papers = changed_papers + removed_papers
+        uploader.delete_paper_points(collection_name, stale_papers,
+                                     keep_point_ids=[point["id"] for point in all_points])
+        if two_tier:
+            uploader.delete_paper_points(paper_collection_name(collection_name), stale_papers,
+                                         keep_point_ids=[point["id"] for point in paper_points])
+        for file in markdown_files:
+            if chunk_counts[file.stem]:
+                catalog.mark_ingested(collection_name, file.stem, file_hashes[file], chunk_counts[file.stem])
+        for paper_id in removed_papers:
+            catalog.mark_not_ingested(collection_name, paper_id)
+
+
+def build_chunk_metadata(metadata, paper_id: str, chunk_index: int) -> dict:
+    """
+    Builds the payload metadata stored with a chunk of a paper from its catalog record.
+    """
+    return {
+        "paper_id": paper_id,
+        "chunk_index": chunk_index,
+        "article_title": metadata.get("title", "") if metadata else "",
+        "url": metadata.get("pdf_url", "") if metadata else "",
+        "pdf_name": metadata.get("pdf_url", "").split("/")[-1] if metadata else "",
+        "summary": metadata.get("summary", "") if metadata else "",
+        "authors": metadata.get("authors", []) if metadata else [],
+        "published": metadata.get("published", "") if metadata else "",
+    }
+
+
+def chunk_paper(file_path: Path, content: str, docling_cache: Optional[DoclingDocumentCache] = None,
+                pdf_sha256: Optional[str] = None, chunker: Optional[StreamingChunker] = None) -> List[dict]:
+    """
+    Chunks a paper into chunk dicts holding the chunk "text".
+    If the docling cache holds the structured document of the paper's PDF (stored next to the markdowns
+    folder), the chunks are built from it and also carry the "section" and "pages" they come from; with a
+    `chunker`, they are sized in its tokens and within its limits.
+    The PDF's hash recorded in the catalog (`pdf_sha256`) is used if given, instead of hashing the PDF again.
+    Otherwise the markdown content is chunked with the `chunker`, whose chunks also carry their
+    "char_start" and "char_end" offsets into the markdown, or with `TextChunker.header_aware_chunking`.
+    """
+    if docling_cache is not None:
+        pdf_path = file_path.parent.parent / f"{file_path.stem}.pdf"
+        if pdf_sha256 is None and pdf_path.is_file():
+            pdf_sha256 = file_sha256(pdf_path)
+        if pdf_sha256 is not None:
+            blocks = docling_cache.get(pdf_sha256)
+            if blocks is not None:
+                if chunker is not None:
+                    return TextChunker.chunk_blocks(blocks, max_tokens=chunker.max_tokens,
+                                                    merge_margin=chunker.merge_margin,
+                                                    token_counter=chunker.token_counter, overlap=chunker.overlap)
+                return TextChunker.chunk_blocks(blocks)
+    if chunker is not None:
+        return chunker.chunk(content)
+    return [{"text": chunk} for chunk in TextChunker.header_aware_chunking(text=content, metadata=str(file_path))]
+
+
+def build_point_metadata(metadata, paper_id: str, chunk_index: int, chunk: dict) -> dict:
+    point_metadata = build_chunk_metadata(metadata, paper_id, chunk_index)
+    point_metadata.update({key: chunk[key] for key in ("section", "pages", "char_start", "char_end") if key in chunk})
+    return point_metadata
+
+
+def collect_markdown_chunks(file_path: Path, catalog: PaperCatalog,
+                            docling_cache: Optional[DoclingDocumentCache] = None,
+                            chunker: Optional[StreamingChunker] = None) -> List[dict]:
+    """
+    Reads and chunks a markdown file without embedding it.
+
+    Returns a list of chunk records, each holding the chunk "text", the paper "summary" and the
+    payload "metadata" (including the paper ID and chunk index). The records are turned into points
+    by `embed_chunk_records`.
+    """
+    try:
+        content = file_path.read_text(encoding="utf-8")
+    except Exception as e:
+        logger.error(f"Failed to read {file_path}: {e}")
+        return []
+
+    metadata = get_doc_metadata(catalog, file_path)
+    chunks = chunk_paper(file_path, content, docling_cache, metadata.get("sha256"), chunker)
+    summary = metadata.get("summary", "") if metadata else ""
+    return [{"text": chunk["text"], "summary": summary,
+             "metadata": build_point_metadata(metadata, file_path.stem, idx, chunk)}
+            for idx, chunk in enumerate(chunks)]
+
+
+def embed_chunk_records(records: List[dict], uploader: BaseVectorIndex, batch_size: int = 64,
+                        num_workers: int = 0, collection_name: Optional[str] = None) -> List[dict]:
+    """
+    Encodes chunk records collected across files in large batches and turns them into Qdrant points.
+
+    Chunk texts are encoded in one batched pass; summaries are deduplicated first so every paper
+    summary is encoded only once. Vectors are matched back to their records by position.
+    """
+    if not records:
+        return []
+    chunk_vectors = uploader.encode_texts([record["text"] for record in records],
+                                          batch_size=batch_size, num_workers=num_workers)
+    unique_summaries = list(dict.fromkeys(record["summary"] for record in records))
+    summary_vectors = uploader.encode_texts(unique_summaries, batch_size=batch_size, num_workers=num_workers)
+    summary_index = {summary: idx for idx, summary in enumerate(unique_summaries)}
+
+    points = []
+    for idx, record in enumerate(records):
+        points.append({
+            "id": make_point_id(record["metadata"]["paper_id"], record["metadata"]["chunk_index"]),
+            "vector": {
+                "default": chunk_vectors[idx].tolist(),
+                "summary": summary_vectors[summary_index[record["summary"]]].tolist()
+            },
+            "payload": {
+                "page_content": record["text"],
+                "metadata": record["metadata"],
+            }
+        })
+    return add_sparse_vectors(points, uploader, collection_name)
+
+
+def add_sparse_vectors(points: List[dict], uploader: BaseVectorIndex,
+                       collection_name: Optional[str] = None) -> List[dict]:
+    """
+    Adds the BM25 sparse vector of its chunk text to every point if the target collection stores sparse
+    vectors (see `has_sparse_vectors`), so that exact terms (model names, acronyms, datasets) can be matched
+    by hybrid queries. Collections created before `hybrid_search` was enabled have no sparse vector config
+    and would reject the points, so they get dense vectors only.
+    """
+    if collection_name is not None and uploader.has_sparse_vectors(collection_name):
+        for point in points:
+            point["vector"][SPARSE_VECTOR_NAME] = uploader.sparse_encoder.encode_document(
+                point["payload"]["page_content"])
+    return points
+
+
+def embed_two_tier_records(records: List[dict], uploader: BaseVectorIndex, batch_size: int = 64,
+                           num_workers: int = 0, collection_name: Optional[str] = None) -> Tuple[List[dict], List[dict]]:
+    """
+    Encodes chunk records for the "two_tier" layout.
+
+    Chunk points only hold the "default" vector and the chunk's position within its paper
+    (`CHUNK_METADATA_FIELDS`). The summary vector and the paper metadata are stored once per paper
+    in a paper point, which is joined back onto the chunks at query time.
 
-def process_markdown_file(file_path: Path, uploader: QdrantIndex, start_id: int, doc_metadata) -> List[dict]:
+    Returns the chunk points and the paper points.
+    """
+    if not records:
+        return [], []
+    chunk_vectors = uploader.encode_texts([record["text"] for record in records],
+                                          batch_size=batch_size, num_workers=num_workers)
+    papers = {}
+    for record in records:
+        papers.setdefault(record["metadata"]["paper_id"], record)
+
+    chunk_points = [{
+        "id": make_point_id(record["metadata"]["paper_id"], record["metadata"]["chunk_index"]),
+        "vector": {"default": chunk_vectors[idx].tolist()},
+        "payload": {
+            "page_content": record["text"],
+            "metadata": {key: value for key, value in record["metadata"].items() if key in CHUNK_METADATA_FIELDS},
+        }
+    } for idx, record in enumerate(records)]
+    paper_points = embed_paper_records(papers, uploader, batch_size=batch_size, num_workers=num_workers)
+    return add_sparse_vectors(chunk_points, uploader, collection_name), paper_points
+
+
+def embed_paper_records(papers: dict, uploader: BaseVectorIndex, batch_size: int = 64,
+                        num_workers: int = 0) -> List[dict]:
+    """
+    Encodes the summaries of papers, given as a dict of paper ID to a record with the paper "summary" and
+    its "metadata", into paper points holding the "summary" vector and the paper metadata.
+    """
+    if not papers:
+        return []
+    summary_vectors = uploader.encode_texts([record["summary"] for record in papers.values()],
+                                            batch_size=batch_size, num_workers=num_workers)
+    return [{
+        "id": make_paper_point_id(paper_id),
+        "vector": {"summary": summary_vectors[idx].tolist()},
+        "payload": {
+            "page_content": record["summary"],
+            "metadata": {key: value for key, value in record["metadata"].items()
+                         if key == "paper_id" or key not in CHUNK_METADATA_FIELDS},
+        }
+    } for idx, (paper_id, record) in enumerate(papers.items())]
+
+
+def backfill_paper_points(collection_name: str, paper_ids: List[str], uploader: BaseVectorIndex,
+                          catalog: PaperCatalog, batch_size: int = 64, num_workers: int = 0) -> List[dict]:
+    """
+    Builds the paper points of already ingested papers that are missing from the paper-level collection,
+    from their catalog records, so that incremental runs do not leave them out of two-stage retrieval.
+    Only the summaries are encoded; the papers' chunks are not touched.
+    """
+    if not paper_ids:
+        return []
+    existing = set()
+    if uploader.has_paper_collection(collection_name):
+        existing = set(uploader.retrieve_vectors(paper_collection_name(collection_name),
+                                                 [make_paper_point_id(paper_id) for paper_id in paper_ids],
+                                                 vector_name="summary"))
+    papers = {}
+    for paper_id in paper_ids:
+        if make_paper_point_id(paper_id) in existing:
+            continue
+        metadata = catalog.get(paper_id) or {}
+        papers[paper_id] = {"summary": metadata.get("summary", ""),
+                            "metadata": build_chunk_metadata(metadata, paper_id, 0)}
+    if papers:
+        logger.info(f"Backfilling {len(papers)} papers missing from '{paper_collection_name(collection_name)}'.")
+    return embed_paper_records(papers, uploader, batch_size=batch_size, num_workers=num_workers)
+
+
+def process_markdown_file(file_path: Path, uploader: BaseVectorIndex, catalog: PaperCatalog,
+                          docling_cache: Optional[DoclingDocumentCache] = None,
+                          chunker: Optional[StreamingChunker] = None,
+                          collection_name: Optional[str] = None) -> List[dict]:
     """
     Reads a markdown file, chunks it using TextChunker, and creates points for Qdrant.
     Each point will contain:
       - "page_content": the chunked text.
-      - "metadata": file name, URL (from metadata.json or derived), and PDF name (if any), summary text (from metadata.json if available
+      - "metadata": file name, URL (from the paper catalog), and PDF name (if any), summary text (from the paper catalog if available)
     Also computes two embeddings:
       - A default vector for the full text.
       - A summary vector for the summary text.
 
-    Returns a tuple of the list of points and the updated unique ID counter.
+    Point IDs are derived from the paper ID (the markdown file name) and the chunk index.
+
+    Returns the list of points.
     """
     try:
         content = file_path.read_text(encoding="utf-8")
     except Exception as e:
         logger.error(f"Failed to read {file_path}: {e}")
-        return [], start_id
+        return []
 
-    metadata = get_doc_metadata(doc_metadata, file_path)
+    metadata = get_doc_metadata(catalog, file_path)
 
-    chunks = TextChunker.header_aware_chunking(text=content, metadata=str(file_path))
-    summary_vector = uploader.summary_embedding_model.encode(metadata.get("summary", "") if metadata else "")
+    chunks = chunk_paper(file_path, content, docling_cache, metadata.get("sha256"), chunker)
+    summary_vector = uploader.encode_texts([metadata.get("summary", "") if metadata else ""])[0]
+    # One call for all chunks, so cached vectors are looked up with a single `get_many`.
+    chunk_vectors = uploader.encode_texts([chunk["text"] for chunk in chunks])
 
+    paper_id = file_path.stem
     points = []
-    for chunk in chunks:
-        default_vector = uploader.embedding_model.encode(chunk)
+    for chunk_index, (chunk, default_vector) in enumerate(zip(chunks, chunk_vectors)):
 
         point = {
-            "id": start_id,
+            "id": make_point_id(paper_id, chunk_index),
             "vector": {
                 "default": default_vector.tolist(),
                 "summary": summary_vector.tolist()
             },
             "payload": {
-                "page_content": chunk,
-                "metadata": {
-                    "article_title": metadata.get("title", "") if metadata else "",
-                    "url": metadata.get("pdf_url", "") if metadata else "",
-                    "pdf_name": metadata.get("pdf_url", "").split("/")[-1] if metadata else "",
-                    "summary": metadata.get("summary", "") if metadata else "",
-                    "authors": metadata.get("authors", []) if metadata else [],
-                    "published": metadata.get("published", "") if metadata else "",
-                },
+                "page_content": chunk["text"],
+                "metadata": build_point_metadata(metadata, paper_id, chunk_index, chunk),
             }
         }
 
         points.append(point)
-        start_id += 1
 
-    return points
+    return add_sparse_vectors(points, uploader, collection_name)
 
 
 if __name__ == '__main__':
     root_dir = Path("/Users/astghikchobanyan/Desktop/scientific-qa-pipeline/src/data")
-    uploader = QdrantIndex(embedding_model_name=ConfigManager().embedding_model_name)
+    config = ConfigManager()
+    uploader = get_vector_index(config.embedding_model_name)
+    catalog = get_paper_catalog()
     for sub_dirs in root_dir.iterdir():
         if sub_dirs.is_dir() and sub_dirs.name != ".DS_Store":
             collection_name = sub_dirs.name.split("arxiv_pdfs_")[-1]
@@ -117,9 +405,15 @@ if __name__ == '__main__':
             if not markdown_dirs:
                 logger.warning(f"No markdown directories found for collection '{collection_name}'. Skipping.")
                 continue
-            with open(os.path.join(root_dir, sub_dirs, "pdfs_metadata.json"), 'r') as f:
-                pdfs_metadata = json.load(f)
+            legacy_metadata = sub_dirs / "pdfs_metadata.json"
+            if not catalog.papers_for_topic(collection_name) and legacy_metadata.is_file():
+                catalog.import_metadata_json(collection_name, str(legacy_metadata))
             logger.info(f"Processing collection '{collection_name}' with directories: {markdown_dirs}")
-            process_site_collection(collection_name, markdown_dirs, uploader)
+            docling_cache = DoclingDocumentCache(sub_dirs / "docling_cache") if config.use_docling_cache else None
+            process_site_collection(collection_name, markdown_dirs, uploader, catalog, batched=True,
+                                    batch_size=config.embedding_batch_size,
+                                    num_workers=config.embedding_num_workers,
+                                    incremental=config.incremental_ingestion,
+                                    docling_cache=docling_cache)
             # for markdown_file in os.listdir(markdown_dirs[0]):
-            #     process_markdown_file(file_path=markdown_dirs[0].joinpath(markdown_file), uploader=uploader, start_id=1, doc_metadata=pdfs_metadata)
+            #     process_markdown_file(file_path=markdown_dirs[0].joinpath(markdown_file), uploader=uploader, catalog=catalog)
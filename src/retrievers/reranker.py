@@ -0,0 +1,148 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Optional
+
+import numpy as np
+from loguru import logger
+
+from src.config.config_manager import ConfigManager
+from src.config.model_loader import model_loader
+from src.retrievers.qdrant.embedding_cache import QueryEmbeddingLRU
+
+
+class CrossEncoderReranker:
+    """
+    Reranks retrieved documents with a local cross-encoder running on the CPU.
+
+    The candidates of all queries of a request are scored in a single batched `predict` call, and every
+    score is cached per (normalized query, document ID) in a bounded LRU, so repeated subqueries and chunks
+    retrieved by several subqueries are scored only once. Latency of every rerank call is recorded.
+    """
+
+    def __init__(self, model_name: str, cache_size: int = 10_000, batch_size: int = 32):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.model = model_loader.load_model(model_name, lambda name: CrossEncoder(name, device="cpu"))
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.calls = 0
+        self.pairs_scored = 0
+        self.cache_hits = 0
+
+    @staticmethod
+    def document_id(document: dict) -> str:
+        if document.get("id") is not None:
+            return str(document["id"])
+        return hashlib.sha256(document.get("content", "").encode("utf-8")).hexdigest()
+
+    def rerank(self, query: str, documents: List[dict], top_n: int) -> List[dict]:
+        return self.rerank_batch([query], [documents], top_n)[0]
+
+    def rerank_batch(self, queries: List[str], candidates: List[List[dict]], top_n: int) -> List[List[dict]]:
+        """
+        Scores the candidate documents of every query with the cross-encoder and keeps the `top_n` best per query.
+
+        Args:
+            queries (List[str]): The queries, e.g. all subqueries of a request.
+            candidates (List[List[dict]]): The retrieved documents of every query.
+            top_n (int): Number of documents to keep per query.
+
+        Returns:
+            List[List[dict]]: The kept documents of every query, best first, each with its "rerank_score".
+        """
+        start_time = time.perf_counter()
+        keys = [[(QueryEmbeddingLRU.normalize(query), self.document_id(document)) for document in documents]
+                for query, documents in zip(queries, candidates)]
+        with self._lock:
+            scores = {key: self._scores[key] for query_keys in keys for key in query_keys if key in self._scores}
+            for key in scores:
+                self._scores.move_to_end(key)
+        pairs = {}
+        for query, documents, query_keys in zip(queries, candidates, keys):
+            for document, key in zip(documents, query_keys):
+                if key not in scores and key not in pairs:
+                    pairs[key] = (query, document.get("content", ""))
+        if pairs:
+            predicted = self.model.predict(list(pairs.values()), batch_size=self.batch_size, show_progress_bar=False)
+            new_scores = dict(zip(pairs, np.asarray(predicted, dtype=np.float32).tolist()))
+            scores.update(new_scores)
+            with self._lock:
+                self._scores.update(new_scores)
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+
+        reranked = []
+        for documents, query_keys in zip(candidates, keys):
+            scored = [{**document, "rerank_score": scores[key]} for document, key in zip(documents, query_keys)]
+            reranked.append(sorted(scored, key=lambda document: document["rerank_score"], reverse=True)[:top_n])
+
+        elapsed = time.perf_counter() - start_time
+        with self._lock:
+            self.calls += 1
+            self.pairs_scored += len(pairs)
+            self.cache_hits += sum(len(query_keys) for query_keys in keys) - len(pairs)
+            self._latencies.append(elapsed)
+        logger.debug(f"Reranked {sum(len(documents) for documents in candidates)} candidates of {len(queries)} "
+                     f"queries ({len(pairs)} scored) in {elapsed * 1000:.1f}ms")
+        return reranked
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = np.asarray(self._latencies) * 1000 if self._latencies else None
+            return {
+                "calls": self.calls,
+                "pairs_scored": self.pairs_scored,
+                "cache_hits": self.cache_hits,
+                "cache_entries": len(self._scores),
+                "latency_ms_p50": float(np.percentile(latencies, 50)) if latencies is not None else None,
+                "latency_ms_p95": float(np.percentile(latencies, 95)) if latencies is not None else None,
+            }
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def rerank_documents(documents: List[dict], top_n: Optional[int] = None) -> List[dict]:
+    """
+    Reranks the candidates retrieved by all subqueries of a request in one cross-encoder batch. Every candidate
+    is scored against the subquery that retrieved it (its "query"), and the `top_n` best per subquery are kept
+    (`ConfigManager().qdrant_top_k` by default). Candidates without a "query" are kept unscored, and without a
+    reranker the documents are returned unchanged.
+    """
+    reranker = get_reranker()
+    if reranker is None or not documents:
+        return documents
+    candidates = {}
+    unscored = []
+    for document in documents:
+        if isinstance(document, dict) and document.get("query"):
+            candidates.setdefault(document["query"], []).append(document)
+        else:
+            unscored.append(document)
+    if not candidates:
+        return documents
+    reranked = reranker.rerank_batch(list(candidates), list(candidates.values()),
+                                     top_n=top_n or ConfigManager().qdrant_top_k)
+    logger.debug(f'Reranker stats: {reranker.stats()}')
+    return [document for query_documents in reranked for document in query_documents] + unscored
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """
+    Returns the process-wide reranker of `ConfigManager().reranker_model_name`, or None if reranking is disabled.
+    """
+    global _reranker
+    config = ConfigManager()
+    if not config.reranker_enabled:
+        return None
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker(config.reranker_model_name, cache_size=config.rerank_cache_size)
+        return _reranker
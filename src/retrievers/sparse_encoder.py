@@ -0,0 +1,62 @@
+import re
+import zlib
+from collections import Counter
+from typing import List
+
+SPARSE_VECTOR_NAME = "bm25"
+
+TOKEN_REGEX = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were which with we our
+what how why does do who when where
+""".split())
+
+
+class BM25SparseEncoder:
+    """
+    Encodes texts into BM25-weighted sparse vectors for lexical matching of exact terms such as model names,
+    acronyms and dataset names, which dense embeddings tend to miss.
+
+    Terms are lowercased tokens (keeping inner hyphens and dots, e.g. "gpt-4", "anyi2v") hashed to 32-bit
+    indices with crc32, so no vocabulary has to be built or stored. Documents carry the BM25 term-frequency
+    weight of every term; the inverse document frequency is applied by Qdrant at query time
+    (`Modifier.IDF`), so it stays correct as the collection grows.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: float = 200.0):
+        """
+        Args:
+            k1 (float): Term frequency saturation.
+            b (float): Strength of the document length normalization.
+            avg_doc_length (float): Expected number of terms in a chunk, used for length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return [token for token in TOKEN_REGEX.findall(text.lower()) if token not in STOPWORDS]
+
+    @staticmethod
+    def term_index(term: str) -> int:
+        return zlib.crc32(term.encode("utf-8"))
+
+    def encode_document(self, text: str) -> dict:
+        """
+        Returns the sparse vector of a document as {"indices": [...], "values": [...]}.
+        """
+        terms = self.tokenize(text)
+        length_norm = self.k1 * (1 - self.b + self.b * len(terms) / self.avg_doc_length)
+        frequencies = Counter(self.term_index(term) for term in terms)
+        indices = sorted(frequencies)
+        return {"indices": indices,
+                "values": [frequencies[index] * (self.k1 + 1) / (frequencies[index] + length_norm)
+                           for index in indices]}
+
+    def encode_query(self, text: str) -> dict:
+        """
+        Returns the sparse vector of a query: every distinct query term with weight 1.
+        """
+        indices = sorted({self.term_index(term) for term in self.tokenize(text)})
+        return {"indices": indices, "values": [1.0] * len(indices)}
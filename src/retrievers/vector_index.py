@@ -0,0 +1,36 @@
+import threading
+from typing import Optional
+
+from src.config.config_manager import ConfigManager
+from src.retrievers.base_index import BaseVectorIndex
+
+_registry_lock = threading.Lock()
+_embedded_indexes = {}
+
+
+def get_vector_index(embedding_model_name: Optional[str] = None) -> BaseVectorIndex:
+    """
+    Returns the process-wide vector index of the backend selected by `ConfigManager().retriever_backend`:
+        - "qdrant": the Qdrant service at QDRANT_URL (see `QdrantIndex`).
+        - "numpy": the embedded index in `ConfigManager().embedded_index_dir` (see `NumpyIndex`).
+    Backends are imported lazily, so the embedded backend does not require the Qdrant client.
+
+    Args:
+        embedding_model_name (Optional[str]): Embedding model, defaults to `ConfigManager().embedding_model_name`.
+    """
+    config = ConfigManager()
+    embedding_model_name = embedding_model_name or config.embedding_model_name
+    if config.retriever_backend == "qdrant":
+        from src.retrievers.qdrant.qdrant_index import get_qdrant_index
+        return get_qdrant_index(embedding_model_name)
+    if config.retriever_backend == "numpy":
+        from src.retrievers.embedded.numpy_index import NumpyIndex
+        key = (config.embedded_index_dir, embedding_model_name)
+        with _registry_lock:
+            index = _embedded_indexes.get(key)
+        if index is None:
+            index = NumpyIndex(embedding_model_name, index_dir=config.embedded_index_dir)
+            with _registry_lock:
+                index = _embedded_indexes.setdefault(key, index)
+        return index
+    raise ValueError(f"Unknown retriever_backend '{config.retriever_backend}'. Use 'qdrant' or 'numpy'.")
@@ -1,21 +1,117 @@
-import json
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
 
 import arxiv
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from src.catalog.paper_catalog import PaperCatalog, arxiv_id_from_path, get_paper_catalog
+from src.utils.hashing import file_sha256
 
-def download_arxiv_pdfs(topic: str, max_results: int = 10, output_dir: str = "./arxiv_pdfs"):
+
+class RateLimiter:
+    """
+    Spaces out request starts so that at most one request begins every `min_interval` seconds,
+    no matter how many download threads are running.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """
+    Creates a pooled HTTP session that retries with backoff on throttling and transient server errors,
+    honoring the Retry-After header sent by arXiv.
+    """
+    retry = Retry(total=3, backoff_factor=2, status_forcelist=[429, 500, 502, 503, 504],
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def is_already_downloaded(session: requests.Session, rate_limiter: RateLimiter, pdf_url: str, filepath: str,
+                          previous: dict) -> bool:
+    """
+    Checks whether a PDF on disk is complete: it must match the size and hash recorded in the paper catalog
+    by a previous run, or, without a previous record, the Content-Length reported by the server. The HEAD
+    request counts against the same rate limit as the downloads.
+    """
+    if not os.path.exists(filepath):
+        return False
+    size = os.path.getsize(filepath)
+    if previous.get("sha256"):
+        return previous.get("size") == size and previous["sha256"] == file_sha256(filepath)
+    rate_limiter.wait()
+    response = session.head(pdf_url, allow_redirects=True, timeout=10)
+    return response.ok and response.headers.get("Content-Length") == str(size)
+
+
+def download_pdf(session: requests.Session, rate_limiter: RateLimiter, pdf_url: str, filepath: str) -> dict:
+    """
+    Streams a PDF to a temporary file and atomically renames it into place once it is complete,
+    so an interrupted download never leaves a truncated PDF behind.
+
+    Returns the size and sha256 of the downloaded file.
+    """
+    rate_limiter.wait()
+    tmp_path = f"{filepath}.part"
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with session.get(pdf_url, stream=True, timeout=(10, 60)) as response:
+            response.raise_for_status()
+            with open(tmp_path, "wb") as f:
+                for block in response.iter_content(chunk_size=1 << 16):
+                    f.write(block)
+                    hasher.update(block)
+                    size += len(block)
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"size": size, "sha256": hasher.hexdigest()}
+
+
+def download_arxiv_pdfs(topic: str, max_results: int = 10, output_dir: str = "./arxiv_pdfs", max_workers: int = 4,
+                        min_request_interval: float = 1.0, catalog: Optional[PaperCatalog] = None):
     """
     Download the latest PDFs from arXiv based on a topic query.
 
+    PDFs are downloaded concurrently by `max_workers` threads sharing one pooled session, while request
+    starts are spaced by `min_request_interval` seconds to stay within arXiv's rate limits. PDFs already
+    on disk with a matching size/hash are skipped, so an interrupted run can simply be restarted.
+    The metadata, file paths and hashes of all papers are written to the paper catalog.
+
     Parameters:
         topic (str): Search query topic for arXiv.
         max_results (int): Maximum number of results to download.
         output_dir (str): Directory to save downloaded PDFs.
+        max_workers (int): Maximum number of concurrent downloads.
+        min_request_interval (float): Minimum number of seconds between the starts of two requests.
+        catalog (Optional[PaperCatalog]): Paper catalog to record the papers in, defaults to the configured one.
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
+    catalog = catalog or get_paper_catalog()
 
     search = arxiv.Search(
         query=topic,
@@ -27,31 +123,49 @@ def download_arxiv_pdfs(topic: str, max_results: int = 10, output_dir: str = "./
     print(f"Searching arXiv for: {topic} (max results: {max_results})")
 
     pdf_urls = []
-    for result in search.results():
-        try:
-            pdf_url = result.pdf_url
-            filename = f"{result.get_short_id().replace('/', '_')}.pdf"
-            filepath = os.path.join(output_dir, filename)
-            pdf_urls.append({
-                "title": result.title,
-                "pdf_url": pdf_url,
-                "filepath": filepath,
-                "summary": result.summary,
-                "authors": [author.name for author in result.authors],
-                "published": result.published.strftime("%Y-%m-%d"),
-            })
-            print(f"Downloading: {result.title}\nFrom: {pdf_url}")
-            response = requests.get(pdf_url, timeout=10)
-            response.raise_for_status()
+    for result in arxiv.Client(delay_seconds=3, num_retries=3).results(search):
+        filename = f"{result.get_short_id().replace('/', '_')}.pdf"
+        pdf_urls.append({
+            "title": result.title,
+            "pdf_url": result.pdf_url,
+            "filepath": os.path.join(output_dir, filename),
+            "summary": result.summary,
+            "authors": [author.name for author in result.authors],
+            "published": result.published.strftime("%Y-%m-%d"),
+        })
+
+    session = create_session(pool_size=max_workers)
+    rate_limiter = RateLimiter(min_request_interval)
+
+    def fetch(pdf_metadata: dict):
+        previous = catalog.get(arxiv_id_from_path(pdf_metadata["filepath"])) or {}
+        if is_already_downloaded(session, rate_limiter, pdf_metadata["pdf_url"], pdf_metadata["filepath"], previous):
+            print(f"Already downloaded: {pdf_metadata['filepath']}")
+            size = os.path.getsize(pdf_metadata["filepath"])
+            return previous if previous.get("size") == size else {"size": size,
+                                                                   "sha256": file_sha256(pdf_metadata["filepath"])}
+        print(f"Downloading: {pdf_metadata['title']}\nFrom: {pdf_metadata['pdf_url']}")
+        file_info = download_pdf(session, rate_limiter, pdf_metadata["pdf_url"], pdf_metadata["filepath"])
+        print(f"Saved to: {pdf_metadata['filepath']}\n")
+        return file_info
 
-            with open(filepath, "wb") as f:
-                f.write(response.content)
-            print(f"Saved to: {filepath}\n")
+    start_time = time.perf_counter()
+    downloaded_bytes = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, pdf_metadata): pdf_metadata for pdf_metadata in pdf_urls}
+        for future in as_completed(futures):
+            pdf_metadata = futures[future]
+            try:
+                file_info = future.result()
+                pdf_metadata["size"] = file_info["size"]
+                pdf_metadata["sha256"] = file_info["sha256"]
+                downloaded_bytes += file_info["size"]
+            except Exception as e:
+                print(f"Failed to download {pdf_metadata['title']}: {e}\n")
+    elapsed = time.perf_counter() - start_time
+    print(f"Fetched {len(pdf_urls)} PDFs ({downloaded_bytes / 1e6:.1f} MB) in {elapsed:.1f}s")
 
-        except Exception as e:
-            print(f"Failed to download {result.title}: {e}\n")
-    with open(os.path.join(output_dir, "pdfs_metadata.json"), "w") as f:
-        json.dump(pdf_urls, f, indent=4)
+    catalog.upsert_papers(topic, pdf_urls)
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,209 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import HumanMessage
+from loguru import logger
+from pydantic import BaseModel
+
+from src.config.config_manager import ConfigManager
+from src.graph.chat import prewarm
+
+
+class AskRequest(BaseModel):
+    question: str
+    thread_id: Optional[str] = None
+    stream: bool = False
+
+
+class AskResponse(BaseModel):
+    thread_id: str
+    answer: str
+    latency_ms: float
+
+
+class ConcurrencyLimiter:
+    """
+    Bounds the number of graph runs in flight. Up to `max_concurrent` requests run at once, up to `max_queued`
+    more wait for a slot for at most `queue_timeout` seconds, and everything beyond is rejected with 429, so
+    that overload shows up as fast rejections the load balancer can retry elsewhere rather than as tail latency.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        await self.wait_queued(self._semaphore.acquire, "queue timeout")
+        self.active += 1
+
+    async def wait_queued(self, acquire: Callable[[], Awaitable], reason: str):
+        """
+        Waits for `acquire()` as one of the queued requests: rejects with 429 if the queue is already full, or
+        with `reason` if the wait takes longer than `queue_timeout`.
+        """
+        if self.active + self.queued >= self.max_concurrent + self.max_queued:
+            self._reject("queue full")
+        self.queued += 1
+        try:
+            await asyncio.wait_for(acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject(reason)
+        finally:
+            self.queued -= 1
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        logger.warning(f"Rejecting request ({reason}) | Active: {self.active} | Queued: {self.queued}")
+        raise HTTPException(status_code=429, detail="Server is at capacity, retry later.",
+                            headers={"Retry-After": "1"})
+
+    def stats(self) -> dict:
+        return {"active": self.active, "queued": self.queued, "rejected": self.rejected,
+                "max_concurrent": self.max_concurrent, "max_queued": self.max_queued}
+
+
+class ThreadLocks:
+    """
+    Serializes requests on the same conversation: a turn reads and writes the thread's checkpoint, so two
+    concurrent turns of one thread would both start from the same state and one of their updates would be
+    lost. Locks are created on demand and dropped once no request of the thread is running or waiting.
+    Requests waiting for their thread count as queued on the limiter, so they are bounded and time out like
+    requests waiting for a slot.
+    """
+
+    def __init__(self):
+        self._locks = {}
+
+    async def acquire(self, thread_id: str, limiter: ConcurrencyLimiter):
+        entry = self._locks.setdefault(thread_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            if entry[0].locked():
+                await limiter.wait_queued(entry[0].acquire, "thread queue timeout")
+            else:
+                await entry[0].acquire()
+        except BaseException:
+            self._drop(thread_id)
+            raise
+
+    def release(self, thread_id: str):
+        self._locks[thread_id][0].release()
+        self._drop(thread_id)
+
+    def _drop(self, thread_id: str):
+        entry = self._locks[thread_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[thread_id]
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that calls `release` once the response is over, however it ends: streamed to completion,
+    failed, or the client disconnected before the body iterator was ever started (in which case a `finally`
+    inside the iterator would never run).
+    """
+
+    def __init__(self, content, release: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    config = ConfigManager()
+    start_time = time.perf_counter()
+    app.state.research_qa = await asyncio.to_thread(prewarm, True)
+    app.state.limiter = ConcurrencyLimiter(config.server_max_concurrency, config.server_max_queue,
+                                           config.server_queue_timeout_seconds)
+    app.state.thread_locks = ThreadLocks()
+    logger.info(f"ResearchQA server ready in {time.perf_counter() - start_time:.1f}s")
+    yield
+
+
+app = FastAPI(title="Scientific QA Pipeline", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health(request: Request) -> dict:
+    return {"status": "ok", **request.app.state.limiter.stats()}
+
+
+@app.post("/ask", response_model=AskResponse)
+async def ask(body: AskRequest, request: Request):
+    """
+    Answers a question within the conversation `thread_id` (a new conversation if omitted). With `stream`,
+    the answer is returned as a plain-text stream of answer tokens, and the thread ID in the X-Thread-Id header.
+    Requests on the same thread run one at a time; a request waits for its thread before queueing for a slot,
+    and both waits are bounded by the server queue.
+    """
+    research_qa = request.app.state.research_qa
+    limiter = request.app.state.limiter
+    thread_locks = request.app.state.thread_locks
+    thread_id = body.thread_id or str(uuid.uuid4())
+    inputs = {"messages": [HumanMessage(body.question)]}
+    config = {"configurable": {"thread_id": thread_id}}
+
+    await thread_locks.acquire(thread_id, limiter)
+    try:
+        await limiter.acquire()
+    except BaseException:
+        thread_locks.release(thread_id)
+        raise
+
+    def release():
+        limiter.release()
+        thread_locks.release(thread_id)
+
+    start_time = time.perf_counter()
+    if body.stream:
+        async def stream_answer():
+            try:
+                async for delta in research_qa.astream_answer(inputs, config):
+                    yield delta
+            except Exception as e:
+                logger.error(f"Streaming answer failed | Thread: {thread_id} | Error: {e}")
+                # The 200 status is already sent; re-raising aborts the response, so the client sees a broken
+                # transfer instead of a truncated answer that looks complete.
+                raise
+            logger.info(f"Answered (streamed) | Thread: {thread_id} | "
+                        f"Latency: {(time.perf_counter() - start_time) * 1000:.0f}ms")
+
+        return ReleasingStreamingResponse(stream_answer(), release, media_type="text/plain; charset=utf-8",
+                                          headers={"X-Thread-Id": thread_id})
+
+    try:
+        result = await research_qa.graph.ainvoke(inputs, config)
+    except Exception as e:
+        logger.error(f"Answering failed | Thread: {thread_id} | Error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to answer the question.")
+    finally:
+        release()
+    latency_ms = (time.perf_counter() - start_time) * 1000
+    logger.info(f"Answered | Thread: {thread_id} | Latency: {latency_ms:.0f}ms")
+    return AskResponse(thread_id=thread_id, answer=result.get("final_answer") or "", latency_ms=latency_ms)
+
+
+if __name__ == '__main__':
+    uvicorn.run(app, host=ConfigManager().server_host, port=ConfigManager().server_port)
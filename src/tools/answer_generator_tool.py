@@ -1,13 +1,42 @@
-import json
+import asyncio
 import traceback
 from typing import Annotated, List
 
 from langchain_core.tools import tool
-from langchain_ollama.chat_models import ChatOllama
 from loguru import logger
 
 from src.config.config_manager import ConfigManager
 from src.prompts.fail_safe_prompt import get_prompt_with_fallback
+from src.tools.llm_client import invoke_chat_model, ainvoke_chat_model, stream_chat_model, astream_chat_model
+
+
+def _build_messages(query: str, retrieved_data: List) -> list:
+    prompt = get_prompt_with_fallback(
+        prompt_template_mnemonic="answer_generator",
+        query=query,
+        results=retrieved_data,
+    )
+    return [
+        (
+            "system",
+             "You are an AI assistant that answers user query related to the scientific research topics."
+             "Your output must be in JSON format with a single key 'answer'."
+        ),
+        ("user", prompt)
+    ]
+
+
+def _parse_response(response: dict) -> str:
+    answer = response['answer']
+    logger.info(f'[COMPLETE] Answer Generator')
+    return answer
+
+
+def _on_failure(e: Exception) -> str:
+    logger.error(f"[FAIL] Answer Generator | Error: {str(e)}")
+    error_traceback = traceback.format_exc()
+    logger.error(error_traceback)
+    return ''
 
 
 @tool
@@ -17,26 +46,22 @@ def answer_generator_tool(query: Annotated[str, 'The user query'], retrieved_dat
     """
     try:
         logger.info(f'[START] Answer Generator')
-        prompt = get_prompt_with_fallback(
-            prompt_template_mnemonic="answer_generator",
-            query=query,
-            results=retrieved_data,
-        )
-        llm = ChatOllama(model=ConfigManager().ollama_thinking_model_name, format="json")
-        response = llm.invoke([
-                (
-                    "system",
-                     "You are an AI assistant that answers user query related to the scientific research topics."
-                     "Your output must be in JSON format with a single key 'answer'."
-                ),
-                ("user", prompt)
-            ]
-        )
-        topic_names = json.loads(response.content)['answer']
-        logger.info(f'[COMPLETE] Answer Generator')
-        return topic_names
+        messages = _build_messages(query, retrieved_data)
+        invoke = stream_chat_model if ConfigManager().stream_answer else invoke_chat_model
+        return _parse_response(invoke(ConfigManager().ollama_thinking_model_name, messages))
+    except Exception as e:
+        return _on_failure(e)
+
+
+@tool
+async def aanswer_generator_tool(query: Annotated[str, 'The user query'], retrieved_data: List) -> list[str] | str:
+    """
+    Answer the user query based on the retrieved data without blocking the event loop.
+    """
+    try:
+        logger.info(f'[START] Answer Generator')
+        messages = await asyncio.to_thread(_build_messages, query, retrieved_data)
+        ainvoke = astream_chat_model if ConfigManager().stream_answer else ainvoke_chat_model
+        return _parse_response(await ainvoke(ConfigManager().ollama_thinking_model_name, messages))
     except Exception as e:
-        logger.error(f"[FAIL] Topic Extractor | Error: {str(e)}")
-        error_traceback = traceback.format_exc()
-        logger.error(error_traceback)
-        return ''
\ No newline at end of file
+        return _on_failure(e)
@@ -0,0 +1,121 @@
+import json
+import time
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
+
+from loguru import logger
+
+from src.utils.response_cache import ResponseCache, get_response_cache
+
+if TYPE_CHECKING:
+    from langchain_ollama.chat_models import ChatOllama
+
+_chat_models = {}
+
+
+def get_chat_model(model_name: str, output_format: Optional[str] = "json") -> "ChatOllama":
+    """
+    Returns a shared ChatOllama instance for the given model and output format.
+    """
+    key = (model_name, output_format)
+    if key not in _chat_models:
+        from langchain_ollama.chat_models import ChatOllama
+        _chat_models[key] = ChatOllama(model=model_name, format=output_format)
+    return _chat_models[key]
+
+
+def invoke_chat_model(model_name: str, messages: List, output_format: Optional[str] = "json",
+                      parse: Callable[[str], Any] = json.loads) -> Any:
+    """
+    Calls the chat model and returns the parsed response content.
+    Responses are served from the configured response cache when the same model, prompt and format
+    were seen before. A response is only cached if `parse` accepts it.
+    """
+    key, cached = _cache_lookup(model_name, messages, output_format)
+    if cached is not None:
+        return parse(cached)
+    content = get_chat_model(model_name, output_format).invoke(messages).content
+    return _parse_and_store(key, content, parse)
+
+
+async def ainvoke_chat_model(model_name: str, messages: List, output_format: Optional[str] = "json",
+                             parse: Callable[[str], Any] = json.loads) -> Any:
+    """
+    Asynchronous variant of `invoke_chat_model`.
+    """
+    key, cached = _cache_lookup(model_name, messages, output_format)
+    if cached is not None:
+        return parse(cached)
+    content = (await get_chat_model(model_name, output_format).ainvoke(messages)).content
+    return _parse_and_store(key, content, parse)
+
+
+def stream_chat_model(model_name: str, messages: List, output_format: Optional[str] = "json",
+                      parse: Callable[[str], Any] = json.loads) -> Any:
+    """
+    Variant of `invoke_chat_model` that streams the completion from Ollama. The tokens reach the callbacks
+    of the surrounding run, so a LangGraph graph streamed with `stream_mode="messages"` emits them as they
+    are generated. Time to first token and total generation time are logged separately.
+    Cached responses are returned at once, without streaming.
+    """
+    key, cached = _cache_lookup(model_name, messages, output_format)
+    if cached is not None:
+        return parse(cached)
+    start_time = time.perf_counter()
+    first_token_time = None
+    chunks = []
+    for chunk in get_chat_model(model_name, output_format).stream(messages):
+        if first_token_time is None and chunk.content:
+            first_token_time = time.perf_counter() - start_time
+        chunks.append(chunk.content)
+    content = "".join(chunks)
+    _log_stream_timing(model_name, first_token_time, time.perf_counter() - start_time)
+    return _parse_and_store(key, content, parse)
+
+
+async def astream_chat_model(model_name: str, messages: List, output_format: Optional[str] = "json",
+                             parse: Callable[[str], Any] = json.loads) -> Any:
+    """
+    Asynchronous variant of `stream_chat_model`.
+    """
+    key, cached = _cache_lookup(model_name, messages, output_format)
+    if cached is not None:
+        return parse(cached)
+    start_time = time.perf_counter()
+    first_token_time = None
+    chunks = []
+    async for chunk in get_chat_model(model_name, output_format).astream(messages):
+        if first_token_time is None and chunk.content:
+            first_token_time = time.perf_counter() - start_time
+        chunks.append(chunk.content)
+    content = "".join(chunks)
+    _log_stream_timing(model_name, first_token_time, time.perf_counter() - start_time)
+    return _parse_and_store(key, content, parse)
+
+
+def _cache_lookup(model_name: str, messages: List, output_format: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Returns the response cache key of a call (None if caching is disabled) and the cached content, if any.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return None, None
+    key = ResponseCache.make_key(model_name, messages, output_format)
+    content = cache.get(key)
+    if content is not None:
+        logger.info(f"LLM response cache hit | Model: {model_name}")
+    return key, content
+
+
+def _parse_and_store(key: Optional[str], content: str, parse: Callable[[str], Any]) -> Any:
+    """
+    Parses the response content and caches it under `key`. Content that `parse` rejects is not cached.
+    """
+    parsed = parse(content)
+    if key is not None:
+        get_response_cache().set(key, content)
+    return parsed
+
+
+def _log_stream_timing(model_name: str, first_token_time: Optional[float], total_time: float):
+    ttft = f"{first_token_time * 1000:.0f}ms" if first_token_time is not None else "n/a"
+    logger.info(f"LLM stream | Model: {model_name} | TTFT: {ttft} | Total: {total_time * 1000:.0f}ms")
@@ -1,10 +1,39 @@
+import asyncio
 from typing import Annotated, List
 
 from langchain_core.tools import tool
 from loguru import logger
 
 from src.config.config_manager import ConfigManager
-from src.retrievers.qdrant.qdrant_index import QdrantIndex
+from src.retrievers.vector_index import get_vector_index
+
+
+def _retrieval_top_k() -> int:
+    """
+    Number of documents to retrieve per query: with reranking enabled, `rerank_candidates` candidates are
+    over-retrieved, of which the best `qdrant_top_k` are kept when the candidates of all subqueries are
+    reranked together before context assembly (see `src.retrievers.reranker.rerank_documents`).
+    """
+    config = ConfigManager()
+    return config.rerank_candidates if config.reranker_enabled else config.qdrant_top_k
+
+
+def _search_method(index, batched: bool, asynchronous: bool = False):
+    """
+    Returns the index method that serves a query for the configured collection layout, e.g.
+    `index.aquery_two_stage_batch` for a batched asynchronous query against two-tier collections.
+    """
+    name = "query_two_stage" if ConfigManager().collection_layout == "two_tier" else "query_collection"
+    return getattr(index, f"{'a' if asynchronous else ''}{name}{'_batch' if batched else ''}")
+
+
+def _finish_query(query: str, results: List[dict]) -> List[dict]:
+    """Tags every retrieved document with the query that retrieved it, which the reranker scores it against."""
+    return [{**document, "query": query} for document in results]
+
+
+def _finish_batch_query(queries: List[str], results: List[List[dict]]) -> List[dict]:
+    return [document for query, documents in zip(queries, results) for document in _finish_query(query, documents)]
 
 
 @tool
@@ -16,14 +45,64 @@ def query_qdrant_tool(query: Annotated[str, "The search query"],
     """
     try:
         logger.info(f'Qdrant Query | Topic: {topic_name}')
-        page_contents = ''
-        top_k = ConfigManager().qdrant_top_k
-        index = QdrantIndex(ConfigManager().embedding_model_name)
-        results = index.query_collection(collection_name=topic_name, query=query, top_k=top_k)
-        # if results.points:
-        #     page_contents = '\n'.join([result.payload['page_content'] for result in results.points])
-        # logger.info(f'Qdrant Response | Topic: {topic_name} | Response: {page_contents}')
-        return results
+        index = get_vector_index(ConfigManager().embedding_model_name)
+        results = _search_method(index, batched=False)(collection_name=topic_name, query=query, top_k=_retrieval_top_k())
+        logger.debug(f'Qdrant Query | Query embedding cache: {index.query_cache.stats()}')
+        return _finish_query(query, results)
     except Exception as e:
         logger.error(f"Qdrant Query Failed | Topic: {topic_name} | Error: {str(e)}")
-        return ""
\ No newline at end of file
+        return []
+
+
+@tool
+def query_qdrant_batch_tool(queries: Annotated[List[str], "The search queries"],
+                            topic_name: Annotated[str, "The name of the topic whose vector database will be queried"]
+                            ) -> List:
+    """
+    Tool that runs several similarity searches against a Qdrant vector index in a single batched request.
+    """
+    try:
+        logger.info(f'Qdrant Batch Query | Topic: {topic_name} | Queries: {len(queries)}')
+        index = get_vector_index(ConfigManager().embedding_model_name)
+        results = _search_method(index, batched=True)(collection_name=topic_name, queries=queries,
+                                                      top_k=_retrieval_top_k())
+        return _finish_batch_query(queries, results)
+    except Exception as e:
+        logger.error(f"Qdrant Batch Query Failed | Topic: {topic_name} | Error: {str(e)}")
+        return []
+
+
+@tool
+async def aquery_qdrant_tool(query: Annotated[str, "The search query"],
+                             topic_name: Annotated[str, "The name of the topic whose vector database will be queried"]
+                             ) -> List:
+    """
+    Asynchronous variant of query_qdrant_tool that queries Qdrant through the AsyncQdrantClient.
+    """
+    try:
+        logger.info(f'Qdrant Query | Topic: {topic_name}')
+        index = await asyncio.to_thread(get_vector_index, ConfigManager().embedding_model_name)
+        results = await _search_method(index, batched=False, asynchronous=True)(
+            collection_name=topic_name, query=query, top_k=_retrieval_top_k())
+        return _finish_query(query, results)
+    except Exception as e:
+        logger.error(f"Qdrant Query Failed | Topic: {topic_name} | Error: {str(e)}")
+        return []
+
+
+@tool
+async def aquery_qdrant_batch_tool(queries: Annotated[List[str], "The search queries"],
+                                   topic_name: Annotated[str, "The name of the topic whose vector database will be queried"]
+                                   ) -> List:
+    """
+    Asynchronous variant of query_qdrant_batch_tool that queries Qdrant through the AsyncQdrantClient.
+    """
+    try:
+        logger.info(f'Qdrant Batch Query | Topic: {topic_name} | Queries: {len(queries)}')
+        index = await asyncio.to_thread(get_vector_index, ConfigManager().embedding_model_name)
+        results = await _search_method(index, batched=True, asynchronous=True)(
+            collection_name=topic_name, queries=queries, top_k=_retrieval_top_k())
+        return _finish_batch_query(queries, results)
+    except Exception as e:
+        logger.error(f"Qdrant Batch Query Failed | Topic: {topic_name} | Error: {str(e)}")
+        return []
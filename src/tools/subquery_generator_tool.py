@@ -1,13 +1,40 @@
-import json
+import asyncio
 import traceback
 from typing import Annotated
 
 from langchain_core.tools import tool
-from langchain_ollama.chat_models import ChatOllama
 from loguru import logger
 
 from src.config.config_manager import ConfigManager
 from src.prompts.fail_safe_prompt import get_prompt_with_fallback
+from src.tools.llm_client import invoke_chat_model, ainvoke_chat_model
+
+
+def _build_messages(query: str) -> list:
+    prompt = get_prompt_with_fallback(
+        prompt_template_mnemonic="subquery_generator",
+        user_query=query,
+    )
+    return [
+        (
+            "system",
+             "You are an AI assistant that analyzes the user query and generates subqueries from it if possible. "
+        ),
+        ("user", prompt)
+    ]
+
+
+def _parse_response(response: dict) -> list[str]:
+    subqueries = response['subqueries']
+    logger.info(f'[COMPLETE] Subquery Generator | Response: {subqueries}')
+    return subqueries
+
+
+def _on_failure(e: Exception) -> str:
+    logger.error(f"[FAIL] Subquery Generator | Error: {str(e)}")
+    error_traceback = traceback.format_exc()
+    logger.error(error_traceback)
+    return ''
 
 
 @tool
@@ -17,24 +44,20 @@ def subquery_generator_tool(query: Annotated[str, 'The user query']) -> list[str
     """
     try:
         logger.info(f'[START] Subquery Generator')
-        prompt = get_prompt_with_fallback(
-            prompt_template_mnemonic="subquery_generator",
-            user_query=query,
-        )
-        llm = ChatOllama(model=ConfigManager().ollama_thinking_model_name, format="json")
-        response = llm.invoke([
-                (
-                    "system",
-                     "You are an AI assistant that analyzes the user query and generates subqueries from it if possible. "
-                ),
-                ("user", prompt)
-            ]
-        )
-        subqueries = json.loads(response.content)['subqueries']
-        logger.info(f'[COMPLETE] Subquery Generator | Response: {subqueries}')
-        return subqueries
+        messages = _build_messages(query)
+        return _parse_response(invoke_chat_model(ConfigManager().ollama_thinking_model_name, messages))
+    except Exception as e:
+        return _on_failure(e)
+
+
+@tool
+async def asubquery_generator_tool(query: Annotated[str, 'The user query']) -> list[str] | str:
+    """
+    Generates subqueries based on the user query without blocking the event loop.
+    """
+    try:
+        logger.info(f'[START] Subquery Generator')
+        messages = await asyncio.to_thread(_build_messages, query)
+        return _parse_response(await ainvoke_chat_model(ConfigManager().ollama_thinking_model_name, messages))
     except Exception as e:
-        logger.error(f"[FAIL] Subquery Generator | Error: {str(e)}")
-        error_traceback = traceback.format_exc()
-        logger.error(error_traceback)
-        return ''
\ No newline at end of file
+        return _on_failure(e)
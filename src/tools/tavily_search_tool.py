@@ -4,11 +4,27 @@ from typing import Annotated
 
 from langchain_core.tools import tool
 from loguru import logger
-from tavily import TavilyClient
 
 from src.config.config_manager import ConfigManager
 
 
+def _aggregate_search_results(search_results: str) -> str:
+    parsed_results = ast.literal_eval(search_results)
+    return '\n'.join(f'Source: {result_group["url"]}\nContent: {result_group["content"]}' for result_group in parsed_results)
+
+
+def _search_kwargs() -> dict:
+    return {"search_depth": "advanced",
+            "include_domains": ["https://arxiv.org/"],
+            "max_results": ConfigManager().tavily_search_max_results}
+
+
+def _parse_response(query: str, search_results: str) -> str:
+    aggregated_search_results = _aggregate_search_results(search_results)
+    logger.info(f'[COMPLETE] Tavily Search for Query: {query} | Response: {aggregated_search_results}')
+    return aggregated_search_results
+
+
 @tool
 def tavily_search_tool(query: Annotated[str, "The search query"]) -> str:
     """
@@ -16,15 +32,24 @@ def tavily_search_tool(query: Annotated[str, "The search query"]) -> str:
     """
     try:
         logger.info(f'[START] Tavily Search for query: {query}')
+        from tavily import TavilyClient
         tavily_client = TavilyClient(api_key=os.environ.get('TAVILY_API_KEY'))
-        search_results = tavily_client.get_search_context(query,
-                                                          search_depth="advanced",
-                                                          include_domains=["https://arxiv.org/"],
-                                                          max_results=ConfigManager().tavily_search_max_results)
-        parsed_results = ast.literal_eval(search_results)
-        aggregated_search_results = '\n'.join(f'Source: {result_group["url"]}\nContent: {result_group["content"]}' for result_group in parsed_results)
-        logger.info(f'[COMPLETE] Tavily Search for Query: {query} | Response: {aggregated_search_results}')
-        return aggregated_search_results
+        return _parse_response(query, tavily_client.get_search_context(query, **_search_kwargs()))
+    except Exception as e:
+        logger.error(f"[FAIL] Tavily Search for Query: {query} | Error: {str(e)}")
+        return ''
+
+
+@tool
+async def atavily_search_tool(query: Annotated[str, "The search query"]) -> str:
+    """
+    Tool designed for domain-specific search using the asynchronous Tavily client.
+    """
+    try:
+        logger.info(f'[START] Tavily Search for query: {query}')
+        from tavily import AsyncTavilyClient
+        tavily_client = AsyncTavilyClient(api_key=os.environ.get('TAVILY_API_KEY'))
+        return _parse_response(query, await tavily_client.get_search_context(query, **_search_kwargs()))
     except Exception as e:
         logger.error(f"[FAIL] Tavily Search for Query: {query} | Error: {str(e)}")
         return ''
@@ -1,13 +1,14 @@
-import json
+import asyncio
 import traceback
 from typing import Annotated
 
 from langchain_core.tools import tool
-from langchain_ollama.chat_models import ChatOllama
 from loguru import logger
 
 from src.config.config_manager import ConfigManager
 from src.prompts.fail_safe_prompt import get_prompt_with_fallback
+from src.retrievers.qdrant.topic_classifier import get_topic_classifier
+from src.tools.llm_client import invoke_chat_model, ainvoke_chat_model
 
 TOPIC_NAMES = [
     "Diffusion Models in Computer Vision",
@@ -17,6 +18,47 @@ TOPIC_NAMES = [
 ]
 
 
+def _classify(query: str) -> tuple:
+    """
+    Runs the embedding topic classifier if enabled. Returns (classifier, prediction), both None when disabled.
+    """
+    classifier = get_topic_classifier(TOPIC_NAMES) if ConfigManager().topic_classifier_enabled else None
+    prediction = classifier.predict(query) if classifier else None
+    return classifier, prediction
+
+
+def _build_messages(query: str) -> list:
+    prompt = get_prompt_with_fallback(
+        prompt_template_mnemonic="topic_extractor",
+        user_query=query,
+        predefined_topics=TOPIC_NAMES
+    )
+    return [
+        (
+            "system",
+             "You are an AI assistant that analyzes the user query and understands the topic of the research."
+             "Your output must be in JSON format with a single key 'topic_to_refer' containing a string of the topic name."
+        ),
+        ("user", prompt)
+    ]
+
+
+def _parse_response(response: dict, classifier, prediction) -> str:
+    topic_names = response['topic_name']
+    if classifier:
+        classifier.record_llm_result(prediction, topic_names)
+        logger.debug(f'Topic classifier stats: {classifier.stats()}')
+    logger.info(f'[COMPLETE] Topic Extractor | Response: {topic_names}')
+    return topic_names
+
+
+def _on_failure(e: Exception) -> str:
+    logger.error(f"[FAIL] Topic Extractor | Error: {str(e)}")
+    error_traceback = traceback.format_exc()
+    logger.error(error_traceback)
+    return ''
+
+
 @tool
 def topic_extractor_tool(query: Annotated[str, 'The user query']) -> list[str] | str:
     """
@@ -24,26 +66,30 @@ def topic_extractor_tool(query: Annotated[str, 'The user query']) -> list[str] |
     """
     try:
         logger.info(f'[START] Topic Extractor')
-        prompt = get_prompt_with_fallback(
-            prompt_template_mnemonic="topic_extractor",
-            user_query=query,
-            predefined_topics=TOPIC_NAMES
-        )
-        llm = ChatOllama(model=ConfigManager().ollama_model_name, format="json")
-        response = llm.invoke([
-                (
-                    "system",
-                     "You are an AI assistant that analyzes the user query and understands the topic of the research."
-                     "Your output must be in JSON format with a single key 'topic_to_refer' containing a string of the topic name."
-                ),
-                ("user", prompt)
-            ]
-        )
-        topic_names = json.loads(response.content)['topic_name']
-        logger.info(f'[COMPLETE] Topic Extractor | Response: {topic_names}')
-        return topic_names
+        classifier, prediction = _classify(query)
+        if classifier and classifier.accept(prediction):
+            logger.info(f'[COMPLETE] Topic Extractor | Fast path: {prediction}')
+            return prediction["topic"]
+        messages = _build_messages(query)
+        response = invoke_chat_model(ConfigManager().ollama_model_name, messages)
+        return _parse_response(response, classifier, prediction)
+    except Exception as e:
+        return _on_failure(e)
+
+
+@tool
+async def atopic_extractor_tool(query: Annotated[str, 'The user query']) -> list[str] | str:
+    """
+    Understand the topic of research based on the user query and return it without blocking the event loop.
+    """
+    try:
+        logger.info(f'[START] Topic Extractor')
+        classifier, prediction = await asyncio.to_thread(_classify, query)
+        if classifier and classifier.accept(prediction):
+            logger.info(f'[COMPLETE] Topic Extractor | Fast path: {prediction}')
+            return prediction["topic"]
+        messages = await asyncio.to_thread(_build_messages, query)
+        response = await ainvoke_chat_model(ConfigManager().ollama_model_name, messages)
+        return _parse_response(response, classifier, prediction)
     except Exception as e:
-        logger.error(f"[FAIL] Topic Extractor | Error: {str(e)}")
-        error_traceback = traceback.format_exc()
-        logger.error(error_traceback)
-        return ''
\ No newline at end of file
+        return _on_failure(e)
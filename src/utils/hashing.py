@@ -0,0 +1,15 @@
+import hashlib
+from pathlib import Path
+from typing import Union
+
+
+def file_sha256(file_path: Union[str, Path]) -> str:
+    """
+    Returns the hex sha256 of a file's content, read in 1 MiB blocks. Used as the content hash of PDFs and
+    markdown files by the scraper, the Docling cache and incremental ingestion.
+    """
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
@@ -0,0 +1,79 @@
+import json
+import re
+
+
+class JsonStringFieldParser:
+    """
+    Incrementally extracts the value of one string field from a JSON object that arrives in chunks, e.g. the
+    "answer" of a `{"answer": "..."}` LLM response streamed token by token.
+
+    `feed` returns the newly decoded part of the value, so the value can be shown before the object is complete.
+    Escape sequences split across chunks are held back until they are complete.
+    """
+
+    def __init__(self, key: str):
+        self._key_regex = re.compile(r'"' + re.escape(key) + r'"\s*:\s*"')
+        self._buffer = ""
+        self._position = None
+        self.value = ""
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """
+        Adds a chunk of the JSON text and returns the part of the field value decoded from it.
+        """
+        if self.done or not chunk:
+            return ""
+        self._buffer += chunk
+        if self._position is None:
+            match = self._key_regex.search(self._buffer)
+            if match is None:
+                return ""
+            self._position = match.end()
+
+        decoded = []
+        buffer, i = self._buffer, self._position
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char != "\\":
+                decoded.append(char)
+                i += 1
+                continue
+            escape_length = self._escape_length(buffer, i)
+            if escape_length is None:
+                break
+            decoded.append(json.loads(f'"{buffer[i:i + escape_length]}"'))
+            i += escape_length
+        self._position = i
+        delta = "".join(decoded)
+        self.value += delta
+        return delta
+
+    @staticmethod
+    def _escape_length(buffer: str, i: int):
+        """
+        Length of the escape sequence starting at `buffer[i]`, or None if it is not complete yet.
+        UTF-16 surrogate pairs ("\\ud83d\\ude00") are decoded as one sequence.
+        """
+        if i + 1 >= len(buffer):
+            return None
+        if buffer[i + 1] != "u":
+            return 2
+        if i + 6 > len(buffer):
+            return None
+        if 0xD800 <= int(buffer[i + 2:i + 6], 16) <= 0xDBFF:
+            return 12 if i + 12 <= len(buffer) else None
+        return 6
+
+
+if __name__ == '__main__':
+    parser = JsonStringFieldParser("answer")
+    response = json.dumps({"answer": "AnyI2V \"warps\" features.\nNo training needed — \U0001F600"})
+    for start in range(0, len(response), 3):
+        print(repr(parser.feed(response[start:start + 3])), end=" ")
+    print()
+    assert parser.value == json.loads(response)["answer"], parser.value
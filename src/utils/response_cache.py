@@ -0,0 +1,176 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from src.config.config_manager import ConfigManager
+
+
+class ResponseCache(ABC):
+    """
+    Exact-match cache of LLM responses keyed by model name, rendered prompt and output format.
+    Entries expire after `ttl_seconds` and the cache holds at most `max_entries` responses.
+    """
+
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_name: str, messages: Any, output_format: Optional[str]) -> str:
+        payload = json.dumps([model_name, output_format, messages], ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._get(key, time.time())
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._set(key, value, time.time())
+
+    @abstractmethod
+    def _get(self, key: str, now: float) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, value: str, now: float) -> None:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+
+class InMemoryResponseCache(ResponseCache):
+    """
+    Process-local LRU response cache.
+    """
+
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 10_000):
+        super().__init__(ttl_seconds, max_entries)
+        self._entries = OrderedDict()
+
+    def _get(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, created_at = entry
+        if now - created_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: str, now: float) -> None:
+        self._entries[key] = (value, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    On-disk response cache, shared by all processes that point at the same SQLite file
+    and kept across restarts.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 24 * 3600, max_entries: int = 10_000):
+        super().__init__(ttl_seconds, max_entries)
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._connection.commit()
+
+    def _get(self, key: str, now: float) -> Optional[str]:
+        row = self._connection.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if now - created_at > self.ttl_seconds:
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._connection.commit()
+            self.expirations += 1
+            return None
+        self._connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self._connection.commit()
+        return value
+
+    def _set(self, key: str, value: str, now: float) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO responses (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, value, now, now)
+        )
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+        self._connection.commit()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Returns the process-wide response cache configured by `llm_cache_backend`
+    ("memory", "sqlite" or None to disable caching).
+    """
+    global _response_cache
+    config = ConfigManager()
+    if not config.llm_cache_backend:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            if config.llm_cache_backend == "sqlite":
+                _response_cache = SQLiteResponseCache(config.llm_cache_path, config.llm_cache_ttl_seconds,
+                                                      config.llm_cache_max_entries)
+            elif config.llm_cache_backend == "memory":
+                _response_cache = InMemoryResponseCache(config.llm_cache_ttl_seconds, config.llm_cache_max_entries)
+            else:
+                raise ValueError(f"Unknown llm_cache_backend '{config.llm_cache_backend}'.")
+        return _response_cache
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("qdrant_client")
+
+from src.retrievers.qdrant import qdrant_index
+
+
+class FakeQdrantIndex:
+    instances = 0
+
+    def __init__(self, embedding_model_name: str):
+        FakeQdrantIndex.instances += 1
+        self.embedding_model_name = embedding_model_name
+
+
+def test_get_qdrant_index_returns_one_shared_index(monkeypatch):
+    monkeypatch.setattr(qdrant_index, "QdrantIndex", FakeQdrantIndex)
+    monkeypatch.setattr(qdrant_index, "_indexes", {})
+    monkeypatch.setenv("QDRANT_URL", "http://localhost:6333")
+
+    index = qdrant_index.get_qdrant_index("all-MiniLM-L6-v2")
+
+    assert isinstance(index, FakeQdrantIndex)
+    assert qdrant_index.get_qdrant_index("all-MiniLM-L6-v2") is index
+    assert qdrant_index.get_qdrant_index("other-model") is not index
+    assert FakeQdrantIndex.instances == 2
+
+
+def test_get_qdrant_clients_are_shared_per_url(monkeypatch):
+    monkeypatch.setattr(qdrant_index, "_clients", {})
+    monkeypatch.setattr(qdrant_index, "_async_clients", {})
+
+    client = qdrant_index.get_qdrant_client(url="http://localhost:6333", api_key=None)
+    async_client = qdrant_index.get_async_qdrant_client(url="http://localhost:6333", api_key=None)
+
+    assert qdrant_index.get_qdrant_client(url="http://localhost:6333", api_key=None) is client
+    assert qdrant_index.get_async_qdrant_client(url="http://localhost:6333", api_key=None) is async_client
+    assert qdrant_index.get_qdrant_client(url="http://localhost:6334", api_key=None) is not client